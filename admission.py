@@ -0,0 +1,182 @@
+"""
+ADMISSION CONTROL - GovOptima Platform
+HTTP middleware protecting the threadpool during traffic spikes:
+  - single-flight: concurrent identical GET requests (same path, query and
+    Accept header) share one in-flight computation and its response
+  - per-endpoint gates: at most `limit` executions at a time and at most
+    `queue` requests waiting for a slot; beyond that, or after waiting
+    `queue_timeout` seconds, requests are shed with 503 + Retry-After
+
+Limits can be overridden with GOVOPTIMA_ADMISSION_LIMITS, a JSON object of
+{"/api/path": {"limit": 8, "queue": 64, "coalesce": true}}.
+"""
+
+import asyncio
+import json
+import math
+import os
+import time
+
+from fastapi.responses import JSONResponse, Response
+
+# Expensive full-dataset aggregations get tight limits; cheap lookups get more room
+DEFAULT_LIMITS = {
+    '/api/efficiency_metrics': {'limit': 4, 'queue': 32, 'coalesce': True},
+    '/api/export_report': {'limit': 2, 'queue': 16, 'coalesce': True},
+    '/api/resource_recommendations': {'limit': 4, 'queue': 32, 'coalesce': True},
+    '/api/migration_alerts': {'limit': 4, 'queue': 32, 'coalesce': True},
+    '/api/cost_analysis': {'limit': 4, 'queue': 32, 'coalesce': True},
+    '/api/stats': {'limit': 8, 'queue': 64, 'coalesce': True},
+    '/api/trends': {'limit': 8, 'queue': 64, 'coalesce': True},
+    '/api/stress_heatmap': {'limit': 8, 'queue': 64, 'coalesce': True},
+    '/api/forecast': {'limit': 8, 'queue': 64, 'coalesce': True},
+    '/api/deep_dive': {'limit': 8, 'queue': 64, 'coalesce': True},
+    '/api/districts': {'limit': 8, 'queue': 64, 'coalesce': True},
+    '/api/query': {'limit': 4, 'queue': 32, 'coalesce': False},
+    '/api/scenarios': {'limit': 2, 'queue': 16, 'coalesce': False},
+    '/api/allocate': {'limit': 4, 'queue': 32, 'coalesce': False},
+    '/api/sql': {'limit': 2, 'queue': 8, 'coalesce': False},
+}
+DEFAULT_QUEUE_TIMEOUT = 10.0
+
+
+class EndpointGate:
+    def __init__(self, path: str, limit: int, queue: int, coalesce: bool = True,
+                 queue_timeout: float = DEFAULT_QUEUE_TIMEOUT):
+        self.path = path
+        self.limit = limit
+        self.queue = queue
+        self.coalesce = coalesce
+        self.queue_timeout = queue_timeout
+        self._semaphore = None
+        self._flights = {}          # coalescing key -> asyncio.Future of (status, raw_headers, body)
+        self.in_flight = 0
+        self.waiting = 0
+        self.latency_ewma = None    # Seconds; drives the Retry-After estimate
+        self.stats = {"admitted": 0, "coalesced": 0, "rejected": 0, "timed_out": 0, "peak_queue": 0}
+
+    @property
+    def semaphore(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained."""
+        latency = self.latency_ewma or 1.0
+        return max(1, math.ceil((self.waiting + self.in_flight) / self.limit * latency))
+
+    def overloaded(self, reason: str):
+        self.stats["rejected" if reason == "queue_full" else "timed_out"] += 1
+        return JSONResponse(
+            {"error": f"{self.path} is overloaded, retry later", "reason": reason},
+            status_code=503,
+            headers={"Retry-After": str(self.retry_after())}
+        )
+
+    async def admit(self) -> bool:
+        # Own counters, not semaphore.locked(): wait_for runs the acquire in a task, so a burst
+        # arriving in one loop iteration would all see the semaphore free and all be queued
+        if self.in_flight + self.waiting >= self.limit + self.queue:
+            return False
+        self.waiting += 1
+        self.stats["peak_queue"] = max(self.stats["peak_queue"], self.in_flight + self.waiting - self.limit)
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout=self.queue_timeout)
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        self.stats["admitted"] += 1
+        return True
+
+    def release(self, seconds: float):
+        self.in_flight -= 1
+        self.semaphore.release()
+        self.latency_ewma = seconds if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * seconds
+
+    def snapshot(self):
+        return {"limit": self.limit, "queue": self.queue, "coalesce": self.coalesce,
+                "in_flight": self.in_flight, "waiting": self.waiting,
+                "latency_ewma_ms": round(self.latency_ewma * 1000, 2) if self.latency_ewma else None,
+                **self.stats}
+
+
+class AdmissionController:
+    def __init__(self, limits: dict = None, queue_timeout: float = DEFAULT_QUEUE_TIMEOUT):
+        limits = dict(limits or DEFAULT_LIMITS)
+        override = os.environ.get("GOVOPTIMA_ADMISSION_LIMITS")
+        if override:
+            for path, spec in json.loads(override).items():
+                limits[path] = dict(limits.get(path, {'limit': 4, 'queue': 32, 'coalesce': False}), **spec)
+        self.gates = {path: EndpointGate(path, spec['limit'], spec['queue'], spec.get('coalesce', False),
+                                         queue_timeout)
+                      for path, spec in limits.items()}
+
+    def status(self):
+        return {path: gate.snapshot() for path, gate in sorted(self.gates.items())}
+
+    async def __call__(self, request, call_next):
+        gate = self.gates.get(request.url.path)
+        if gate is None:
+            return await call_next(request)
+
+        if not (gate.coalesce and request.method == 'GET'):
+            return await self._admitted(gate, request, call_next)
+
+        key = (request.url.query, request.headers.get('accept', ''))
+        flight = gate._flights.get(key)
+        if flight is not None:
+            # Identical request already running: wait for its result instead of recomputing
+            try:
+                result = await asyncio.shield(flight)
+                gate.stats["coalesced"] += 1
+                return _replay(result)
+            except asyncio.CancelledError:
+                if not flight.cancelled():
+                    raise  # This request itself was cancelled
+                # The leader went away (client disconnect); compute independently
+
+        flight = asyncio.get_running_loop().create_future()
+        gate._flights[key] = flight
+        try:
+            result = await _materialize(await self._admitted(gate, request, call_next))
+            flight.set_result(result)
+            return _replay(result)
+        except Exception as e:
+            flight.set_exception(e)
+            flight.exception()  # Mark retrieved: followers re-raise it, nobody else needs to see it
+            raise
+        except BaseException:
+            flight.cancel()
+            raise
+        finally:
+            if gate._flights.get(key) is flight:
+                del gate._flights[key]
+
+    async def _admitted(self, gate: EndpointGate, request, call_next):
+        try:
+            if not await gate.admit():
+                return gate.overloaded("queue_full")
+        except asyncio.TimeoutError:
+            return gate.overloaded("queue_timeout")
+        started = time.perf_counter()
+        try:
+            return await call_next(request)
+        finally:
+            gate.release(time.perf_counter() - started)
+
+
+async def _materialize(response):
+    """(status, raw headers, body) of a response, reading streamed bodies to the end."""
+    if hasattr(response, 'body_iterator'):
+        body = b''.join([chunk async for chunk in response.body_iterator])
+    else:
+        body = response.body
+    return response.status_code, list(response.raw_headers), body
+
+
+def _replay(result):
+    status, raw_headers, body = result
+    response = Response(content=body, status_code=status)
+    response.raw_headers = list(raw_headers)
+    return response
@@ -0,0 +1,174 @@
+"""
+ALLOCATION OPTIMIZER - GovOptima Platform
+Distributes a fixed budget of kits or staff across districts (or pincodes)
+to minimize projected overload, i.e. load left unserved once every unit's
+capacity is used: overload_d = max(0, load_d - capacity * allocated_d).
+
+Overload is convex and piecewise linear in the allocation, so greedily
+giving each next unit to the place it relieves most is optimal. Rather than
+popping a heap one unit at a time, every candidate unit is materialized
+with its marginal relief and sorted once; the allocation for any budget is
+then a prefix of that order, so sweeping many budgets costs one sort.
+No place can receive more units than the largest budget asked for, so
+candidates are capped there; tiny capacities or huge minimums cannot blow
+up the order beyond MAX_ORDER_UNITS.
+"""
+
+import numpy as np
+import pandas as pd
+
+from scenarios import DEFAULT_PARAMETERS
+
+RESOURCES = {
+    # resource: (load measure, capacity parameter)
+    'kits': ('average daily workload (stress_index)', 'ops_per_kit'),
+    'staff': ('total operations', 'ops_per_staff'),
+}
+MAX_BUDGETS = 500
+MAX_ORDER_UNITS = 5_000_000   # Candidate units materialized per request (8-byte arrays of this length)
+
+
+def district_loads(df: pd.DataFrame, resource: str) -> pd.Series:
+    """Load each district places on one resource type, from combined_df."""
+    if resource == 'kits':
+        return df.groupby('district', observed=True)['stress_index'].mean()
+    operations = df['total_enrollment'] + df['total_biometric'] + df['total_demographic']
+    return operations.groupby(df['district'], observed=True).sum()
+
+
+def pincode_loads(enrollment: pd.DataFrame, biometric: pd.DataFrame, demographic: pd.DataFrame,
+                  resource: str) -> pd.Series:
+    """Same loads at (district, pincode) level, from the raw feeds."""
+    if resource == 'kits':
+        # Aadhaar Pressure Index weights, as in process_data
+        weights = {'enrollment': 1.0, 'biometric': 0.5, 'demographic': 0.2}
+    else:
+        weights = {'enrollment': 1.0, 'biometric': 1.0, 'demographic': 1.0}
+    count_columns = {
+        'enrollment': ['age_0_5', 'age_5_17', 'age_18_greater'],
+        'biometric': ['bio_age_5_17', 'bio_age_17_'],
+        'demographic': ['demo_age_5_17', 'demo_age_17_'],
+    }
+    parts = []
+    for name, df in (('enrollment', enrollment), ('biometric', biometric), ('demographic', demographic)):
+        if df is None or df.empty:
+            continue
+        if 'pincode' not in df.columns:
+            raise ValueError(f"Pincode-level allocation needs a pincode column in the {name} feed")
+        parts.append(pd.DataFrame({
+            'district': df['district'].astype(str),
+            'pincode': df['pincode'],
+            'date': df['date'],
+            'load': df[count_columns[name]].sum(axis=1).to_numpy(dtype=np.float64) * weights[name],
+        }))
+    if not parts:
+        return pd.Series(dtype=np.float64)
+
+    daily = pd.concat(parts, ignore_index=True).groupby(['district', 'pincode', 'date'])['load'].sum()
+    if resource == 'kits':
+        return daily.groupby(level=['district', 'pincode']).mean()
+    return daily.groupby(level=['district', 'pincode']).sum()
+
+
+class AllocationPlanner:
+    def __init__(self, loads: pd.Series, capacity: float, minimum: int = 0, max_budget: int = None):
+        if not np.isfinite(capacity) or capacity <= 0:
+            raise ValueError("capacity must be a positive number")
+        if minimum < 0:
+            raise ValueError("minimum must be non-negative")
+        if max_budget is not None and max_budget < 0:
+            raise ValueError("Budgets must be non-negative")
+        self.units = loads.index
+        self.loads = np.nan_to_num(loads.to_numpy(dtype=np.float64).clip(min=0))
+        self.capacity = float(capacity)
+        self.minimum = int(minimum)
+        self.max_budget = max_budget
+        self._build_order()
+
+    def _build_order(self):
+        """Every unit worth allocating (up to max_budget per place), in greedy order (best marginal relief first)."""
+        loads, capacity = self.loads, self.capacity
+        # Counted in float first: ceil(load / tiny capacity) can overflow int64
+        wanted = np.maximum(np.ceil(loads / capacity), self.minimum)
+        self.required = int(wanted.sum())                   # Budget that leaves no overload
+        if self.max_budget is not None:
+            wanted = np.minimum(wanted, self.max_budget)
+        if wanted.sum() > MAX_ORDER_UNITS:
+            raise ValueError(f"capacity/minimum/budgets ask for more than {MAX_ORDER_UNITS} candidate units; "
+                             f"raise capacity or lower the budgets")
+        per_unit = wanted.astype(np.int64)
+
+        unit = np.repeat(np.arange(len(loads)), per_unit)
+        starts = np.repeat(np.cumsum(per_unit) - per_unit, per_unit)
+        j = np.arange(len(unit)) - starts + 1               # j-th kit of its district (1-based)
+        relief = np.clip(loads[unit] - capacity * (j - 1), 0, capacity)
+        forced = j <= self.minimum
+        # Ties (equal relief) go to the place with the highest load per allocated unit
+        pressure = loads[unit] / j
+
+        order = np.lexsort((unit, -pressure, -relief, ~forced))
+        self.order_unit = unit[order]
+        self.order_relief = relief[order]
+        self.total_load = float(loads.sum())
+        self.floor = self.minimum * len(loads)              # Budget the minimum alone consumes
+
+    def allocation(self, budget: int) -> np.ndarray:
+        take = min(int(budget), len(self.order_unit))
+        return np.bincount(self.order_unit[:take], minlength=len(self.loads))
+
+    def sweep(self, budgets, include_allocations: bool = True, top: int = None):
+        """Greedy allocation for every budget in one pass over the precomputed order."""
+        budgets = [int(b) for b in budgets]
+        if not budgets:
+            raise ValueError("At least one budget is required")
+        if len(budgets) > MAX_BUDGETS:
+            raise ValueError(f"At most {MAX_BUDGETS} budget levels per request")
+        if min(budgets) < 0:
+            raise ValueError("Budgets must be non-negative")
+
+        relief_prefix = np.concatenate([[0.0], np.cumsum(self.order_relief)])
+        labels = [self._label(u) for u in self.units]
+
+        results = []
+        for budget in budgets:
+            used = min(budget, len(self.order_unit))
+            overload_total = max(0.0, float(self.total_load - relief_prefix[used]))
+            result = {
+                "budget": budget,
+                "allocated": used,
+                "surplus": budget - used,
+                "feasible": budget >= self.floor,
+                "total_overload": round(overload_total, 2),
+                "coverage_pct": round(100 * (1 - overload_total / self.total_load), 2) if self.total_load > 0 else 100.0,
+            }
+            if include_allocations:
+                alloc = self.allocation(budget)
+                overload = np.maximum(0.0, self.loads - self.capacity * alloc)
+                rows = np.argsort(-overload, kind='stable')[:top or None]
+                result["allocations"] = [
+                    {"unit": labels[i], "load": round(float(self.loads[i]), 2), "allocated": int(alloc[i]),
+                     "overload": round(float(overload[i]), 2)}
+                    for i in rows
+                ]
+            results.append(result)
+
+        return {
+            "capacity_per_unit": self.capacity,
+            "minimum_per_unit": self.minimum,
+            "units": len(self.loads),
+            "total_load": round(self.total_load, 2),
+            "budget_for_zero_overload": self.required,
+            "results": results,
+        }
+
+    @staticmethod
+    def _label(unit):
+        if isinstance(unit, tuple):
+            return {"district": str(unit[0]), "pincode": int(unit[1])}
+        return str(unit)
+
+
+def default_capacity(resource: str) -> float:
+    if resource not in RESOURCES:
+        raise ValueError(f"resource must be one of {list(RESOURCES)}")
+    return DEFAULT_PARAMETERS[RESOURCES[resource][1]]
@@ -2,6 +2,10 @@ import pandas as pd
 import numpy as np
 from typing import Dict, List, Optional
 import os
+from schemas import SCHEMAS
+from partitioned_loader import load_partitions
+from cube import ActivityCube
+from fingerprints import DataFingerprint
 
 class GovernanceAnalyst:
     def __init__(self, data_dir: str):
@@ -10,40 +14,41 @@ class GovernanceAnalyst:
         self.demographic_df = None
         self.enrollment_df = None
         self.combined_df = None
+        self.district_name_report = {}
+        self.schema_report = {}
+        self.partition_stats = []
+        self.source_stamp = ()    # (file, bytes, mtime_ns) of the partitions the raw feeds were read from
+        self.version = 0  # Bumped whenever combined_df is rebuilt
+        self.cube = None
+        self.cube_version = None  # combined_df version the cube was built for
+        self.fingerprint = None   # Per-district/per-date content fingerprint of combined_df
+        self.last_change = None   # Diff report of the latest version against the one before
+        self.sql_store_update = None  # 'unchanged' / 'incremental' / 'rebuilt' from the last store write
         
     def load_data(self):
         """Loads data from CSV files."""
         try:
-            bio_path = os.path.join(self.data_dir, "Biometric_Data.csv")
-            demo_path = os.path.join(self.data_dir, "Demographic_Data.csv")
-            enroll_path = os.path.join(self.data_dir, "Enrollment_Data.csv")
-            
-            self.biometric_df = pd.read_csv(bio_path)
-            self.demographic_df = pd.read_csv(demo_path)
-            self.enrollment_df = pd.read_csv(enroll_path)
-            
-            # Normalize column names & Clean District Names (Deduplication)
-            for df in [self.biometric_df, self.demographic_df, self.enrollment_df]:
-                df.columns = [c.strip().lower() for c in df.columns]
-                # Standardize district names: Title Case, Strip Whitespace, handle variations
-                df['district'] = df['district'].astype(str).str.strip().str.title()
-                # Fix specific known typos/variations if any (example logic)
-                df['district'] = df['district'].replace({
-                    'Mumbai( Sub Urban )': 'Mumbai Suburban',
-                    'Ahmed Nagar': 'Ahmadnagar',
-                    'Bid': 'Beed',
-                    'Buldhana': 'Buldana' # Standardize spelling
-                })
-                
-            # Date parsing
-            for df in [self.biometric_df, self.demographic_df, self.enrollment_df]:
-                df['date'] = pd.to_datetime(df['date'], format='%d-%m-%Y', errors='coerce')
+            # Discover partitioned sources and read + clean them concurrently. Reads are typed per
+            # declared schema (violations in self.schema_report) and district names canonicalized
+            # via the alias table, resolved once per unique spelling
+            frames, self.schema_report, self.district_name_report, self.partition_stats = load_partitions(
+                self.data_dir, SCHEMAS
+            )
+            for name, report in self.schema_report.items():
+                if report['violations'] or report['invalid_dates']:
+                    print(f"Warning: schema violations in {name} data: {report['violations']}, "
+                          f"{report['invalid_dates']} invalid dates, {report['quarantined_rows']} rows quarantined")
+            for name, report in self.district_name_report.items():
+                if report['unmatched']:
+                    unmatched = ', '.join(u['name'] for u in report['unmatched'])
+                    print(f"Warning: {len(report['unmatched'])} unmatched district names in {name} data: {unmatched}")
+
+            self.biometric_df = frames['biometric']
+            self.demographic_df = frames['demographic']
+            self.enrollment_df = frames['enrollment']
+            self.source_stamp = tuple((s['file'], s.get('bytes'), s.get('mtime_ns'), s.get('error'))
+                                      for s in self.partition_stats)
                 
-            # Fill missing numeric values with 0
-            self.biometric_df.fillna(0, inplace=True)
-            self.demographic_df.fillna(0, inplace=True)
-            self.enrollment_df.fillna(0, inplace=True)
-            
             return True
         except Exception as e:
             print(f"CRITICAL ERROR loading data: {e}")
@@ -55,10 +60,38 @@ class GovernanceAnalyst:
             self.biometric_df = pd.DataFrame(columns=cols_bio)
             self.demographic_df = pd.DataFrame(columns=cols_demo)
             self.enrollment_df = pd.DataFrame(columns=cols_enroll)
+            self.source_stamp = ()
             return False
 
-    def process_data(self):
-        """Aggregates data and calculates stress index."""
+    def load_from_store(self, db_path: str):
+        """Fast start: restores combined_df from a SQL analytics store instead of the CSVs."""
+        from sql_store import AnalyticsStore
+        self.combined_df = AnalyticsStore(db_path).load_combined()
+        self.version += 1
+        self.track_changes()
+        return self.combined_df
+
+    def track_changes(self, previous: Optional[DataFingerprint] = None):
+        """Fingerprints the current combined_df and diffs it against `previous` (default: the last one)."""
+        fingerprint = DataFingerprint.from_frame(self.combined_df)
+        self.last_change = fingerprint.diff(previous or self.fingerprint)
+        self.fingerprint = fingerprint
+        return self.last_change
+
+    @property
+    def content_version(self) -> str:
+        """Changes only when the data does: identical reloads keep derived caches warm."""
+        return self.fingerprint.digest if self.fingerprint is not None else f"v{self.version}"
+
+    def process_data(self, sql_store: Optional[str] = None, engine: Optional[str] = None):
+        """Aggregates data and calculates stress index.
+
+        If `sql_store` is given, combined_df and its district/pincode aggregates
+        are also persisted to that SQLite file for ad-hoc querying.
+        `engine` is 'pandas' (merges, default) or 'cube' (dense ndarray cube);
+        it defaults to GOVOPTIMA_ENGINE.
+        """
+        engine = engine or os.environ.get("GOVOPTIMA_ENGINE", "pandas")
         if self.biometric_df is None:
             if not self.load_data():
                  print("Using empty dataframes due to load failure.")
@@ -68,13 +101,19 @@ class GovernanceAnalyst:
         if self.demographic_df is None: self.demographic_df = pd.DataFrame()
         if self.enrollment_df is None: self.enrollment_df = pd.DataFrame()
 
-        # Handle Empty Data Case Gracefully
+        # Handle Empty Data Case Gracefully: still published, so the version bumps, any cube
+        # of the previous data is dropped and the change to empty is tracked
         if self.biometric_df.empty:
-            self.combined_df = pd.DataFrame(columns=['date', 'district', 'stress_index', 'migration_intensity', 
-                                                     'total_enrollment', 'total_biometric', 'total_demographic',
-                                                     'age_0_5', 'age_5_17', 'age_18_greater',
-                                                     'ivi', 'bsr', 'api'])
-            return self.combined_df
+            empty = pd.DataFrame(columns=['date', 'district', 'stress_index', 'migration_intensity', 
+                                          'total_enrollment', 'total_biometric', 'total_demographic',
+                                          'age_0_5', 'age_5_17', 'age_18_greater',
+                                          'ivi', 'bsr', 'api'])
+            return self._publish_combined(empty, sql_store)
+
+        if engine == 'cube':
+            # Scatter-add every feed into a dense date x district x metric cube (no string-key merges)
+            cube = ActivityCube.from_frames(self.enrollment_df, self.biometric_df, self.demographic_df)
+            return self._publish_combined(cube.to_frame(), sql_store, cube=cube)
 
         # Group by Date and District (Ensuring no duplicates for same day/district)
         bio_grouped = self.biometric_df.groupby(['date', 'district']).sum(numeric_only=True).reset_index()
@@ -140,8 +179,22 @@ class GovernanceAnalyst:
         # Replace Infinity or NaN with 0 for clean JSON serialization
         merged.replace([np.inf, -np.inf], 0, inplace=True)
         merged.fillna(0, inplace=True)
-        
-        self.combined_df = merged
+        return self._publish_combined(merged, sql_store)
+
+    def _publish_combined(self, combined: pd.DataFrame, sql_store: Optional[str] = None, cube=None):
+        self.combined_df = combined
+        self.version += 1
+        self.cube = cube
+        self.cube_version = self.version
+        self.track_changes()
+
+        if sql_store:
+            from sql_store import AnalyticsStore
+            self.sql_store_update = AnalyticsStore(sql_store).write(self.combined_df, [
+                ('enrollment', self.enrollment_df),
+                ('biometric', self.biometric_df),
+                ('demographic', self.demographic_df)
+            ], fingerprint=self.fingerprint, source_stamp=self.source_stamp)
         return self.combined_df
 
     def get_district_stats(self, district: str = None):
@@ -165,14 +218,24 @@ class GovernanceAnalyst:
         }
         return stats
 
+    def get_stress_heatmap_frame(self):
+        """Aggregated stress index by district, as a DataFrame."""
+        if self.cube is not None and self.cube_version == self.version:
+            return self.cube.district_means(['stress_index', 'migration_intensity'])
+        # Aggregating over the entire period to get a stable "Hotspot" view
+        return self.combined_df.groupby('district')[['stress_index', 'migration_intensity']].mean().reset_index()
+
     def get_stress_heatmap(self):
         """Returns aggregated stress index by district."""
-        # Aggregating over the entire period to get a stable "Hotspot" view
-        agg_df = self.combined_df.groupby('district')[['stress_index', 'migration_intensity']].mean().reset_index()
-        return agg_df.to_dict(orient='records')
+        return self.get_stress_heatmap_frame().to_dict(orient='records')
 
-    def get_district_deep_dive(self, district: str):
-        """Detailed breakdown for a specific district."""
+    def get_district_deep_dive(self, district: str, target: str = 'mean', load_stats=None):
+        """Detailed breakdown for a specific district.
+
+        Kits are sized to the mean daily load unless `target` names a
+        percentile ('p90', 'p95', ...) or 'max' of `load_stats`
+        (a load_stats.DistrictLoadStats built on this data).
+        """
         df = self.combined_df[self.combined_df['district'].str.lower() == district.lower()].sort_values('date')
         
         if df.empty:
@@ -197,12 +260,22 @@ class GovernanceAnalyst:
         # Anomaly status
         is_high_load = avg_daily_ops > 200 # Threshold
         
-        return {
+        result = {
             "age_demographics": age_stats,
             "kits_recommended": kits_needed,
             "status": "Critical" if is_high_load else "Normal",
             "migration_flag": "High In-Migration" if df['migration_intensity'].mean() > 5 else "Stable"
         }
+        if target != 'mean' and load_stats is not None:
+            # Capacity for the chosen percentile of daily load rather than the average day
+            target_load = load_stats.load(district, target)
+            result.update({
+                "target": target,
+                "target_load": round(target_load, 2),
+                "kits_at_mean": kits_needed,
+                "kits_recommended": int(np.ceil(target_load / 50)),
+            })
+        return result
 
     def get_forecast(self, district: str, months: int = 3):
         """Linear forecast."""
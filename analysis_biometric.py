@@ -8,17 +8,36 @@ Date: January 2026
 import pandas as pd
 import numpy as np
 import os
+from manifest import OutputManifest, plan_rebuild
+from district_names import canonicalize_districts
+from partitioned_loader import discover_sources, loader_code_files, source_files
+from schemas import SCHEMAS
 
 os.makedirs('analysis_outputs', exist_ok=True)
 
+# Skip the run when the source data and this script are unchanged
+OUTPUTS = [
+    'analysis_outputs/biometric_cleaned.csv',
+    'analysis_outputs/biometric_district_summary.csv',
+    'analysis_outputs/biometric_analysis_report.txt',
+]
+manifest = OutputManifest()
+# Every partition of the feed (legacy file, monthly splits or sources.json), as the server loads it
+SOURCES = discover_sources('.', SCHEMAS['biometric'])
+build_key = manifest.build_key(sources=source_files('.', {'biometric': SCHEMAS['biometric']}),
+                               code=[os.path.abspath(__file__)] + loader_code_files())
+plan = plan_rebuild(manifest, OUTPUTS, build_key)
+
 print("="*80)
 print("🔬 BIOMETRIC DATA ANALYSIS")
 print("="*80)
 
 # ===== 1. DATA LOADING =====
 print("\n1. LOADING DATA...")
-df = pd.read_csv('Biometric_Data.csv')
-print(f"✓ Loaded {len(df):,} records")
+if not SOURCES:
+    raise SystemExit("No biometric source files found (Biometric_Data.csv or its partitions)")
+df = pd.concat([pd.read_csv(path) for path in SOURCES], ignore_index=True)
+print(f"✓ Loaded {len(df):,} records from {len(SOURCES)} file(s)")
 
 # ===== 2. DATA EXPLORATION =====
 print("\n2. DATA EXPLORATION")
@@ -31,13 +50,9 @@ print("\n3. DATA CLEANING")
 
 df.columns = [c.strip().lower() for c in df.columns]
 df['date'] = pd.to_datetime(df['date'], format='%d-%m-%Y', errors='coerce')
-df['district'] = df['district'].astype(str).str.strip().str.title()
-df['district'] = df['district'].replace({
-    'Mumbai( Sub Urban )': 'Mumbai Suburban',
-    'Ahmed Nagar': 'Ahmadnagar',
-    'Bid': 'Beed',
-    'Buldhana': 'Buldana'
-})
+df['district'], name_report = canonicalize_districts(df)
+if name_report['unmatched']:
+    print(f"  ⚠ Unmatched district names: {[u['name'] for u in name_report['unmatched']]}")
 df.fillna(0, inplace=True)
 print("  ✓ Data cleaned and standardized")
 
@@ -99,37 +114,42 @@ for insight in insights:
 # ===== 9. SAVE OUTPUTS =====
 print("\n9. SAVING OUTPUTS")
 
-df.to_csv('analysis_outputs/biometric_cleaned.csv', index=False)
-print("  ✓ Saved: biometric_cleaned.csv")
-
-district_bio.to_csv('analysis_outputs/biometric_district_summary.csv')
-print("  ✓ Saved: biometric_district_summary.csv")
-
-with open('analysis_outputs/biometric_analysis_report.txt', 'w', encoding='utf-8') as f:
-    f.write("="*80 + "\n")
-    f.write("BIOMETRIC DATA ANALYSIS REPORT\n")
-    f.write("="*80 + "\n\n")
+if plan.should_write('analysis_outputs/biometric_cleaned.csv'):
+    df.to_csv('analysis_outputs/biometric_cleaned.csv', index=False)
+    plan.mark_saved('analysis_outputs/biometric_cleaned.csv')
+    print("  ✓ Saved: biometric_cleaned.csv")
+
+if plan.should_write('analysis_outputs/biometric_district_summary.csv'):
+    district_bio.to_csv('analysis_outputs/biometric_district_summary.csv')
+    plan.mark_saved('analysis_outputs/biometric_district_summary.csv')
+    print("  ✓ Saved: biometric_district_summary.csv")
+
+if plan.should_write('analysis_outputs/biometric_analysis_report.txt'):
+    with open('analysis_outputs/biometric_analysis_report.txt', 'w', encoding='utf-8') as f:
+        f.write("="*80 + "\n")
+        f.write("BIOMETRIC DATA ANALYSIS REPORT\n")
+        f.write("="*80 + "\n\n")
     
-    f.write("DATASET OVERVIEW:\n")
-    f.write(f"  Records: {len(df):,}\n")
-    f.write(f"  Districts: {df['district'].nunique()}\n")
-    f.write(f"  Total Biometric Updates: {df['total_biometric_updates'].sum():,}\n\n")
+        f.write("DATASET OVERVIEW:\n")
+        f.write(f"  Records: {len(df):,}\n")
+        f.write(f"  Districts: {df['district'].nunique()}\n")
+        f.write(f"  Total Biometric Updates: {df['total_biometric_updates'].sum():,}\n\n")
     
-    f.write("TOP 10 DISTRICTS:\n")
-    for idx, (district, row) in enumerate(district_bio.head(10).iterrows(), 1):
-        f.write(f"  {idx}. {district}: {row['total_biometric_updates']:,}\n")
+        f.write("TOP 10 DISTRICTS:\n")
+        for idx, (district, row) in enumerate(district_bio.head(10).iterrows(), 1):
+            f.write(f"  {idx}. {district}: {row['total_biometric_updates']:,}\n")
     
-    f.write("\nAGING POPULATION INDICATORS:\n")
-    for idx, (district, row) in enumerate(high_aging.head(5).iterrows(), 1):
-        f.write(f"  {idx}. {district}: Score {row['aging_score']:.1f}/100\n")
+        f.write("\nAGING POPULATION INDICATORS:\n")
+        for idx, (district, row) in enumerate(high_aging.head(5).iterrows(), 1):
+            f.write(f"  {idx}. {district}: Score {row['aging_score']:.1f}/100\n")
     
-    f.write("\nKEY INSIGHTS:\n")
-    for insight in insights:
-        f.write(f"  {insight}\n")
+        f.write("\nKEY INSIGHTS:\n")
+        for insight in insights:
+            f.write(f"  {insight}\n")
     
-    f.write("\n" + "="*80)
-
-print("  ✓ Saved: biometric_analysis_report.txt")
+        f.write("\n" + "="*80)
+    plan.mark_saved('analysis_outputs/biometric_analysis_report.txt')
+    print("  ✓ Saved: biometric_analysis_report.txt")
 
 print("\n" + "="*80)
 print("✅ BIOMETRIC ANALYSIS COMPLETE!")
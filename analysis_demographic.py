@@ -9,17 +9,36 @@ Date: January 2026
 import pandas as pd
 import numpy as np
 import os
+from manifest import OutputManifest, plan_rebuild
+from district_names import canonicalize_districts
+from partitioned_loader import discover_sources, loader_code_files, source_files
+from schemas import SCHEMAS
 
 os.makedirs('analysis_outputs', exist_ok=True)
 
+# Skip the run when the source data and this script are unchanged
+OUTPUTS = [
+    'analysis_outputs/demographic_cleaned.csv',
+    'analysis_outputs/demographic_district_summary.csv',
+    'analysis_outputs/demographic_analysis_report.txt',
+]
+manifest = OutputManifest()
+# Every partition of the feed (legacy file, monthly splits or sources.json), as the server loads it
+SOURCES = discover_sources('.', SCHEMAS['demographic'])
+build_key = manifest.build_key(sources=source_files('.', {'demographic': SCHEMAS['demographic']}),
+                               code=[os.path.abspath(__file__)] + loader_code_files())
+plan = plan_rebuild(manifest, OUTPUTS, build_key)
+
 print("="*80)
 print("🌍 DEMOGRAPHIC DATA ANALYSIS")
 print("="*80)
 
 # ===== 1. DATA LOADING =====
 print("\n1. LOADING DATA...")
-df = pd.read_csv('Demographic_Data.csv')
-print(f"✓ Loaded {len(df):,} records")
+if not SOURCES:
+    raise SystemExit("No demographic source files found (Demographic_Data.csv or its partitions)")
+df = pd.concat([pd.read_csv(path) for path in SOURCES], ignore_index=True)
+print(f"✓ Loaded {len(df):,} records from {len(SOURCES)} file(s)")
 
 # ===== 2. DATA EXPLORATION =====
 print("\n2. DATA EXPLORATION")
@@ -32,13 +51,9 @@ print("\n3. DATA CLEANING")
 
 df.columns = [c.strip().lower() for c in df.columns]
 df['date'] = pd.to_datetime(df['date'], format='%d-%m-%Y', errors='coerce')
-df['district'] = df['district'].astype(str).str.strip().str.title()
-df['district'] = df['district'].replace({
-    'Mumbai( Sub Urban )': 'Mumbai Suburban',
-    'Ahmed Nagar': 'Ahmadnagar',
-    'Bid': 'Beed',
-    'Buldhana': 'Buldana'
-})
+df['district'], name_report = canonicalize_districts(df)
+if name_report['unmatched']:
+    print(f"  ⚠ Unmatched district names: {[u['name'] for u in name_report['unmatched']]}")
 df.fillna(0, inplace=True)
 print("  ✓ Data cleaned and standardized")
 
@@ -124,38 +139,43 @@ for insight in insights:
 # ===== 10. SAVE OUTPUTS =====
 print("\n10. SAVING OUTPUTS")
 
-df.to_csv('analysis_outputs/demographic_cleaned.csv', index=False)
-print("  ✓ Saved: demographic_cleaned.csv")
-
-district_demo.to_csv('analysis_outputs/demographic_district_summary.csv')
-print("  ✓ Saved: demographic_district_summary.csv")
-
-with open('analysis_outputs/demographic_analysis_report.txt', 'w', encoding='utf-8') as f:
-    f.write("="*80 + "\n")
-    f.write("DEMOGRAPHIC DATA ANALYSIS REPORT\n")
-    f.write("Migration Patterns & Resource Impact Assessment\n")
-    f.write("="*80 + "\n\n")
+if plan.should_write('analysis_outputs/demographic_cleaned.csv'):
+    df.to_csv('analysis_outputs/demographic_cleaned.csv', index=False)
+    plan.mark_saved('analysis_outputs/demographic_cleaned.csv')
+    print("  ✓ Saved: demographic_cleaned.csv")
+
+if plan.should_write('analysis_outputs/demographic_district_summary.csv'):
+    district_demo.to_csv('analysis_outputs/demographic_district_summary.csv')
+    plan.mark_saved('analysis_outputs/demographic_district_summary.csv')
+    print("  ✓ Saved: demographic_district_summary.csv")
+
+if plan.should_write('analysis_outputs/demographic_analysis_report.txt'):
+    with open('analysis_outputs/demographic_analysis_report.txt', 'w', encoding='utf-8') as f:
+        f.write("="*80 + "\n")
+        f.write("DEMOGRAPHIC DATA ANALYSIS REPORT\n")
+        f.write("Migration Patterns & Resource Impact Assessment\n")
+        f.write("="*80 + "\n\n")
     
-    f.write("DATASET OVERVIEW:\n")
-    f.write(f"  Records: {len(df):,}\n")
-    f.write(f"  Districts: {df['district'].nunique()}\n")
-    f.write(f"  Total Demographic Updates: {df['total_demographic_updates'].sum():,}\n\n")
+        f.write("DATASET OVERVIEW:\n")
+        f.write(f"  Records: {len(df):,}\n")
+        f.write(f"  Districts: {df['district'].nunique()}\n")
+        f.write(f"  Total Demographic Updates: {df['total_demographic_updates'].sum():,}\n\n")
     
-    f.write("HIGH MIGRATION DISTRICTS (Top 10):\n")
-    for idx, (district, row) in enumerate(district_demo.head(10).iterrows(), 1):
-        f.write(f"  {idx}. {district}: {row['total_demographic_updates']:,} (Score: {row['migration_intensity_score']:.1f})\n")
+        f.write("HIGH MIGRATION DISTRICTS (Top 10):\n")
+        for idx, (district, row) in enumerate(district_demo.head(10).iterrows(), 1):
+            f.write(f"  {idx}. {district}: {row['total_demographic_updates']:,} (Score: {row['migration_intensity_score']:.1f})\n")
     
-    f.write("\nRESOURCE IMPACT:\n")
-    for idx, (district, row) in enumerate(high_workload.head(5).iterrows(), 1):
-        f.write(f"  {idx}. {district}: Workload Index {row['workload_index']:.1f}\n")
+        f.write("\nRESOURCE IMPACT:\n")
+        for idx, (district, row) in enumerate(high_workload.head(5).iterrows(), 1):
+            f.write(f"  {idx}. {district}: Workload Index {row['workload_index']:.1f}\n")
     
-    f.write("\nKEY INSIGHTS:\n")
-    for insight in insights:
-        f.write(f"  {insight}\n")
+        f.write("\nKEY INSIGHTS:\n")
+        for insight in insights:
+            f.write(f"  {insight}\n")
     
-    f.write("\n" + "="*80)
-
-print("  ✓ Saved: demographic_analysis_report.txt")
+        f.write("\n" + "="*80)
+    plan.mark_saved('analysis_outputs/demographic_analysis_report.txt')
+    print("  ✓ Saved: demographic_analysis_report.txt")
 
 print("\n" + "="*80)
 print("✅ DEMOGRAPHIC ANALYSIS COMPLETE!")
@@ -9,18 +9,37 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 import os
+from manifest import OutputManifest, plan_rebuild
+from district_names import canonicalize_districts
+from partitioned_loader import discover_sources, loader_code_files, source_files
+from schemas import SCHEMAS
 
 # Create output directory
 os.makedirs('analysis_outputs', exist_ok=True)
 
+# Skip the run when the source data and this script are unchanged
+OUTPUTS = [
+    'analysis_outputs/enrollment_cleaned.csv',
+    'analysis_outputs/enrollment_district_summary.csv',
+    'analysis_outputs/enrollment_analysis_report.txt',
+]
+manifest = OutputManifest()
+# Every partition of the feed (legacy file, monthly splits or sources.json), as the server loads it
+SOURCES = discover_sources('.', SCHEMAS['enrollment'])
+build_key = manifest.build_key(sources=source_files('.', {'enrollment': SCHEMAS['enrollment']}),
+                               code=[os.path.abspath(__file__)] + loader_code_files())
+plan = plan_rebuild(manifest, OUTPUTS, build_key)
+
 print("="*80)
 print("📊 ENROLLMENT DATA ANALYSIS")
 print("="*80)
 
 # ===== 1. DATA LOADING =====
 print("\n1. LOADING DATA...")
-df = pd.read_csv('Enrollment_Data.csv')
-print(f"✓ Loaded {len(df):,} records")
+if not SOURCES:
+    raise SystemExit("No enrollment source files found (Enrollment_Data.csv or its partitions)")
+df = pd.concat([pd.read_csv(path) for path in SOURCES], ignore_index=True)
+print(f"✓ Loaded {len(df):,} records from {len(SOURCES)} file(s)")
 
 # ===== 2. DATA EXPLORATION =====
 print("\n2. DATA EXPLORATION")
@@ -48,13 +67,9 @@ df['date'] = pd.to_datetime(df['date'], format='%d-%m-%Y', errors='coerce')
 print(f"  ✓ Parsed dates")
 
 # Standardize district names
-df['district'] = df['district'].astype(str).str.strip().str.title()
-df['district'] = df['district'].replace({
-    'Mumbai( Sub Urban )': 'Mumbai Suburban',
-    'Ahmed Nagar': 'Ahmadnagar',
-    'Bid': 'Beed',
-    'Buldhana': 'Buldana'
-})
+df['district'], name_report = canonicalize_districts(df)
+if name_report['unmatched']:
+    print(f"  ⚠ Unmatched district names: {[u['name'] for u in name_report['unmatched']]}")
 print(f"  ✓ Standardized {df['district'].nunique()} district names")
 
 # Fill missing values
@@ -139,40 +154,45 @@ for insight in insights:
 print("\n9. SAVING OUTPUTS")
 
 # Save cleaned data
-df.to_csv('analysis_outputs/enrollment_cleaned.csv', index=False)
-print("  ✓ Saved: enrollment_cleaned.csv")
+if plan.should_write('analysis_outputs/enrollment_cleaned.csv'):
+    df.to_csv('analysis_outputs/enrollment_cleaned.csv', index=False)
+    plan.mark_saved('analysis_outputs/enrollment_cleaned.csv')
+    print("  ✓ Saved: enrollment_cleaned.csv")
 
 # Save district summary
-district_summary.to_csv('analysis_outputs/enrollment_district_summary.csv')
-print("  ✓ Saved: enrollment_district_summary.csv")
+if plan.should_write('analysis_outputs/enrollment_district_summary.csv'):
+    district_summary.to_csv('analysis_outputs/enrollment_district_summary.csv')
+    plan.mark_saved('analysis_outputs/enrollment_district_summary.csv')
+    print("  ✓ Saved: enrollment_district_summary.csv")
 
 # Save analysis report
-with open('analysis_outputs/enrollment_analysis_report.txt', 'w', encoding='utf-8') as f:
-    f.write("="*80 + "\n")
-    f.write("ENROLLMENT DATA ANALYSIS REPORT\n")
-    f.write("="*80 + "\n\n")
+if plan.should_write('analysis_outputs/enrollment_analysis_report.txt'):
+    with open('analysis_outputs/enrollment_analysis_report.txt', 'w', encoding='utf-8') as f:
+        f.write("="*80 + "\n")
+        f.write("ENROLLMENT DATA ANALYSIS REPORT\n")
+        f.write("="*80 + "\n\n")
     
-    f.write("DATASET OVERVIEW:\n")
-    f.write(f"  Records: {len(df):,}\n")
-    f.write(f"  Districts: {df['district'].nunique()}\n")
-    f.write(f"  Date Range: {df['date'].min()} to {df['date'].max()}\n\n")
+        f.write("DATASET OVERVIEW:\n")
+        f.write(f"  Records: {len(df):,}\n")
+        f.write(f"  Districts: {df['district'].nunique()}\n")
+        f.write(f"  Date Range: {df['date'].min()} to {df['date'].max()}\n\n")
     
-    f.write("ENROLLMENT STATISTICS:\n")
-    for key, val in age_stats.items():
-        pct = (val / age_stats['Total'] * 100) if age_stats['Total'] > 0 else 0
-        f.write(f"  {key}: {val:,} ({pct:.1f}%)\n")
+        f.write("ENROLLMENT STATISTICS:\n")
+        for key, val in age_stats.items():
+            pct = (val / age_stats['Total'] * 100) if age_stats['Total'] > 0 else 0
+            f.write(f"  {key}: {val:,} ({pct:.1f}%)\n")
     
-    f.write("\nTOP 10 DISTRICTS:\n")
-    for idx, (district, row) in enumerate(district_summary.head(10).iterrows(), 1):
-        f.write(f"  {idx}. {district}: {row['total_enrollments']:,}\n")
+        f.write("\nTOP 10 DISTRICTS:\n")
+        for idx, (district, row) in enumerate(district_summary.head(10).iterrows(), 1):
+            f.write(f"  {idx}. {district}: {row['total_enrollments']:,}\n")
     
-    f.write("\nKEY INSIGHTS:\n")
-    for insight in insights:
-        f.write(f"  {insight}\n")
+        f.write("\nKEY INSIGHTS:\n")
+        for insight in insights:
+            f.write(f"  {insight}\n")
     
-    f.write("\n" + "="*80)
-
-print("  ✓ Saved: enrollment_analysis_report.txt")
+        f.write("\n" + "="*80)
+    plan.mark_saved('analysis_outputs/enrollment_analysis_report.txt')
+    print("  ✓ Saved: enrollment_analysis_report.txt")
 
 print("\n" + "="*80)
 print("✅ ENROLLMENT ANALYSIS COMPLETE!")
@@ -8,6 +8,7 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 import json
+from district_names import canonicalize_districts
 
 print("="*80)
 print("MAHARASHTRA AADHAAR DATA - COMPREHENSIVE ANALYSIS")
@@ -29,7 +30,7 @@ print(f"\nBasic Statistics:\n{enroll_df.describe()}")
 # Clean and analyze
 enroll_df.columns = [c.strip().lower() for c in enroll_df.columns]
 enroll_df['date'] = pd.to_datetime(enroll_df['date'], format='%d-%m-%Y', errors='coerce')
-enroll_df['district'] = enroll_df['district'].str.strip(). str.title()
+enroll_df['district'], _ = canonicalize_districts(enroll_df)
 
 print(f"\n📈 KEY INSIGHTS - ENROLLMENTS:")
 print(f"  • Total Enrollments: {enroll_df[['age_0_5', 'age_5_17', 'age_18_greater']].sum().sum():,}")
@@ -59,7 +60,7 @@ print(f"\nMissing Values:\n{bio_df.isnull().sum()}")
 # Clean
 bio_df.columns = [c.strip().lower() for c in bio_df.columns]
 bio_df['date'] = pd.to_datetime(bio_df['date'], format='%d-%m-%Y', errors='coerce')
-bio_df['district'] = bio_df['district'].str.strip().str.title()
+bio_df['district'], _ = canonicalize_districts(bio_df)
 
 bio_cols = [c for c in bio_df.columns if c.startswith('bio_')]
 print(f"\n📈 KEY INSIGHTS - BIOMETRIC UPDATES:")
@@ -84,7 +85,7 @@ print(f"\nMissing Values:\n{demo_df.isnull().sum()}")
 # Clean
 demo_df.columns = [c.strip().lower() for c in demo_df.columns]
 demo_df['date'] = pd.to_datetime(demo_df['date'], format='%d-%m-%Y', errors='coerce')
-demo_df['district'] = demo_df['district'].str.strip().str.title()
+demo_df['district'], _ = canonicalize_districts(demo_df)
 
 demo_cols = [c for c in demo_df.columns if c.startswith('demo_')]
 print(f"\n📈 KEY INSIGHTS - DEMOGRAPHIC UPDATES:")
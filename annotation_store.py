@@ -0,0 +1,149 @@
+"""
+ANNOTATION STORE - GovOptima Platform
+District annotations/comments on top of the SQLite `comments` table.
+A single long-lived WAL-mode writer thread group-commits inserts from all
+offices; reads use per-thread connections so they never block on writes.
+"""
+
+import asyncio
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from typing import List, Optional, Tuple
+
+
+class AnnotationStore:
+    def __init__(self, db_path: str, batch_size: int = 500):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self._pending = queue.Queue()
+        self._local = threading.local()
+
+        self._write_conn = self._connect()
+        self._write_conn.execute("PRAGMA journal_mode=WAL")
+        self._write_conn.execute('''CREATE TABLE IF NOT EXISTS comments
+                                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                     username TEXT,
+                                     comment TEXT,
+                                     district TEXT,
+                                     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+        self._write_conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_comments_district_ts ON comments (district, timestamp)"
+        )
+        self._write_conn.commit()
+
+        self._writer = threading.Thread(target=self._write_loop, name="annotation-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, avoids an fsync per commit
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    # === WRITES ===
+
+    def submit(self, rows: List[Tuple[str, str, str]]) -> Future:
+        """Queues (username, comment, district) rows; the future resolves to their new ids."""
+        future = Future()
+        if not _valid_rows(rows):
+            # Rejected here so a bad request can never reach (and fail) a shared batch
+            future.set_exception(TypeError("rows must be (username, comment, district) tuples of text values"))
+            return future
+        self._pending.put((rows, future))
+        return future
+
+    async def add(self, rows: List[Tuple[str, str, str]]) -> List[int]:
+        """Non-blocking insert for use from the event loop."""
+        return await asyncio.wrap_future(self.submit(rows))
+
+    def _write_loop(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            batch = [item]
+            # Drain whatever else queued up while we were committing (group commit)
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._pending.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._flush(batch)
+                    return
+                batch.append(item)
+            self._flush(batch)
+
+    def _flush(self, batch):
+        conn = self._write_conn
+        try:
+            results = []
+            with conn:  # One transaction for the whole batch
+                conn.execute("BEGIN")
+                for rows, _ in batch:
+                    # Each request in its own savepoint: a failing one is undone alone
+                    conn.execute("SAVEPOINT request")
+                    try:
+                        cur = conn.executemany(
+                            "INSERT INTO comments (username, comment, district) VALUES (?, ?, ?)", rows
+                        )
+                        # AUTOINCREMENT ids are contiguous inside a single writer's transaction
+                        last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                        results.append(list(range(last_id - cur.rowcount + 1, last_id + 1)))
+                    except (sqlite3.Error, ValueError, TypeError) as e:
+                        conn.execute("ROLLBACK TO request")
+                        results.append(e)
+                    conn.execute("RELEASE request")
+            for (_, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    # === READS ===
+
+    def list(self, district: Optional[str] = None, limit: int = 50, cursor: Optional[str] = None):
+        """Newest-first page of annotations; pass back `next_cursor` to get the following page."""
+        clauses, params = [], []
+        if district:
+            clauses.append("district = ?")
+            params.append(district)
+        if cursor:
+            ts, last_id = cursor.rsplit('|', 1)
+            clauses.append("(timestamp < ? OR (timestamp = ? AND id < ?))")
+            params.extend([ts, ts, int(last_id)])
+
+        sql = "SELECT id, username, comment, district, timestamp FROM comments"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        params.append(limit)
+
+        rows = [dict(r) for r in self._reader().execute(sql, params).fetchall()]
+        next_cursor = f"{rows[-1]['timestamp']}|{rows[-1]['id']}" if len(rows) == limit else None
+        return {"annotations": rows, "next_cursor": next_cursor}
+
+    def close(self):
+        self._pending.put(None)
+        self._writer.join(timeout=5)
+        self._write_conn.close()
+
+
+def _valid_rows(rows) -> bool:
+    try:
+        return all(len(row) == 3 and all(v is None or isinstance(v, (str, int, float)) for v in row) for row in rows)
+    except TypeError:
+        return False
@@ -0,0 +1,102 @@
+"""
+ASSET CACHE - GovOptima Platform
+Dashboard and static assets held in memory, precompressed once (gzip and,
+if the `brotli` package is installed, br) and served with strong ETags.
+Entries reload automatically when the file on disk changes.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # Optional: fall back to gzip only
+    brotli = None
+
+
+def _parse_accept_encoding(header: str) -> dict:
+    """{coding: q} from an Accept-Encoding header; a missing or malformed q counts as 1."""
+    weights = {}
+    for part in header.split(','):
+        coding, *params = [p.strip() for p in part.split(';')]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    pass
+        weights[coding.lower()] = q
+    return weights
+
+
+def _choose_encoding(header: str, variants):
+    """Highest-q acceptable precompressed variant (br before gzip on ties), or None for identity."""
+    weights = _parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for coding in ('br', 'gzip'):
+        q = weights.get(coding, weights.get('*', 0.0))
+        if coding in variants and q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class CachedAsset:
+    def __init__(self, path: str, stat, body: bytes, media_type: str):
+        self.path = path
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        self.media_type = media_type
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        # Strong ETags must differ per encoding, since the bytes differ
+        self.variants = {None: (body, f'"{digest}"')}
+        self.variants['gzip'] = (gzip.compress(body, compresslevel=9), f'"{digest}-gz"')
+        if brotli is not None:
+            self.variants['br'] = (brotli.compress(body, quality=11), f'"{digest}-br"')
+
+
+class AssetCache:
+    def __init__(self):
+        self._assets = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> CachedAsset:
+        stat = os.stat(path)
+        asset = self._assets.get(path)
+        if asset is not None and asset.signature == (stat.st_mtime_ns, stat.st_size):
+            return asset
+
+        with self._lock:
+            asset = self._assets.get(path)
+            if asset is None or asset.signature != (stat.st_mtime_ns, stat.st_size):
+                with open(path, 'rb') as f:
+                    body = f.read()
+                media_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+                if media_type.startswith('text/') or media_type == 'application/javascript':
+                    media_type += '; charset=utf-8'
+                asset = CachedAsset(path, stat, body, media_type)
+                self._assets[path] = asset
+        return asset
+
+    def response(self, request, path: str, cache_control: str = 'no-cache') -> Response:
+        """Serves `path` honouring Accept-Encoding and If-None-Match."""
+        asset = self.get(path)
+
+        encoding = _choose_encoding(request.headers.get('accept-encoding', ''), asset.variants)
+        body, etag = asset.variants[encoding]
+
+        headers = {'ETag': etag, 'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+        if_none_match = request.headers.get('if-none-match', '')
+        if etag in [t.strip() for t in if_none_match.split(',')] or if_none_match.strip() == '*':
+            return Response(status_code=304, headers=headers)
+
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return Response(content=body, media_type=asset.media_type, headers=headers)
@@ -0,0 +1,148 @@
+"""
+ACTIVITY CUBE - GovOptima Platform
+Dense [date, district, metric] numpy representation of the three feeds.
+Dates and districts are integer-coded axes; each dataset is scatter-added
+into the cube with bincount, so no hash merge on string keys is needed.
+Derived indices are whole-array expressions and per-district / per-date
+slices are zero-copy views.
+"""
+
+import numpy as np
+import pandas as pd
+
+# (dataset, source column -> cube metric) in the same layout process_data's merges produce
+SOURCES = [
+    ('enrollment', {'pincode': 'pincode_enroll', 'age_0_5': 'age_0_5', 'age_5_17': 'age_5_17',
+                    'age_18_greater': 'age_18_greater'}),
+    ('biometric', {'pincode': 'pincode_bio', 'bio_age_5_17': 'bio_age_5_17', 'bio_age_17_': 'bio_age_17_'}),
+    ('demographic', {'pincode': 'pincode', 'demo_age_5_17': 'demo_age_5_17', 'demo_age_17_': 'demo_age_17_'}),
+]
+BASE_METRICS = [metric for _, columns in SOURCES for metric in columns.values()]
+DERIVED_METRICS = ['total_enrollment', 'total_biometric', 'total_demographic', 'total_activity',
+                   'ivi', 'bsr', 'api', 'migration_intensity', 'stress_index']
+METRICS = BASE_METRICS + DERIVED_METRICS
+
+
+def _pincode_columns(has_pincode: dict) -> dict:
+    """combined_df column each feed's pincode ends up in, following process_data's merge suffixes.
+
+    Absent feeds' pincodes are dropped (None). Enrollment and biometric only get
+    _enroll/_bio suffixes when both have one; demographic gets _demo when the
+    first merge left an unsuffixed 'pincode'.
+    """
+    enroll, bio, demo = (has_pincode[n] for n in ('enrollment', 'biometric', 'demographic'))
+    names = {'enrollment': None, 'biometric': None, 'demographic': None}
+    if enroll and bio:
+        names.update(enrollment='pincode_enroll', biometric='pincode_bio')
+    elif enroll or bio:
+        names['enrollment' if enroll else 'biometric'] = 'pincode'
+    if demo:
+        names['demographic'] = 'pincode_demo' if (enroll != bio) else 'pincode'
+    return names
+
+
+def _recode(codes: np.ndarray, mapping: np.ndarray) -> np.ndarray:
+    """Maps per-frame factorize codes onto axis positions (-1 stays -1)."""
+    return np.where(codes >= 0, mapping.take(np.maximum(codes, 0)), -1)
+
+
+class ActivityCube:
+    def __init__(self, dates, districts, values: np.ndarray, present: np.ndarray):
+        self.dates = pd.DatetimeIndex(dates)
+        self.districts = pd.Index(districts)
+        self.values = values          # float64 [date, district, metric]
+        self.present = present        # bool [date, district]: cell has at least one source row
+        self.metric_index = {m: i for i, m in enumerate(METRICS)}
+        self.pincode_columns = {name: columns['pincode'] for name, columns in SOURCES}
+
+    @classmethod
+    def from_frames(cls, enrollment: pd.DataFrame, biometric: pd.DataFrame, demographic: pd.DataFrame):
+        frames = {'enrollment': enrollment, 'biometric': biometric, 'demographic': demographic}
+
+        # Factorize each feed once; only the unique keys are looked up on the shared axes
+        keys = {name: (pd.factorize(f['date']), pd.factorize(f['district'].astype(str)))
+                for name, f in frames.items()}
+
+        # Integer-coded axes over the union of keys (rows with a missing date are dropped, as groupby does)
+        dates = pd.DatetimeIndex(np.concatenate([d[1] for d, _ in keys.values()])).dropna().unique().sort_values()
+        districts = pd.Index(np.concatenate([k[1] for _, k in keys.values()])).unique().sort_values()
+        n_dates, n_districts = len(dates), len(districts)
+        n_cells = n_dates * n_districts
+
+        values = np.zeros((n_dates, n_districts, len(METRICS)), dtype=np.float64)
+        present = np.zeros(n_cells, dtype=bool)
+        flat_values = values.reshape(n_cells, len(METRICS))
+        metric_index = {m: i for i, m in enumerate(METRICS)}
+
+        for name, columns in SOURCES:
+            df = frames[name]
+            (date_codes, date_uniques), (district_codes, district_uniques) = keys[name]
+            date_codes = _recode(date_codes, dates.get_indexer(date_uniques))
+            district_codes = _recode(district_codes, districts.get_indexer(district_uniques))
+            valid = (date_codes >= 0) & (district_codes >= 0)
+            flat = date_codes[valid] * n_districts + district_codes[valid]
+
+            present |= np.bincount(flat, minlength=n_cells) > 0
+            for source_col, metric in columns.items():
+                if source_col not in df.columns:   # Optional column (pincode) absent from this feed
+                    continue
+                weights = df[source_col].to_numpy(dtype=np.float64)[valid]
+                flat_values[:, metric_index[metric]] = np.bincount(flat, weights=weights, minlength=n_cells)
+
+        cube = cls(dates, districts, values, present.reshape(n_dates, n_districts))
+        cube.pincode_columns = _pincode_columns({name: 'pincode' in f.columns for name, f in frames.items()})
+        cube.compute_derived()
+        return cube
+
+    def metric(self, name: str) -> np.ndarray:
+        """[date, district] view of one metric."""
+        return self.values[:, :, self.metric_index[name]]
+
+    def compute_derived(self):
+        """Totals and indices for every cell at once (same formulas as process_data)."""
+        m = self.metric
+        np.add(m('age_0_5') + m('age_5_17'), m('age_18_greater'), out=m('total_enrollment'))
+        np.add(m('bio_age_5_17'), m('bio_age_17_'), out=m('total_biometric'))
+        np.add(m('demo_age_5_17'), m('demo_age_17_'), out=m('total_demographic'))
+
+        activity = m('total_activity')
+        np.add(m('total_enrollment') + m('total_biometric'), m('total_demographic'), out=activity)
+        activity[activity == 0] = 1  # Avoid division by zero
+
+        np.multiply((m('total_demographic') + m('total_biometric')) / activity, 100, out=m('ivi'))
+        np.multiply(m('total_biometric') / activity, 100, out=m('bsr'))
+        np.add(m('total_enrollment') * 1.0 + m('total_biometric') * 0.5, m('total_demographic') * 0.2, out=m('api'))
+        np.multiply(m('total_demographic') / activity, 10, out=m('migration_intensity'))
+        m('stress_index')[...] = m('api')
+
+    def district_slice(self, district: str) -> np.ndarray:
+        """[date, metric] view for one district."""
+        return self.values[:, self.districts.get_loc(district), :]
+
+    def date_slice(self, date) -> np.ndarray:
+        """[district, metric] view for one date."""
+        return self.values[self.dates.get_loc(pd.Timestamp(date)), :, :]
+
+    def district_means(self, metrics) -> pd.DataFrame:
+        """Mean of each metric over the dates a district actually reported."""
+        idx = [self.metric_index[m] for m in metrics]
+        counts = self.present.sum(axis=0)
+        sums = np.einsum('dk,dkm->km', self.present, self.values[:, :, idx], dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums / counts[:, None]
+        frame = pd.DataFrame(means, columns=metrics)
+        frame.insert(0, 'district', self.districts.to_numpy(dtype=object))
+        return frame[counts > 0].reset_index(drop=True)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Long (date, district) frame of the populated cells, laid out like combined_df."""
+        date_codes, district_codes = np.nonzero(self.present)
+        frame = pd.DataFrame(self.values[date_codes, district_codes, :], columns=METRICS)
+        frame.insert(0, 'district', self.districts.to_numpy(dtype=object)[district_codes])
+        frame.insert(0, 'date', self.dates[date_codes])
+        # Pincode sums named (or dropped) the way the merges in process_data would have
+        pincode_metrics = {columns['pincode']: self.pincode_columns[name] for name, columns in SOURCES}
+        if any(metric != column for metric, column in pincode_metrics.items()):
+            frame = frame.drop(columns=[m for m, c in pincode_metrics.items() if c is None])
+            frame = frame.rename(columns={m: c for m, c in pincode_metrics.items() if c is not None})
+        return frame
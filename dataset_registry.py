@@ -0,0 +1,173 @@
+"""
+DATASET REGISTRY - GovOptima Platform
+Named datasets (per state, per year, per scenario) served side by side from
+one process. Each is loaded on first request, kept while it is in use and
+evicted least-recently-used first once resident datasets exceed a memory
+budget. Load/eviction counts and timings are kept for /api/datasets.
+`on_evict(name, analyst)` lets callers drop what they derived from an evicted
+dataset; it is skipped while another resident dataset shares its data_dir.
+
+Datasets come from a JSON file ({"name": "path/to/data_dir", ...}) or from
+the subdirectories of a root directory (one dataset per subdirectory).
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from analysis import GovernanceAnalyst
+
+DEFAULT_MEMORY_BUDGET_MB = 1024
+
+
+def discover_datasets(config_path: str = None, root: str = None):
+    """{name: data_dir} from a datasets.json file and/or a directory of dataset folders."""
+    datasets = {}
+    if root and os.path.isdir(root):
+        for entry in sorted(os.listdir(root)):
+            path = os.path.join(root, entry)
+            if os.path.isdir(path) and not entry.startswith('.'):
+                datasets[entry] = path
+    if config_path and os.path.exists(config_path):
+        base = os.path.dirname(os.path.abspath(config_path))
+        with open(config_path, 'r', encoding='utf-8') as f:
+            for name, path in json.load(f).items():
+                datasets[name] = path if os.path.isabs(path) else os.path.join(base, path)
+    return datasets
+
+
+def analyst_memory(analyst: GovernanceAnalyst) -> int:
+    """Resident bytes of an analyst's frames (deep, so string columns count)."""
+    total = 0
+    for df in (analyst.combined_df, analyst.enrollment_df, analyst.biometric_df, analyst.demographic_df):
+        if df is not None:
+            total += int(df.memory_usage(deep=True, index=True).sum())
+    if analyst.cube is not None:
+        total += analyst.cube.values.nbytes
+    return total
+
+
+class DatasetRegistry:
+    def __init__(self, datasets: dict, memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB, loader=None,
+                 on_evict=None):
+        self.paths = dict(datasets)
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.loader = loader or self._load
+        self.on_evict = on_evict
+        self._resident = OrderedDict()   # name -> (analyst, bytes); most recently used last
+        self._pinned = set()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.metrics = {"hits": 0, "misses": 0, "loads": 0, "load_failures": 0, "evictions": 0,
+                        "load_seconds_total": 0.0, "evicted_bytes_total": 0}
+        self._dataset_metrics = {}
+
+    @staticmethod
+    def _load(name: str, path: str) -> GovernanceAnalyst:
+        analyst = GovernanceAnalyst(path)
+        if not analyst.load_data():
+            raise RuntimeError(f"Dataset {name!r} could not be loaded from {path}")
+        analyst.process_data()
+        return analyst
+
+    def register(self, name: str, analyst: GovernanceAnalyst, pin: bool = True):
+        """Adds an already-built dataset (e.g. the default one); pinned datasets are never evicted."""
+        with self._lock:
+            self.paths.setdefault(name, analyst.data_dir)
+            self._resident[name] = (analyst, analyst_memory(analyst))
+            if pin:
+                self._pinned.add(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.paths
+
+    def get(self, name: str) -> GovernanceAnalyst:
+        """Returns the named dataset, loading it on first use. Raises KeyError if unknown."""
+        if name not in self.paths:
+            raise KeyError(name)
+
+        with self._lock:
+            if name in self._resident:
+                self._resident.move_to_end(name)
+                self.metrics["hits"] += 1
+                return self._resident[name][0]
+            self.metrics["misses"] += 1
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # One loader per dataset; concurrent first requests wait for it instead of loading twice
+        with load_lock:
+            with self._lock:
+                if name in self._resident:
+                    self._resident.move_to_end(name)
+                    return self._resident[name][0]
+
+            started = time.perf_counter()
+            try:
+                analyst = self.loader(name, self.paths[name])
+            except Exception:
+                with self._lock:
+                    self.metrics["load_failures"] += 1
+                raise
+            seconds = time.perf_counter() - started
+            size = analyst_memory(analyst)
+
+            with self._lock:
+                self._resident[name] = (analyst, size)
+                self.metrics["loads"] += 1
+                self.metrics["load_seconds_total"] += seconds
+                stats = self._dataset_metrics.setdefault(name, {"loads": 0, "evictions": 0})
+                stats["loads"] += 1
+                stats["last_load_seconds"] = round(seconds, 3)
+                evicted = self._evict(keep=name)
+                in_use = {a.data_dir for a, _ in self._resident.values()}
+            # Outside the registry lock: the callback takes locks of its own
+            if self.on_evict is not None:
+                for evicted_name, evicted_analyst in evicted:
+                    if evicted_analyst.data_dir not in in_use:
+                        self.on_evict(evicted_name, evicted_analyst)
+            return analyst
+
+    def _evict(self, keep: str):
+        """Drops least-recently-used datasets until the resident set fits the budget (lock held).
+
+        Returns the evicted (name, analyst) pairs.
+        """
+        evicted = []
+        for name in list(self._resident):
+            if self.resident_bytes <= self.memory_budget:
+                break
+            if name == keep or name in self._pinned:
+                continue
+            analyst, size = self._resident.pop(name)
+            evicted.append((name, analyst))
+            self.metrics["evictions"] += 1
+            self.metrics["evicted_bytes_total"] += size
+            self._dataset_metrics.setdefault(name, {"loads": 0, "evictions": 0})["evictions"] += 1
+        return evicted
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(size for _, size in self._resident.values())
+
+    def status(self):
+        with self._lock:
+            datasets = []
+            for name, path in sorted(self.paths.items()):
+                entry = self._resident.get(name)
+                datasets.append({
+                    "name": name,
+                    "path": path,
+                    "resident": entry is not None,
+                    "pinned": name in self._pinned,
+                    "memory_mb": round(entry[1] / 1024 / 1024, 2) if entry else 0,
+                    "version": entry[0].version if entry else None,
+                    **self._dataset_metrics.get(name, {"loads": 0, "evictions": 0}),
+                })
+            return {
+                "datasets": datasets,
+                "resident_mb": round(self.resident_bytes / 1024 / 1024, 2),
+                "memory_budget_mb": round(self.memory_budget / 1024 / 1024, 2),
+                "metrics": dict(self.metrics, load_seconds_total=round(self.metrics["load_seconds_total"], 3)),
+            }
@@ -0,0 +1,122 @@
+"""
+DISTRICT NAME CANONICALIZATION - GovOptima Platform
+Maps raw district spellings to canonical names using the maintained alias
+table in district_aliases.csv (spelling variants, renamed districts) with a
+fuzzy fallback. Work is done once per unique (state, name) pair and mapped
+back to rows through integer codes, so cost no longer scales with row count.
+"""
+
+import csv
+import difflib
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+ALIAS_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'district_aliases.csv')
+FUZZY_CUTOFF = 0.88
+
+
+def name_key(name: str) -> str:
+    """Comparison key: lowercase letters only ('Mumbai( Sub Urban )' -> 'mumbaisuburban')."""
+    return re.sub(r'[^a-z]', '', str(name).lower())
+
+
+class DistrictCanonicalizer:
+    def __init__(self, alias_path: str = ALIAS_TABLE_PATH, fuzzy_cutoff: float = FUZZY_CUTOFF):
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.aliases = {}        # (state_key, name_key) -> canonical, canonical names included
+        self._resolved = {}      # (state, raw) -> (canonical, method, score)
+        self.report = {"unmatched": [], "fuzzy": [], "unique_names": 0}
+
+        if os.path.exists(alias_path):
+            with open(alias_path, 'r', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    state_key = name_key(row.get('state', ''))
+                    self.aliases[(state_key, name_key(row['name']))] = row['canonical']
+                    self.aliases[(state_key, name_key(row['canonical']))] = row['canonical']
+
+    def resolve(self, state, raw):
+        """Returns (canonical_name, method, score) for one raw spelling."""
+        cache_key = (state, raw)
+        if cache_key in self._resolved:
+            return self._resolved[cache_key]
+
+        state_key = name_key(state) if state is not None else ''
+        key = name_key(raw)
+        result = None
+
+        if (state_key, key) in self.aliases:
+            result = (self.aliases[(state_key, key)], 'alias', 1.0)
+        elif ('', key) in self.aliases:
+            result = (self.aliases[('', key)], 'alias', 1.0)
+        elif not state_key:
+            # No state column: accept an exact key match from any state
+            exact = [v for (scope, k), v in self.aliases.items() if k == key]
+            if exact:
+                result = (exact[0], 'alias', 1.0)
+
+        if result is None:
+            # Fuzzy-match against known spellings (aliases included) of the same state only
+            candidates = {k: v for (scope, k), v in self.aliases.items()
+                          if scope == state_key or not state_key or not scope}
+            match = difflib.get_close_matches(key, list(candidates), n=1, cutoff=self.fuzzy_cutoff)
+            if match:
+                score = difflib.SequenceMatcher(None, key, match[0]).ratio()
+                result = (candidates[match[0]], 'fuzzy', round(score, 3))
+
+        if result is None:
+            # Unknown district: keep the legacy cleanup so it still groups sensibly
+            result = (' '.join(str(raw).split()).title(), 'unmatched', 0.0)
+
+        self._resolved[cache_key] = result
+        return result
+
+    def canonicalize(self, df: pd.DataFrame) -> pd.Series:
+        """Canonical district names for every row of `df` (needs a 'district' column)."""
+        series, self.report = self.canonicalize_with_report(df)
+        return series
+
+    def canonicalize_with_report(self, df: pd.DataFrame):
+        """Like canonicalize(), but returns (series, report) without touching shared state."""
+        if 'state' in df.columns:
+            codes, uniques = pd.MultiIndex.from_arrays([df['state'], df['district']]).factorize()
+            pairs = list(uniques)
+        else:
+            codes, uniques = pd.factorize(df['district'])
+            pairs = [(None, raw) for raw in uniques]
+
+        resolved = [self.resolve(state, raw) for state, raw in pairs]
+        names = np.array([r[0] for r in resolved], dtype=object)
+        rows_per_name = np.bincount(codes[codes >= 0], minlength=len(pairs))
+
+        report = {
+            "unique_names": len(pairs),
+            "unmatched": [
+                {"state": state, "name": raw, "rows": int(rows_per_name[i])}
+                for i, ((state, raw), r) in enumerate(zip(pairs, resolved)) if r[1] == 'unmatched'
+            ],
+            "fuzzy": [
+                {"state": state, "name": raw, "canonical": r[0], "score": r[2]}
+                for (state, raw), r in zip(pairs, resolved) if r[1] == 'fuzzy'
+            ]
+        }
+
+        # Missing districts stay missing (code -1), everything else is a take by code
+        out = np.empty(len(codes), dtype=object)
+        valid = codes >= 0
+        out[valid] = names[codes[valid]]
+        out[~valid] = 'Nan'
+        return pd.Series(out, index=df.index, name='district'), report
+
+
+_default = None
+
+
+def canonicalize_districts(df: pd.DataFrame):
+    """Canonicalizes df['district'] with the shared alias table. Returns (series, report)."""
+    global _default
+    if _default is None:
+        _default = DistrictCanonicalizer()
+    return _default.canonicalize_with_report(df)
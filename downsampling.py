@@ -0,0 +1,106 @@
+"""
+DOWNSAMPLING - GovOptima Platform
+Shape-preserving reduction of long time series before they are sent to the
+charts. Two methods:
+  - lttb:   Largest-Triangle-Three-Buckets (Steinarsson), keeps the visual shape
+  - minmax: per-bucket minimum and maximum, keeps every spike and dip
+Multi-series frames keep the union of the points picked for each series, so
+no line loses its extremes. max_points caps the combined output: it is split
+evenly across the series, and when it is too small for every series to get a
+meaningful share, the leading series get theirs and the rest get what is left.
+"""
+
+import numpy as np
+import pandas as pd
+
+METHODS = ('lttb', 'minmax')
+
+
+def _as_float_x(x) -> np.ndarray:
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        # Days since the first point: keeps the triangle areas well conditioned
+        ns = x.astype('datetime64[ns]').astype(np.int64)
+        return (ns - ns[0]) / 86_400e9
+    return x.astype(np.float64)
+
+
+def lttb_indices(x, y, n: int) -> np.ndarray:
+    """Indices of the `n` points LTTB keeps (first and last always included)."""
+    y = np.asarray(y, dtype=np.float64)
+    size = len(y)
+    if n >= size or n < 3:
+        return np.arange(size)
+    x = _as_float_x(x)
+
+    # n - 2 buckets over the inner points; bucket averages are computed once, vectorized
+    edges = np.linspace(1, size - 1, n - 1).astype(np.int64)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[1:size - 1], edges[:-1] - 1) / counts
+    avg_y = np.add.reduceat(y[1:size - 1], edges[:-1] - 1) / counts
+    # The "next bucket" of the last bucket is the final point
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(n, dtype=np.int64)
+    selected[0], selected[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Twice the triangle area (a, candidate, next bucket average) for every candidate at once
+        area = np.abs((x[a] - next_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y, buckets: int) -> np.ndarray:
+    """Indices of each bucket's min and max (plus first and last point), fully vectorized."""
+    y = np.asarray(y, dtype=np.float64)
+    size = len(y)
+    if buckets * 2 + 2 >= size or buckets < 1:
+        return np.arange(size)
+
+    edges = np.linspace(0, size, buckets + 1).astype(np.int64)
+    width = int(np.diff(edges).max())
+    idx = edges[:-1, None] + np.arange(width)          # buckets x width, padded past each bucket's end
+    valid = idx < edges[1:, None]
+    values = y[np.minimum(idx, size - 1)]
+    lows = idx[np.arange(buckets), np.argmin(np.where(valid, values, np.inf), axis=1)]
+    highs = idx[np.arange(buckets), np.argmax(np.where(valid, values, -np.inf), axis=1)]
+    return np.unique(np.concatenate([[0, size - 1], lows, highs]))
+
+
+def _series_budgets(max_points: int, series: int, smallest: int):
+    """Points per series summing to at most max_points; leading series take any remainder."""
+    share, extra = divmod(max_points, series)
+    if share >= smallest:
+        return [share + (i < extra) for i in range(series)]
+    full, rest = divmod(max_points, smallest)
+    return [smallest] * full + [rest] + [0] * (series - full - 1)
+
+
+def downsample_frame(df: pd.DataFrame, y_columns, max_points: int, x_column: str = None,
+                     method: str = 'lttb') -> pd.DataFrame:
+    """At most `max_points` rows of `df` (ordered by x) in total, keeping the shape of every y column."""
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {list(METHODS)}")
+    if max_points is None or len(df) <= max_points:
+        return df
+
+    x = df[x_column].to_numpy() if x_column else np.arange(len(df))
+    # Smallest budget each method can use: LTTB's first/middle/last, min/max's one bucket plus endpoints
+    smallest = 3 if method == 'lttb' else 4
+    picked = [np.empty(0, dtype=np.int64)]
+    for col, budget in zip(y_columns, _series_budgets(max_points, max(1, len(y_columns)), smallest)):
+        if budget < smallest:
+            # Too few points for the method: evenly spaced samples
+            picked.append(np.linspace(0, len(df) - 1, budget).round().astype(np.int64))
+            continue
+        y = np.nan_to_num(df[col].to_numpy(dtype=np.float64))
+        if method == 'lttb':
+            picked.append(lttb_indices(x, y, budget))
+        else:
+            picked.append(minmax_indices(y, (budget - 2) // 2))
+    keep = np.unique(np.concatenate(picked))
+    return df.iloc[keep].reset_index(drop=True)
@@ -0,0 +1,808 @@
+"""
+EQUIVALENCE HARNESS - GovOptima Platform
+Checks on randomized datasets that the optimized paths return the same
+numbers as the pandas reference, before a faster engine is trusted:
+  - engine:    process_data(engine=...) against engine='pandas', column by
+               column, plus the content fingerprint
+  - analyst:   district stats, stress heatmap, deep dive and forecast computed
+               on each engine's output against the pandas one
+  - derived:   scenario engine, query engine, load statistics, load profiles
+               and the similarity index against plain pandas/numpy
+               re-implementations of the same numbers
+  - stores:    combined_df and its fingerprint after a round trip through
+               the SQL analytics store (fast start) and the shared data plane
+  - endpoints: every read endpoint of main.py (plus the scenario, allocation
+               and query POSTs) served from each engine's dataset against the
+               pandas dataset
+Generated datasets mix random activity with the cases vectorized rewrites get
+wrong: districts missing from some feeds, all-zero districts and rows, dates
+present in only one feed, calendar gaps, duplicate rows, single-row districts,
+invalid dates, unknown districts and alias / case / punctuation variants of
+district names. Every run also covers, whatever the seeds:
+  - a dataset whose demographic feed is header-only, compared like a seed
+  - a dataset whose feeds are all header-only, and one with no source files
+    (the failed-load fallback), both compared like a seed and each served
+    by a freshly imported main.py, where no endpoint may fail with a 5xx
+    or answer 2xx with an error payload
+  - a main.py started on the first seed's data, its caches warmed, then
+    reloaded to the header-only feeds: every response must equal the fresh
+    server's on that dataset
+Not covered: incremental store updates (update_districts) and the
+multi-worker shared-plane handoff (publish lock, refresh middleware).
+
+Usage:
+    python equivalence.py                          # 3 seeds, every check
+    python equivalence.py --seeds 10 --rows 20000
+    python equivalence.py --skip-endpoints --keep /tmp/equivalence
+Exits 1 when any value differs beyond --rtol/--atol.
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ENGINES = ('pandas', 'cube')
+REFERENCE_ENGINE = 'pandas'
+DEFAULT_SEEDS = 3
+DEFAULT_ROWS = 4000
+DEFAULT_RTOL = 1e-9
+DEFAULT_ATOL = 1e-6
+MAX_REPORTED = 20
+# Response fields that legitimately differ between two datasets holding the same data
+IGNORED_KEYS = {'version', 'content_version', 'cached', 'district_cache'}
+ALIAS_TABLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'district_aliases.csv')
+FEEDS = {
+    'enrollment': ('Enrollment_Data.csv', ['age_0_5', 'age_5_17', 'age_18_greater']),
+    'biometric': ('Biometric_Data.csv', ['bio_age_5_17', 'bio_age_17_']),
+    'demographic': ('Demographic_Data.csv', ['demo_age_5_17', 'demo_age_17_']),
+}
+# Datasets checked on every run besides the seeded ones: name -> header-only feeds (None: no files at all)
+EDGE_DATASETS = {
+    'empty-demographic': ('demographic',),
+    'empty': tuple(FEEDS),
+    'failed-load': None,
+}
+# Edge datasets main.py is also started on, in a fresh process each
+BOOTED_DATASETS = ('empty', 'failed-load')
+
+
+# --- Randomized datasets -----------------------------------------------------
+
+def _district_spellings():
+    """Canonical Maharashtra districts -> every spelling the alias table accepts for them."""
+    spellings = {}
+    with open(ALIAS_TABLE, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            spellings.setdefault(row['canonical'], set()).update({row['canonical'], row['name']})
+    return {name: sorted(names) for name, names in sorted(spellings.items())}
+
+
+def _respell(rng, name: str, spellings) -> str:
+    """Same district, different raw spelling: alias, case, padding or a trailing marker."""
+    choice = rng.integers(0, 6)
+    if choice == 0:
+        return str(rng.choice(spellings))
+    if choice == 1:
+        return name.upper()
+    if choice == 2:
+        return name.lower()
+    if choice == 3:
+        return f"  {name} "
+    if choice == 4:
+        return f"{name} *"
+    return name
+
+
+def generate_sources(directory: str, seed: int, rows: int = DEFAULT_ROWS, empty_feeds=()):
+    """Writes the three source CSVs for one randomized dataset; returns a description of its edge cases.
+
+    Feeds named in `empty_feeds` are written header-only.
+    """
+    rng = np.random.default_rng(seed)
+    spellings = _district_spellings()
+    names = list(spellings)
+    districts = [str(d) for d in rng.choice(names, size=int(rng.integers(8, len(names) + 1)), replace=False)]
+    calendar = pd.date_range('2025-01-01', periods=int(rng.integers(40, 160)), freq='D')
+    # Calendar gaps: days with no activity in any feed
+    calendar = calendar[rng.random(len(calendar)) > 0.12]
+
+    edge = {
+        'enrollment_only': districts[0],     # Missing from the biometric and demographic feeds
+        'no_demographic': districts[1],      # Missing from the demographic feed only
+        'zero_activity': districts[2],       # Rows everywhere, every count zero
+        'single_row': districts[3],          # One enrollment row, nothing else
+        'unknown': 'Unknownpur',             # Not in the alias table
+        'empty_feeds': list(empty_feeds),    # Header-only source files
+    }
+    pincodes = {d: rng.integers(400001, 445999, size=int(rng.integers(1, 6))) for d in districts}
+
+    os.makedirs(directory, exist_ok=True)
+    for feed, (filename, columns) in FEEDS.items():
+        pool = [d for d in districts if d != edge['single_row']]
+        if feed != 'enrollment':
+            pool.remove(edge['enrollment_only'])
+        if feed == 'demographic':
+            pool.remove(edge['no_demographic'])
+        # Each feed also skips its own random days, so some dates exist in one feed only
+        feed_days = calendar[rng.random(len(calendar)) > 0.1]
+        n = max(1, int(rows * rng.uniform(0.5, 1.5)))
+        chosen = rng.choice(pool, size=n)
+        counts = rng.poisson(rng.lognormal(1.5, 1.2, size=(n, 1)), size=(n, len(columns)))
+        counts[rng.random(n) < 0.08] = 0                      # Zero-activity rows
+        counts[chosen == edge['zero_activity']] = 0
+        frame = pd.DataFrame(counts, columns=columns)
+        frame.insert(0, 'date', rng.choice(feed_days, size=n))
+        frame.insert(1, 'state', 'Maharashtra')
+        frame.insert(2, 'district', [_respell(rng, d, spellings[d]) for d in chosen])
+        frame.insert(3, 'pincode', [int(rng.choice(pincodes[d])) for d in chosen])
+        frame['date'] = pd.to_datetime(frame['date']).dt.strftime('%d-%m-%Y')
+
+        extra = [frame.sample(n=max(1, n // 50), random_state=int(rng.integers(1 << 31)))]   # Duplicate rows
+        unknown = frame.head(3).copy()
+        unknown['district'] = edge['unknown']
+        extra.append(unknown)
+        if feed == 'enrollment':
+            single = frame.head(1).copy()
+            single['district'] = edge['single_row']
+            extra.append(single)
+        invalid = frame.head(1).copy()
+        invalid['date'] = '31-02-2025'                          # Quarantined by the schema check
+        extra.append(invalid)
+        frame = pd.concat([frame] + extra, ignore_index=True)
+        frame = frame.sample(frac=1, random_state=int(rng.integers(1 << 31)))
+        if feed in edge['empty_feeds']:
+            frame = frame.head(0)
+        frame.to_csv(os.path.join(directory, filename), index=False)
+    return {"seed": seed, "districts": len(districts), "calendar_days": len(calendar), **edge}
+
+
+def build_analyst(directory: str, engine: str):
+    from analysis import GovernanceAnalyst
+    analyst = GovernanceAnalyst(directory)
+    analyst.load_data()
+    analyst.process_data(engine=engine)
+    return analyst
+
+
+def sample_districts(analyst, edge: dict, limit: int = 6):
+    """Edge-case districts first, then the busiest ones, plus a lower-case spelling of one."""
+    present = set(analyst.combined_df['district'].astype(str))
+    picked = [edge[k] for k in ('enrollment_only', 'no_demographic', 'zero_activity', 'single_row')
+              if edge.get(k) in present]
+    busiest = analyst.combined_df.groupby('district')['api'].sum().sort_values(ascending=False).index
+    picked += [str(d) for d in busiest if d not in picked][:max(0, limit - len(picked))]
+    return picked + [picked[-1].lower()] if picked else picked
+
+
+# --- Comparison --------------------------------------------------------------
+
+def _rounded_places(value: float):
+    for places in (0, 1, 2):
+        if value == round(value, places):
+            return places
+    return None
+
+
+def compare(reference, candidate, path: str = '', rtol: float = DEFAULT_RTOL, atol: float = DEFAULT_ATOL):
+    """Mismatches between two JSON-like values, as 'path: reference != candidate' strings.
+
+    Floats match within rtol/atol; values both rounded to 0-2 places may also
+    differ by one unit in that place (a rounding boundary, not a bug).
+    """
+    if isinstance(reference, dict) and isinstance(candidate, dict):
+        out = []
+        for key in sorted(set(reference) | set(candidate), key=str):
+            if key in IGNORED_KEYS:
+                continue
+            if key not in reference or key not in candidate:
+                out.append(f"{path}/{key}: only in {'candidate' if key in candidate else 'reference'}")
+                continue
+            out += compare(reference[key], candidate[key], f"{path}/{key}", rtol, atol)
+        return out
+    if isinstance(reference, (list, tuple)) and isinstance(candidate, (list, tuple)):
+        if len(reference) != len(candidate):
+            return [f"{path}: length {len(reference)} != {len(candidate)}"]
+        out = []
+        for i, (a, b) in enumerate(zip(reference, candidate)):
+            out += compare(a, b, f"{path}[{i}]", rtol, atol)
+        return out
+    numeric = (int, float, np.integer, np.floating)
+    if isinstance(reference, numeric) and isinstance(candidate, numeric) \
+            and not isinstance(reference, bool) and not isinstance(candidate, bool):
+        a, b = float(reference), float(candidate)
+        if (np.isnan(a) and np.isnan(b)) or np.isclose(a, b, rtol=rtol, atol=atol):
+            return []
+        places = _rounded_places(a)
+        if places is not None and places == _rounded_places(b) and isinstance(reference, float) \
+                and abs(a - b) <= 10 ** -places + 1e-9:
+            return []
+        return [f"{path}: {reference!r} != {candidate!r}"]
+    if reference != candidate:
+        return [f"{path}: {reference!r} != {candidate!r}"]
+    return []
+
+
+def compare_frames(reference: pd.DataFrame, candidate: pd.DataFrame, keys, path: str = '',
+                   rtol: float = DEFAULT_RTOL, atol: float = DEFAULT_ATOL):
+    """Row-aligned (on `keys`) comparison of two frames; numeric columns within tolerance."""
+    out = []
+    for column in sorted(set(reference.columns) ^ set(candidate.columns)):
+        out.append(f"{path}/{column}: only in {'candidate' if column in candidate.columns else 'reference'}")
+    if len(reference) != len(candidate):
+        return out + [f"{path}: {len(reference)} rows != {len(candidate)} rows"]
+
+    def aligned(frame):
+        frame = frame.copy()
+        for key in keys:
+            frame[key] = frame[key].astype(str) if key != 'date' else pd.to_datetime(frame[key])
+        return frame.sort_values(list(keys), kind='stable').reset_index(drop=True)
+
+    reference, candidate = aligned(reference), aligned(candidate)
+    for column in [c for c in reference.columns if c in candidate.columns]:
+        a, b = reference[column], candidate[column]
+        if pd.api.types.is_numeric_dtype(a) and pd.api.types.is_numeric_dtype(b):
+            av, bv = a.to_numpy(dtype=np.float64), b.to_numpy(dtype=np.float64)
+            bad = ~(np.isclose(av, bv, rtol=rtol, atol=atol) | (np.isnan(av) & np.isnan(bv)))
+        else:
+            bad = (a.astype(str) != b.astype(str)).to_numpy()
+        for i in np.flatnonzero(bad)[:3]:
+            row = ', '.join(f"{k}={reference.at[i, k]}" for k in keys)
+            out.append(f"{path}/{column} [{row}]: {a.iloc[i]!r} != {b.iloc[i]!r}")
+        if bad.sum() > 3:
+            out.append(f"{path}/{column}: {int(bad.sum()) - 3} more rows differ")
+    return out
+
+
+class Report:
+    def __init__(self):
+        self.checks = {}      # check name -> [compared, mismatches]
+        self.errors = []
+
+    def add(self, check: str, mismatches, context: str = ''):
+        entry = self.checks.setdefault(check, [0, []])
+        entry[0] += 1
+        entry[1] += [f"{context} {m}".strip() for m in mismatches]
+
+    def run(self, check: str, context: str, fn):
+        """Records fn()'s mismatches; an exception counts as one."""
+        try:
+            self.add(check, fn(), context)
+        except Exception as e:
+            self.add(check, [f"raised {type(e).__name__}: {e}"], context)
+
+    @property
+    def ok(self) -> bool:
+        return not any(m for _, m in self.checks.values())
+
+    def to_dict(self):
+        return {"ok": self.ok, "checks": {name: {"compared": n, "mismatches": len(m), "examples": m[:MAX_REPORTED]}
+                                          for name, (n, m) in self.checks.items()}}
+
+
+# --- Engine and analyst checks -----------------------------------------------
+
+def check_engine(reference, candidate, rtol, atol, path: str = ''):
+    out = compare_frames(reference.combined_df, candidate.combined_df, ['district', 'date'],
+                         f"{path}/combined_df", rtol, atol)
+    expected, got = reference.fingerprint, candidate.fingerprint
+    if expected is None or got is None:
+        return out + [f"{path}/fingerprint: missing ({'reference' if expected is None else 'candidate'})"]
+    if expected.digest != got.digest:
+        changed = got.diff(expected)["districts"]
+        out.append(f"{path}/fingerprint: {expected.digest} != {got.digest} "
+                   f"(districts changed: {changed['changed'][:5]}, added: {changed['added'][:5]}, "
+                   f"removed: {changed['removed'][:5]})")
+    return out
+
+
+def check_analyst(reference, candidate, districts, rtol, atol):
+    from load_stats import DistrictLoadStats, TARGETS
+    out = compare(reference.get_district_stats(), candidate.get_district_stats(), '/stats', rtol, atol)
+    out += compare_frames(reference.get_stress_heatmap_frame(), candidate.get_stress_heatmap_frame(),
+                          ['district'], '/heatmap', rtol, atol)
+    ref_stats = DistrictLoadStats.from_combined(reference.combined_df)
+    cand_stats = DistrictLoadStats.from_combined(candidate.combined_df)
+    for district in districts:
+        out += compare(reference.get_district_stats(district), candidate.get_district_stats(district),
+                       f"/stats[{district}]", rtol, atol)
+        for target in TARGETS:
+            out += compare(reference.get_district_deep_dive(district, target, ref_stats),
+                           candidate.get_district_deep_dive(district, target, cand_stats),
+                           f"/deep_dive[{district},{target}]", rtol, atol)
+        out += compare(reference.get_forecast(district, 6), candidate.get_forecast(district, 6),
+                       f"/forecast[{district}]", rtol, atol)
+    return out
+
+
+# --- Optimized derived engines vs plain pandas --------------------------------
+
+def reference_cost_analysis(df: pd.DataFrame):
+    """The dashboard cost model as originally written in /api/cost_analysis."""
+    total = {c: int(df[c].sum()) for c in ('total_enrollment', 'total_biometric', 'total_demographic')}
+    operational = total['total_enrollment'] * 150 + total['total_biometric'] * 75 + total['total_demographic'] * 50
+    district_metrics = df.groupby('district').agg({'stress_index': 'mean'})
+    kits = int((district_metrics['stress_index'] / 50).apply(lambda x: max(1, x)).sum())
+    staff = int(sum(total.values()) / 10000)
+    infrastructure = kits * 500000 + staff * 600000
+    savings = operational * 0.10
+    return {
+        "operational_cost_inr": float(operational),
+        "kit_investment_inr": float(kits * 500000),
+        "staff_cost_annual_inr": float(staff * 600000),
+        "total_infrastructure_inr": float(infrastructure),
+        "potential_savings_inr": float(savings),
+        "roi_percentage": round(savings / infrastructure * 100, 1) if infrastructure > 0 else 0,
+        "total_kits_needed": kits,
+        "total_staff_needed": staff,
+    }
+
+
+def reference_query(df: pd.DataFrame, query: dict) -> pd.DataFrame:
+    """District/month group-by with date-range and district filters, in plain pandas."""
+    frame = df.copy()
+    frame['date'] = pd.to_datetime(frame['date'])
+    for f in query.get('filters', []):
+        if f['field'] == 'date':
+            low, high = (pd.Timestamp(v) for v in f['value'])
+            frame = frame[(frame['date'] >= low) & (frame['date'] <= high)]
+        elif f['field'] == 'district':
+            frame = frame[frame['district'].str.lower().isin([v.lower() for v in f['value']])]
+    if 'month' in query['dimensions']:
+        frame['month'] = frame['date'].dt.to_period('M').dt.to_timestamp()
+    named = {}
+    for spec in query['metrics']:
+        field, agg = spec.split(':')
+        named[f"{agg}_{field}"] = (field, agg)
+    return frame.groupby(query['dimensions'], sort=True).agg(**named).reset_index()
+
+
+def reference_queries(df: pd.DataFrame, districts):
+    dates = pd.to_datetime(df['date'])
+    low, high = dates.quantile(0.2).date(), dates.quantile(0.8).date()
+    metrics = ['total_enrollment:sum', 'stress_index:mean', 'api:max', 'migration_intensity:min',
+               'total_biometric:count']
+    return [
+        {'dimensions': ['district'], 'metrics': metrics},
+        {'dimensions': ['district', 'month'], 'metrics': metrics,
+         'filters': [{'field': 'date', 'op': 'between', 'value': [str(low), str(high)]}]},
+        {'dimensions': ['month'], 'metrics': metrics,
+         'filters': [{'field': 'district', 'op': 'in', 'value': list(districts[:3])}]},
+    ]
+
+
+def check_query_engine(analyst, districts, rtol, atol):
+    from query_engine import QueryEngine
+    engine, out = QueryEngine(), []
+    for i, query in enumerate(reference_queries(analyst.combined_df, districts)):
+        result, _ = engine.execute(analyst, dict(query, limit=10000))
+        expected = reference_query(analyst.combined_df, query)
+        out += compare_frames(expected, result, query['dimensions'], f"/query[{i}]", rtol, atol)
+    return out
+
+
+def check_load_stats(analyst, rtol, atol):
+    from load_stats import DistrictLoadStats, PERCENTILES, RELATIVE_ACCURACY
+    df = analyst.combined_df
+    stats = DistrictLoadStats.from_combined(df)
+    grouped = df['stress_index'].astype(np.float64).groupby(df['district'])
+    expected = pd.DataFrame({f"p{p}": grouped.quantile(p / 100) for p in PERCENTILES})
+    expected['max'] = grouped.max()
+    expected['mean'] = grouped.mean()
+    capacity = np.ceil(expected['mean'] / 50) * 50
+    expected['peak_days'] = (df['stress_index'] > df['district'].map(capacity)).groupby(df['district']).sum()
+    out = []
+    for district, row in expected.iterrows():
+        got = stats.district(str(district))
+        out += compare({k: round(float(v), 2) for k, v in row.items()},
+                       {k: got[k] for k in row.index}, f"/load_stats[{district}]", rtol, atol)
+
+    # Appending the later half of the calendar must land within the sketch's relative accuracy
+    dates = np.sort(pd.to_datetime(df['date']).unique())
+    if len(dates) > 2:
+        cut = dates[len(dates) // 2]
+        when = pd.to_datetime(df['date'])
+        appended = DistrictLoadStats.from_combined(df[when < cut]).append(df[when >= cut])
+        out += compare(stats.days.tolist(), appended.days.tolist(), '/load_stats_append/days')
+        out += compare(stats.maxima.tolist(), appended.maxima.tolist(), '/load_stats_append/max', rtol, atol)
+        out += compare(stats.totals.tolist(), appended.totals.tolist(), '/load_stats_append/totals', 1e-9, atol)
+        out += compare(stats.quantiles.tolist(), appended.quantiles.tolist(), '/load_stats_append/quantiles',
+                       2 * RELATIVE_ACCURACY, atol)
+    return out
+
+
+def check_load_profiles(analyst, rtol, atol):
+    from load_profiles import LoadProfiles, PROFILE_METRICS, WEEKDAYS
+    df = analyst.combined_df.copy()
+    df['date'] = pd.to_datetime(df['date'])
+    profiles = LoadProfiles.from_combined(df)
+    calendar = pd.Series(df['date'].unique())
+    calendar_days = calendar.dt.dayofweek.value_counts()
+    df['weekday'] = df['date'].dt.dayofweek
+    sums = df.groupby(['district', 'weekday'])[PROFILE_METRICS].sum()
+    peaks = df.groupby(['district', 'weekday'])[PROFILE_METRICS].max()
+    out = []
+    for district in df['district'].astype(str).unique():
+        got = profiles.profile(district, 'weekday')['buckets']
+        for b, weekday in enumerate(WEEKDAYS):
+            for metric in PROFILE_METRICS:
+                if (district, b) in sums.index:
+                    mean = sums.at[(district, b), metric] / calendar_days.get(b, 1)
+                    peak = peaks.at[(district, b), metric]
+                else:
+                    mean = peak = 0.0
+                out += compare({"mean": round(float(mean), 2), "peak": round(float(peak), 2)},
+                               {k: got[b][metric][k] for k in ('mean', 'peak')},
+                               f"/load_profile[{district},{weekday},{metric}]", rtol, atol)
+    return out
+
+
+def check_similarity(analyst, atol):
+    """Series-basis neighbour scores against a dense np.corrcoef over the pivoted api series."""
+    from similarity import SimilarityIndex
+    index = SimilarityIndex.from_combined(analyst.combined_df)
+    pivot = analyst.combined_df.pivot_table(index='district', columns='date', values='api', aggfunc='sum',
+                                            fill_value=0, observed=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = np.nan_to_num(np.corrcoef(pivot.to_numpy(dtype=np.float64)))
+    np.fill_diagonal(corr, -np.inf)
+    out = []
+    for i, district in enumerate(pivot.index.astype(str)):
+        expected = np.sort(corr[i])[::-1][:index.top_k]
+        got = [n['similarity'] for n in index.similar(district, index.top_k, 'series')['neighbors']]
+        out += compare(np.round(expected, 4).tolist(), got, f"/similarity[{district}]", 0, max(atol, 2e-4))
+    return out
+
+
+def check_scenarios(analyst, rtol, atol):
+    from scenarios import ScenarioEngine
+    result = ScenarioEngine.from_combined(analyst.combined_df).evaluate([{}])['scenarios'][0]
+    expected = reference_cost_analysis(analyst.combined_df)
+    return compare(expected, {k: result[k] for k in expected}, '/cost_analysis', rtol, atol)
+
+
+def check_stores(analyst, directory: str, rtol, atol):
+    """combined_df and its fingerprint after the SQL store (fast start) and shared data plane round trips."""
+    from analysis import GovernanceAnalyst
+    from shared_data import SharedDataPlane, publish
+    from sql_store import AnalyticsStore
+
+    db_path = os.path.join(directory, 'equivalence_store.db')
+    AnalyticsStore(db_path).write(analyst.combined_df, fingerprint=analyst.fingerprint)
+    restored = GovernanceAnalyst(directory)
+    restored.load_from_store(db_path)
+    out = check_engine(analyst, restored, rtol, atol, '/sql_store')
+
+    shared_root = os.path.join(directory, 'equivalence_shared')
+    publish(analyst.combined_df, shared_root)
+    mapped = GovernanceAnalyst(directory)
+    SharedDataPlane(shared_root).refresh(mapped, force=True)
+    mapped.track_changes()
+    return out + check_engine(analyst, mapped, rtol, atol, '/shared_plane')
+
+
+# --- Endpoints ----------------------------------------------------------------
+
+def endpoint_requests(districts, queries):
+    """(method, path, params-or-body) for every endpoint compared; `dataset` is filled in per side."""
+    requests = [('GET', path, {}) for path in (
+        '/api/districts', '/api/stats', '/api/stress_heatmap', '/api/trends', '/api/migration_alerts',
+        '/api/cost_analysis', '/api/efficiency_metrics', '/api/export_report')]
+    requests += [('GET', '/api/resource_recommendations', {'target': t}) for t in ('mean', 'p95', 'max')]
+    requests += [('GET', '/api/trends', {'max_points': 10})]
+    for district in districts:
+        requests += [
+            ('GET', '/api/stats', {'district': district}),
+            ('GET', '/api/deep_dive', {'district': district}),
+            ('GET', '/api/deep_dive', {'district': district, 'target': 'p90'}),
+            ('GET', '/api/load_percentiles', {'district': district}),
+            ('GET', '/api/similar_districts', {'district': district, 'k': 5}),
+            ('GET', '/api/load_profile', {'district': district, 'kind': 'monthday'}),
+            ('GET', '/api/weekday_staffing', {'district': district}),
+            ('GET', '/api/forecast', {'district': district, 'months': 12, 'max_points': 6}),
+            ('GET', '/api/trends', {'district': district}),
+        ]
+    requests += [
+        ('POST', '/api/scenarios', {'scenarios': [{}, {'cost_per_kit': 450000, 'ops_per_kit': 40}],
+                                    'rounding': 'ceil', 'include_districts': True}),
+        ('POST', '/api/allocate', {'resource': 'kits', 'budgets': [10, 50, 200]}),
+        ('POST', '/api/allocate', {'resource': 'staff', 'level': 'pincode', 'budgets': [5, 20],
+                                   'district': districts[-1] if districts else None, 'top': 10}),
+    ]
+    requests += [('POST', '/api/query', dict(query, limit=10000)) for query in queries]
+    return requests
+
+
+def _import_app(directory: str, quiet: bool):
+    """Imports main.py with `directory` as its default dataset (main loads from the working directory)."""
+    if 'main' in sys.modules:
+        return sys.modules['main']
+    cwd = os.getcwd()
+    os.environ.setdefault('GOVOPTIMA_JOB_DB', os.path.join(directory, 'govoptima_jobs.db'))
+    os.environ.setdefault('GOVOPTIMA_JOB_DIR', os.path.join(directory, 'job_results'))
+    try:
+        os.chdir(directory)
+        with _quiet(quiet):
+            import main
+    finally:
+        os.chdir(cwd)
+    return main
+
+
+def _decoded(response):
+    if response.headers.get('content-type', '').startswith('text/csv'):
+        text = response.text
+        try:
+            # /api/export_report sends the CSV as a JSON string
+            decoded = json.loads(text)
+            text = decoded if isinstance(decoded, str) else text
+        except ValueError:
+            pass
+        return list(csv.DictReader(io.StringIO(text)))
+    return response.json()
+
+
+def _error_payload(status: int, body):
+    """The error a 2xx response carries in its body (endpoints that catch exceptions), else None."""
+    if status >= 300 or not isinstance(body, dict):
+        return None
+    if 'error' in body:
+        return body['error']
+    if body.get('status') == 'Error':
+        return body.get('message', 'status Error')
+    return None
+
+
+def _csv_numbers(rows):
+    """CSV cells back to numbers where they parse, so exports compare within tolerance."""
+    def value(cell):
+        try:
+            return float(cell)
+        except (TypeError, ValueError):
+            return cell
+    return [{k: value(v) for k, v in row.items()} for row in rows]
+
+
+def check_endpoints(client, reference_name, candidate_name, districts, queries, rtol, atol):
+    out = []
+    for method, path, payload in endpoint_requests(districts, queries):
+        label = f"{method} {path} {json.dumps(payload, sort_keys=True)}"
+        responses = []
+        for name in (reference_name, candidate_name):
+            if method == 'GET':
+                response = client.get(path, params={**payload, 'dataset': name})
+            else:
+                response = client.post(path, json={**payload, 'dataset': name})
+            responses.append(response)
+        if responses[0].status_code != responses[1].status_code:
+            out.append(f"{label}: status {responses[0].status_code} != {responses[1].status_code}")
+            continue
+        reference, candidate = (_decoded(r) for r in responses)
+        errors = [(side, _error_payload(r.status_code, body)) for side, r, body in
+                  (('reference', responses[0], reference), ('candidate', responses[1], candidate))]
+        errors = [f"{side} returned error {error!r}" for side, error in errors if error is not None]
+        if errors:
+            out.append(f"{label}: {'; '.join(errors)}")
+            continue
+        if isinstance(reference, list) and reference and isinstance(reference[0], dict) \
+                and path == '/api/export_report':
+            reference, candidate = _csv_numbers(reference), _csv_numbers(candidate)
+        out += [f"{label} {m}" for m in compare(reference, candidate, '', rtol, atol)]
+    return out
+
+
+def endpoint_responses(directory: str, reload_from: str = None):
+    """[request, status, body] for every compared request, served by main.py imported on `directory`.
+
+    With `reload_from`, every request is made once first (warming the caches), then the source
+    files of `reload_from` replace `directory`'s, /api/reload runs and the requests are answered
+    again. Meant for a fresh process (see check_boot): main.py loads its default dataset at import.
+    """
+    from fastapi.testclient import TestClient
+    app = _import_app(directory, quiet=True)
+    query = {'dimensions': ['district'], 'metrics': ['total_enrollment:sum']}
+    requests = endpoint_requests(['Pune'], [query])
+    with _quiet(True), TestClient(app.app, raise_server_exceptions=False) as client:
+        def answer():
+            out = []
+            for method, path, payload in requests:
+                if method == 'GET':
+                    response = client.get(path, params=payload)
+                else:
+                    response = client.post(path, json=payload)
+                body = _decoded(response) if response.status_code < 500 else None
+                out.append([f"{method} {path} {json.dumps(payload, sort_keys=True)}", response.status_code, body])
+            return out
+
+        if reload_from is not None:
+            answer()
+            for filename, _ in FEEDS.values():
+                shutil.copyfile(os.path.join(reload_from, filename), os.path.join(directory, filename))
+            reloaded = client.post('/api/reload').json()
+            if 'error' in reloaded:
+                raise RuntimeError(f"/api/reload failed: {reloaded['error']}")
+        return answer()
+
+
+def _run_server(directory: str, reload_from: str = None):
+    """endpoint_responses() in a fresh interpreter; returns (responses, None) or (None, error)."""
+    script = (f"import json, sys; sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r}); "
+              f"import equivalence; print(json.dumps(equivalence.endpoint_responses("
+              f"{directory!r}, {reload_from!r}), default=str))")
+    # The job store of this process's own main.py import must not leak into the child
+    env = {k: v for k, v in os.environ.items() if k not in ('GOVOPTIMA_JOB_DB', 'GOVOPTIMA_JOB_DIR')}
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()
+        return None, error[-1] if error else f"exit status {result.returncode}"
+    return json.loads(result.stdout.strip().splitlines()[-1]), None
+
+
+def check_boot(directory: str):
+    """main.py must start on `directory` and answer every request without a server error.
+
+    Returns (mismatches, responses).
+    """
+    responses, error = _run_server(directory)
+    if error is not None:
+        return [f"main.py did not start: {error}"], None
+    out = []
+    for label, status, body in responses:
+        if status >= 500:
+            out.append(f"{label}: status {status}")
+        elif _error_payload(status, body) is not None:
+            out.append(f"{label}: returned error {_error_payload(status, body)!r}")
+    return out, responses
+
+
+def check_reload(populated: str, empty: str, expected, rtol, atol):
+    """main.py started on `populated` and reloaded to `empty` must answer like one started on `empty`."""
+    responses, error = _run_server(populated, reload_from=empty)
+    if error is not None:
+        return [f"reload to empty data failed: {error}"]
+    out = []
+    for (label, status, body), (_, expected_status, expected_body) in zip(responses, expected):
+        if _error_payload(status, body) is not None:
+            out.append(f"{label}: returned error {_error_payload(status, body)!r}")
+        elif status != expected_status:
+            out.append(f"{label}: status {expected_status} != {status}")
+        else:
+            out += [f"{label} {m}" for m in compare(expected_body, body, '', rtol, atol)]
+    return out
+
+
+# --- Driver -------------------------------------------------------------------
+
+@contextlib.contextmanager
+def _quiet(enabled: bool):
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def run(seeds, rows: int = DEFAULT_ROWS, engines=ENGINES, endpoints: bool = True,
+        rtol: float = DEFAULT_RTOL, atol: float = DEFAULT_ATOL, keep: str = None, quiet: bool = True,
+        log=print):
+    """Runs every check on one generated dataset per seed, then on EDGE_DATASETS; returns the Report."""
+    root = keep or tempfile.mkdtemp(prefix='govoptima-equivalence-')
+    engines = [REFERENCE_ENGINE] + [e for e in engines if e != REFERENCE_ENGINE]
+    seeds = list(seeds)
+    # Edge datasets reuse the first seed's randomness (only their feeds differ)
+    cases = [(f"seed-{seed}", seed, ()) for seed in seeds]
+    cases += [(name, seeds[0] if seeds else 0, feeds) for name, feeds in EDGE_DATASETS.items()]
+    report = Report()
+    client = None
+    try:
+        for label, seed, empty_feeds in cases:
+            started = time.perf_counter()
+            base = os.path.join(root, label)
+            # One directory per engine: derived caches in main.py are keyed by data directory
+            for engine in engines:
+                if empty_feeds is None:
+                    os.makedirs(os.path.join(base, engine), exist_ok=True)
+                    edge = {"districts": 0, "calendar_days": 0}
+                else:
+                    edge = generate_sources(os.path.join(base, engine), seed, rows, empty_feeds)
+            with _quiet(quiet):
+                analysts = {engine: build_analyst(os.path.join(base, engine), engine) for engine in engines}
+            reference = analysts[REFERENCE_ENGINE]
+            districts = sample_districts(reference, edge)
+            context = f"[{label}]"
+
+            for engine in engines[1:]:
+                candidate = analysts[engine]
+                report.run(f"engine:{engine}", context, lambda: check_engine(reference, candidate, rtol, atol))
+                report.run(f"analyst:{engine}", context,
+                           lambda: check_analyst(reference, candidate, districts, rtol, atol))
+            report.run("derived:scenarios", context, lambda: check_scenarios(reference, rtol, atol))
+            report.run("derived:query_engine", context, lambda: check_query_engine(reference, districts, rtol, atol))
+            report.run("derived:load_stats", context, lambda: check_load_stats(reference, rtol, atol))
+            report.run("derived:load_profiles", context, lambda: check_load_profiles(reference, rtol, atol))
+            report.run("derived:similarity", context, lambda: check_similarity(reference, atol))
+            report.run("stores", context, lambda: check_stores(reference, base, rtol, atol))
+
+            if endpoints and len(engines) > 1:
+                if client is None:
+                    from fastapi.testclient import TestClient
+                    app = _import_app(os.path.join(base, REFERENCE_ENGINE), quiet)
+                    client = TestClient(app.app)
+                    client.__enter__()
+                app = sys.modules['main']
+                names = {engine: f"equivalence-{label}-{engine}" for engine in engines}
+                for engine, analyst in analysts.items():
+                    app.datasets.register(names[engine], analyst, pin=True)
+                queries = reference_queries(reference.combined_df, districts)
+                for engine in engines[1:]:
+                    report.run(f"endpoints:{engine}", context, lambda: check_endpoints(
+                        client, names[REFERENCE_ENGINE], names[engine], districts, queries, rtol, atol))
+            if endpoints and label in BOOTED_DATASETS:
+                booted = {}
+
+                def startup():
+                    mismatches, booted['responses'] = check_boot(os.path.join(base, REFERENCE_ENGINE))
+                    return mismatches
+                report.run("endpoints:startup", context, startup)
+                if label == 'empty' and booted.get('responses') and seeds:
+                    # A server holding data (caches warm) reloaded to this dataset answers like a fresh one
+                    populated = os.path.join(base, 'reloaded')
+                    shutil.copytree(os.path.join(root, f"seed-{seeds[0]}", REFERENCE_ENGINE), populated)
+                    report.run("endpoints:reload", context, lambda: check_reload(
+                        populated, os.path.join(base, REFERENCE_ENGINE), booted['responses'], rtol, atol))
+
+            failed = sum(len(m) for _, m in report.checks.values())
+            log(f"{label}: {edge['districts']} districts, {edge['calendar_days']} days, "
+                f"{len(reference.combined_df)} district-days - {failed} mismatches so far "
+                f"({time.perf_counter() - started:.1f}s)")
+    finally:
+        if client is not None:
+            with _quiet(quiet):
+                client.__exit__(None, None, None)
+        if not keep:
+            shutil.rmtree(root, ignore_errors=True)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare optimized GovOptima paths against the pandas reference "
+                                                 "on randomized datasets")
+    parser.add_argument('--seeds', type=int, default=DEFAULT_SEEDS, help="number of random datasets")
+    parser.add_argument('--seed', type=int, default=0, help="first seed")
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS, help="approximate rows per source feed")
+    parser.add_argument('--engine', action='append', choices=ENGINES,
+                        help="engine to compare against pandas (repeatable; default: all)")
+    parser.add_argument('--skip-endpoints', action='store_true', help="skip the main.py endpoint comparison")
+    parser.add_argument('--rtol', type=float, default=DEFAULT_RTOL)
+    parser.add_argument('--atol', type=float, default=DEFAULT_ATOL)
+    parser.add_argument('--keep', metavar='DIR', help="write the generated datasets to DIR and keep them")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    parser.add_argument('--verbose', action='store_true', help="show loader and server output")
+    args = parser.parse_args(argv)
+
+    report = run(range(args.seed, args.seed + args.seeds), rows=args.rows, engines=args.engine or ENGINES,
+                 endpoints=not args.skip_endpoints, rtol=args.rtol, atol=args.atol, keep=args.keep,
+                 quiet=not args.verbose, log=(lambda message: None) if args.json else print)
+    if args.json:
+        print(json.dumps(report.to_dict(), indent=2))
+    else:
+        for name, (compared, mismatches) in report.checks.items():
+            print(f"{'OK  ' if not mismatches else 'FAIL'} {name:<24} {compared} datasets, {len(mismatches)} mismatches")
+            for mismatch in mismatches[:MAX_REPORTED]:
+                print(f"     {mismatch}")
+        print("All optimized paths match the pandas reference." if report.ok else "Mismatches found.")
+    return 0 if report.ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
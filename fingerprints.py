@@ -0,0 +1,172 @@
+"""
+DATA FINGERPRINTS - GovOptima Platform
+Content fingerprints of combined_df per district and per date, so a reload
+or ingest knows exactly which districts changed:
+  - every row is hashed (pandas' vectorized hash of its normalized values)
+  - a district's / date's fingerprint is the order-independent uint64 sum of
+    its row hashes plus its row count
+  - diff() lists changed, added and removed districts and dates
+DistrictResponseCache uses the diff to drop only the cached results of the
+districts that changed instead of flushing everything on each new version.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CACHE_ENTRIES = 4096
+
+
+def _normalized(df: pd.DataFrame) -> pd.DataFrame:
+    """Dtype-stable view of combined_df: the same content hashes the same from CSV, cube, store or shared plane."""
+    columns = {
+        'district': df['district'].astype(str),
+        'date': pd.to_datetime(df['date']).astype('datetime64[ns]').astype(np.int64),
+    }
+    for col in sorted(c for c in df.columns if c not in ('district', 'date')):
+        if pd.api.types.is_numeric_dtype(df[col]):
+            columns[col] = df[col].astype(np.float64)
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def _group_sums(codes: np.ndarray, n_groups: int, hashes: np.ndarray) -> np.ndarray:
+    sums = np.zeros(n_groups, dtype=np.uint64)
+    np.add.at(sums, codes, hashes)   # Wraps modulo 2**64: an order-independent multiset hash
+    counts = np.bincount(codes, minlength=n_groups).astype(np.uint64)
+    return sums ^ (counts * np.uint64(0x9E3779B97F4A7C15))
+
+
+class DataFingerprint:
+    def __init__(self, districts: dict, dates: dict, rows: int):
+        self.districts = districts    # district -> 16-hex-digit fingerprint
+        self.dates = dates            # ISO date -> fingerprint
+        self.rows = rows
+        blob = json.dumps([sorted(districts.items()), rows], separators=(',', ':')).encode('utf-8')
+        self.digest = hashlib.sha256(blob).hexdigest()[:16]
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame):
+        if df is None or df.empty:
+            return cls({}, {}, 0)
+        frame = _normalized(df)
+        hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy(dtype=np.uint64)
+
+        district_codes, districts = pd.factorize(frame['district'])
+        date_codes, dates = pd.factorize(frame['date'])
+        by_district = _group_sums(district_codes, len(districts), hashes)
+        by_date = _group_sums(date_codes, len(dates), hashes)
+        date_labels = pd.to_datetime(dates).strftime('%Y-%m-%d')
+        return cls(
+            {name: f"{value:016x}" for name, value in zip(districts, by_district.tolist())},
+            {name: f"{value:016x}" for name, value in zip(date_labels, by_date.tolist())},
+            len(frame)
+        )
+
+    def to_dict(self):
+        return {"digest": self.digest, "rows": self.rows, "districts": self.districts, "dates": self.dates}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(data.get("districts", {}), data.get("dates", {}), data.get("rows", 0))
+
+    def diff(self, previous: 'DataFingerprint' = None):
+        """What changed relative to `previous` (everything is 'added' when there is none)."""
+        old_districts = previous.districts if previous else {}
+        old_dates = previous.dates if previous else {}
+
+        def compare(new, old):
+            return (sorted(k for k in new if k in old and new[k] != old[k]),
+                    sorted(k for k in new if k not in old),
+                    sorted(k for k in old if k not in new))
+
+        changed, added, removed = compare(self.districts, old_districts)
+        changed_dates, added_dates, removed_dates = compare(self.dates, old_dates)
+        return {
+            "previous_digest": previous.digest if previous else None,
+            "digest": self.digest,
+            "identical": previous is not None and previous.digest == self.digest,
+            "districts": {"changed": changed, "added": added, "removed": removed,
+                          "unchanged": len(self.districts) - len(changed) - len(added)},
+            "dates": {"changed": changed_dates, "added": added_dates, "removed": removed_dates,
+                      "unchanged": len(self.dates) - len(changed_dates) - len(added_dates)},
+        }
+
+
+def affected_districts(change: dict) -> set:
+    districts = change["districts"]
+    return set(districts["changed"]) | set(districts["added"]) | set(districts["removed"])
+
+
+class DistrictResponseCache:
+    """LRU cache of computed results tagged with the district they describe.
+
+    Entries for one district survive new dataset versions as long as that
+    district's fingerprint is unchanged. Entries with district=None span all
+    districts and survive only identical data. Entries marked `calendar` also
+    depend on the set of dates (e.g. per-weekday means) and are dropped when
+    dates are added or removed.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()     # (dataset, name, district, params) -> (value, calendar)
+        self._synced = {}                 # dataset -> DataFingerprint the entries were computed on
+        self._lock = threading.Lock()
+        self.metrics = {"hits": 0, "misses": 0, "invalidated": 0, "retained": 0, "syncs": 0}
+
+    def _sync(self, dataset: str, fingerprint: DataFingerprint):
+        """Drops the entries a data change affects (lock held)."""
+        synced = self._synced.get(dataset)
+        if synced is fingerprint or (synced is not None and synced.digest == fingerprint.digest):
+            self._synced[dataset] = fingerprint
+            return
+        self.metrics["syncs"] += 1
+        change = fingerprint.diff(synced) if synced is not None else None
+        affected = {d.lower() for d in affected_districts(change)} if change else None
+        calendar_moved = change is None or bool(change["dates"]["added"] or change["dates"]["removed"])
+
+        for key in [k for k in self._entries if k[0] == dataset]:
+            district, calendar = key[2], self._entries[key][1]
+            if affected is None or district is None or district in affected or (calendar and calendar_moved):
+                del self._entries[key]
+                self.metrics["invalidated"] += 1
+            else:
+                self.metrics["retained"] += 1
+        self._synced[dataset] = fingerprint
+
+    def get_or_compute(self, dataset: str, fingerprint: DataFingerprint, name: str, district, params,
+                       compute, calendar: bool = False):
+        key = (dataset, name, district.lower() if district else None, json.dumps(params, sort_keys=True))
+        with self._lock:
+            self._sync(dataset, fingerprint)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.metrics["hits"] += 1
+                return self._entries[key][0]
+            self.metrics["misses"] += 1
+        value = compute()
+        with self._lock:
+            if self._synced.get(dataset) is fingerprint:   # Data did not move while computing
+                self._entries[key] = (value, calendar)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def forget(self, dataset: str):
+        """Drops every entry of one dataset (e.g. once it is evicted)."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == dataset]:
+                del self._entries[key]
+            self._synced.pop(dataset, None)
+
+    def status(self):
+        with self._lock:
+            per_dataset = {}
+            for dataset, *_ in self._entries:
+                per_dataset[dataset] = per_dataset.get(dataset, 0) + 1
+            return {"entries": len(self._entries), "max_entries": self.max_entries,
+                    "per_dataset": per_dataset, "metrics": dict(self.metrics)}
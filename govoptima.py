@@ -0,0 +1,503 @@
+"""
+GOVOPTIMA CLI - GovOptima Platform
+One entry point for every way of running the platform:
+
+  python govoptima.py serve [--port 8000] [--workers N]      dashboard + API (uvicorn)
+  python govoptima.py ingest [--sql-store PATH] [--shared-dir DIR] [--engine cube]
+  python govoptima.py report [all|master_analysis|analysis_enrollment|...] [--force|--dry-run]
+  python govoptima.py bench [loadtest.py options]             load test (see loadtest.py --help)
+  python govoptima.py warm-cache [--url http://host:port]     build SQL store / shared plane, prime a server
+  python govoptima.py status                                  sources, caches and job queue at a glance
+  python govoptima.py validate-cache [--deep]                 check cached artifacts against their sources
+  python govoptima.py verify [equivalence.py options]        optimized engines vs the pandas reference
+
+Every subcommand works on --data-dir (default: current directory). pandas,
+numpy and FastAPI are imported only inside the subcommands that need them,
+so status and validate-cache start in milliseconds. --timings prints the
+import and run time of each phase to stderr.
+"""
+
+import time
+
+_STARTED = time.perf_counter()
+
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import sys
+from contextlib import contextmanager
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ('pandas', 'numpy', 'fastapi', 'uvicorn')
+
+# Default source files per dataset; the glob patterns mirror partitioned_loader.discover_sources
+# (which cannot be imported here without pulling in pandas)
+DATASET_FILES = {
+    'enrollment': 'Enrollment_Data.csv',
+    'biometric': 'Biometric_Data.csv',
+    'demographic': 'Demographic_Data.csv',
+}
+
+# Fingerprint of the last ingest, for the change report when no SQL store records one
+FINGERPRINT_FILE = '.govoptima_fingerprint.json'
+
+# Endpoints whose server-side caches warm-cache primes on a running server
+WARM_ENDPOINTS = [
+    '/api/stats', '/api/stress_heatmap', '/api/trends', '/api/efficiency_metrics', '/api/cost_analysis',
+    '/api/resource_recommendations', '/api/migration_alerts',
+]
+
+
+class Timings:
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.phases = [('startup', time.perf_counter() - _STARTED)]
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def report(self):
+        if not self.enabled:
+            return
+        total = time.perf_counter() - _STARTED
+        for name, seconds in self.phases:
+            print(f"⏱  {name:<12} {seconds * 1000:9.1f} ms", file=sys.stderr)
+        print(f"⏱  {'total':<12} {total * 1000:9.1f} ms", file=sys.stderr)
+        loaded = [m for m in HEAVY_MODULES if m in sys.modules]
+        print(f"⏱  heavy modules loaded: {', '.join(loaded) or 'none'}", file=sys.stderr)
+
+
+def _enter_data_dir(args):
+    # The platform resolves CSVs, templates and local databases relative to the working directory
+    os.chdir(args.data_dir)
+    if CODE_DIR not in sys.path:
+        sys.path.insert(0, CODE_DIR)
+
+
+def source_files(data_dir: str):
+    """{dataset: [source files]} using sources.json or the default naming patterns."""
+    manifest_path = os.path.join(data_dir, 'sources.json')
+    configured = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            configured = json.load(f)
+    found = {}
+    for name, filename in DATASET_FILES.items():
+        stem = os.path.splitext(filename)[0]
+        # sources.json, else the first default layout present (directory tree, splits, legacy file)
+        groups = [configured.get(name) or []] if configured else \
+            [[os.path.join(name, '**', '*.csv')], [f"{stem}_*.csv"], [filename]]
+        found[name] = []
+        for patterns in groups:
+            paths = set()
+            for pattern in patterns:
+                for path in glob.glob(os.path.join(data_dir, pattern), recursive=True):
+                    if os.path.isfile(path):
+                        paths.add(os.path.normpath(path))
+            if paths:
+                found[name] = sorted(paths)
+                break
+    return found
+
+
+def _sqlite_ro(path: str):
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+
+# === SUBCOMMANDS ===
+
+def cmd_serve(args, timings: Timings):
+    _enter_data_dir(args)
+    for name, value in (("GOVOPTIMA_ENGINE", args.engine), ("GOVOPTIMA_SQL_STORE", args.sql_store),
+                        ("GOVOPTIMA_SHARED_DIR", args.shared_dir)):
+        if value:
+            os.environ[name] = value
+    with timings.phase('import'):
+        import uvicorn
+    timings.report()
+    if args.workers > 1:
+        if not args.shared_dir and not os.environ.get("GOVOPTIMA_SHARED_DIR"):
+            print("Tip: pass --shared-dir so workers share one copy of the dataset")
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers,
+                    app_dir=CODE_DIR, use_colors=False)
+    else:
+        with timings.phase('app load'):
+            from main import app
+        uvicorn.run(app, host=args.host, port=args.port, use_colors=False)
+    return 0
+
+
+def _previous_fingerprint(sql_store: str):
+    from fingerprints import DataFingerprint
+    if sql_store and os.path.exists(sql_store):
+        from sql_store import AnalyticsStore
+        stored = AnalyticsStore(sql_store).stored_fingerprint()
+        if stored is not None:
+            return stored
+    try:
+        with open(FINGERPRINT_FILE, 'r', encoding='utf-8') as f:
+            return DataFingerprint.from_dict(json.load(f))
+    except (OSError, ValueError):
+        return None
+
+
+def print_change_report(change: dict, limit: int = 20):
+    if change["previous_digest"] is None:
+        print(f"🆕 First ingest: {len(change['districts']['added'])} districts, "
+              f"{len(change['dates']['added'])} dates")
+        return
+    if change["identical"]:
+        print("⏸️  No data changes since the last ingest")
+        return
+    districts, dates = change["districts"], change["dates"]
+    print(f"🔁 Districts: {len(districts['changed'])} changed, {len(districts['added'])} added, "
+          f"{len(districts['removed'])} removed, {districts['unchanged']} unchanged")
+    for label in ('changed', 'added', 'removed'):
+        names = districts[label]
+        if names:
+            more = f" … +{len(names) - limit} more" if len(names) > limit else ""
+            print(f"  • {label}: {', '.join(names[:limit])}{more}")
+    print(f"📅 Dates: {len(dates['changed'])} changed, {len(dates['added'])} added, "
+          f"{len(dates['removed'])} removed, {dates['unchanged']} unchanged")
+
+
+def cmd_ingest(args, timings: Timings):
+    _enter_data_dir(args)
+    with timings.phase('import'):
+        from analysis import GovernanceAnalyst
+    analyst = GovernanceAnalyst(os.getcwd())
+    previous = _previous_fingerprint(args.sql_store)
+    with timings.phase('load'):
+        if not analyst.load_data():
+            print("❌ Source data could not be loaded")
+            return 1
+    with timings.phase('process'):
+        combined = analyst.process_data(sql_store=args.sql_store, engine=args.engine)
+    print(f"✅ Ingested {len(combined):,} records, {combined['district'].nunique()} districts")
+    for stats in analyst.partition_stats:
+        name = f"  • {stats['dataset']:<12} {os.path.relpath(stats['file']):<40}"
+        if stats.get('error'):
+            print(f"{name} ⚠️ skipped: {stats['error']}")
+        else:
+            print(f"{name} {stats['rows']:>9,} rows {stats['seconds']:.2f}s")
+    if analyst.fingerprint is not None:
+        print_change_report(analyst.fingerprint.diff(previous))
+        with open(FINGERPRINT_FILE, 'w', encoding='utf-8') as f:
+            json.dump(analyst.fingerprint.to_dict(), f)
+    if args.sql_store:
+        print(f"💾 SQL store {args.sql_store}: {analyst.sql_store_update}")
+    if args.shared_dir:
+        with timings.phase('publish'):
+            from shared_data import publish
+            version = publish(combined, args.shared_dir)
+        print(f"📤 Published shared dataset {version} to {args.shared_dir}")
+    timings.report()
+    return 0
+
+
+def cmd_report(args, timings: Timings):
+    from jobs import SCRIPT_JOBS   # Stdlib-only registry of the report scripts
+    _enter_data_dir(args)
+    names = list(SCRIPT_JOBS) if args.name == 'all' else [args.name]
+    # The per-dataset scripts first; master_analysis summarizes all three
+    names.sort(key=lambda n: n == 'master_analysis')
+    flags = [flag for flag, on in (('--force', args.force), ('--dry-run', args.dry_run)) if on]
+
+    import runpy
+    status = 0
+    for name in names:
+        script = os.path.join(CODE_DIR, SCRIPT_JOBS[name][0])
+        saved_argv = sys.argv
+        sys.argv = [script] + flags   # The scripts read --force/--dry-run via manifest.plan_rebuild
+        try:
+            with timings.phase(name):
+                runpy.run_path(script, run_name='__main__')
+        except SystemExit as e:
+            # plan_rebuild exits 0 when nothing is stale (or after --dry-run)
+            if e.code not in (None, 0):
+                status = int(e.code) if isinstance(e.code, int) else 1
+        finally:
+            sys.argv = saved_argv
+    timings.report()
+    return status
+
+
+def cmd_bench(args, timings: Timings):
+    with timings.phase('import'):
+        import loadtest
+    timings.report()
+    argv = [a for a in args.extra if a != '--']
+    if '--data-dir' not in argv:
+        argv += ['--data-dir', args.data_dir]
+    return loadtest.main(argv) or 0
+
+
+def cmd_verify(args, timings: Timings):
+    with timings.phase('import'):
+        import equivalence
+    timings.report()
+    # Generates its own randomized datasets; --data-dir does not apply
+    return equivalence.main([a for a in args.extra if a != '--'])
+
+
+def cmd_warm_cache(args, timings: Timings):
+    _enter_data_dir(args)
+    sql_store = args.sql_store or os.environ.get("GOVOPTIMA_SQL_STORE")
+    shared_dir = args.shared_dir or os.environ.get("GOVOPTIMA_SHARED_DIR")
+    need_store = bool(sql_store) and (args.force or not os.path.exists(sql_store))
+    need_shared = bool(shared_dir) and (args.force or _read_current(shared_dir) is None)
+
+    if need_store or need_shared:
+        with timings.phase('import'):
+            from analysis import GovernanceAnalyst
+        analyst = GovernanceAnalyst(os.getcwd())
+        with timings.phase('build'):
+            analyst.load_data()
+            combined = analyst.process_data(sql_store=sql_store if need_store else None)
+        if need_store:
+            print(f"💾 SQL store built: {sql_store} ({len(combined):,} rows)")
+        if need_shared:
+            with timings.phase('publish'):
+                from shared_data import publish
+                print(f"📤 Published shared dataset {publish(combined, shared_dir)} to {shared_dir}")
+    else:
+        print("✅ Local caches present (use --force to rebuild)")
+
+    if args.url:
+        import urllib.request
+        with timings.phase('prime'):
+            for path in WARM_ENDPOINTS:
+                started = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(args.url.rstrip('/') + path, timeout=args.timeout) as resp:
+                        resp.read()
+                        outcome = resp.status
+                except Exception as e:
+                    outcome = f"failed ({e})"
+                print(f"  • {path:<32} {outcome} in {(time.perf_counter() - started) * 1000:.0f} ms")
+    timings.report()
+    return 0
+
+
+def _read_current(shared_dir: str):
+    try:
+        with open(os.path.join(shared_dir, 'CURRENT'), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _manifest_state(manifest_path: str, deep: bool):
+    """(outputs recorded, problems) of an analysis_outputs manifest, without re-running the scripts."""
+    from manifest import OutputManifest   # Stdlib-only
+    manifest = OutputManifest(manifest_path)
+    problems = []
+    # Sources hashed at the last build whose size/mtime moved since: outputs built from them are stale
+    for path, cached in sorted(manifest.file_hashes.items()):
+        if path in manifest.outputs:
+            continue
+        try:
+            st = os.stat(path)
+        except OSError:
+            problems.append(f"input missing since last build: {path}")
+            continue
+        if st.st_size != cached['size'] or st.st_mtime_ns != cached['mtime_ns']:
+            problems.append(f"input changed since last build: {path}")
+    for output, entry in sorted(manifest.outputs.items()):
+        if not os.path.exists(output):
+            problems.append(f"output missing: {output}")
+        elif deep and manifest.file_hash(output) != entry['output_hash']:
+            problems.append(f"output modified after it was generated: {output}")
+    return len(manifest.outputs), problems
+
+
+def _sql_store_state(path: str, deep: bool):
+    conn = _sqlite_ro(path)
+    try:
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        missing = {'combined', 'district_summary', 'pincode_summary'} - tables
+        if missing:
+            return None, [f"SQL store {path} lacks tables: {sorted(missing)}"]
+        rows = conn.execute("SELECT COUNT(*) FROM combined").fetchone()[0]
+        problems = []
+        if deep:
+            check = conn.execute("PRAGMA quick_check").fetchone()[0]
+            if check != 'ok':
+                problems.append(f"SQL store {path} failed quick_check: {check}")
+        return rows, problems
+    finally:
+        conn.close()
+
+
+def _shared_plane_state(root: str):
+    version = _read_current(root)
+    if version is None:
+        return None, [f"shared dir {root} has no CURRENT version"]
+    meta_path = os.path.join(root, version, 'meta.json')
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError) as e:
+        return version, [f"shared version {version} unreadable: {e}"]
+    missing = [c['file'] for c in meta['columns'] if not os.path.exists(os.path.join(root, version, c['file']))]
+    return version, [f"shared version {version} missing column files: {missing}"] if missing else []
+
+
+def _collect(args):
+    """Status of sources and every cached artifact: pure stdlib, no data is loaded."""
+    data_dir = os.path.abspath(args.data_dir)
+    report = {"data_dir": data_dir, "sources": {}, "problems": []}
+    for name, paths in source_files(data_dir).items():
+        report["sources"][name] = {"files": len(paths), "bytes": sum(os.path.getsize(p) for p in paths)}
+        if not paths:
+            report["problems"].append(f"no source files for {name}")
+
+    manifest_path = os.path.join(data_dir, 'analysis_outputs', '.manifest.json')
+    if os.path.exists(manifest_path):
+        cwd = os.getcwd()
+        os.chdir(data_dir)   # Manifest paths are relative to the data dir
+        try:
+            outputs, problems = _manifest_state(manifest_path, args.deep)
+        finally:
+            os.chdir(cwd)
+        report["analysis_outputs"] = {"recorded": outputs, "stale_or_missing": len(problems)}
+        report["problems"] += problems
+
+    sql_store = os.environ.get("GOVOPTIMA_SQL_STORE")
+    if sql_store:
+        path = os.path.join(data_dir, sql_store)
+        if os.path.exists(path):
+            rows, problems = _sql_store_state(path, args.deep)
+            report["sql_store"] = {"path": path, "rows": rows}
+            report["problems"] += problems
+        else:
+            report["problems"].append(f"SQL store not built: {path}")
+
+    shared_dir = os.environ.get("GOVOPTIMA_SHARED_DIR")
+    if shared_dir:
+        version, problems = _shared_plane_state(os.path.join(data_dir, shared_dir))
+        report["shared_plane"] = {"root": shared_dir, "version": version}
+        report["problems"] += problems
+
+    jobs_db = os.path.join(data_dir, os.environ.get("GOVOPTIMA_JOB_DB", "govoptima_jobs.db"))
+    if os.path.exists(jobs_db):
+        conn = _sqlite_ro(jobs_db)
+        try:
+            report["jobs"] = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        except sqlite3.DatabaseError as e:
+            report["problems"].append(f"job queue {jobs_db} unreadable: {e}")
+        finally:
+            conn.close()
+    return report
+
+
+def cmd_status(args, timings: Timings):
+    with timings.phase('collect'):
+        report = _collect(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"📁 {report['data_dir']}")
+        for name, src in report["sources"].items():
+            print(f"  • {name:<12} {src['files']} file(s), {src['bytes'] / 1024 / 1024:.1f} MB")
+        for key in ('analysis_outputs', 'sql_store', 'shared_plane', 'jobs'):
+            if key in report:
+                print(f"  • {key:<12} {report[key]}")
+        print(f"{'⚠️ ' if report['problems'] else '✅'} {len(report['problems'])} problem(s)")
+        for problem in report["problems"]:
+            print(f"    - {problem}")
+    timings.report()
+    return 0
+
+
+def cmd_validate_cache(args, timings: Timings):
+    with timings.phase('validate'):
+        report = _collect(args)
+    for problem in report["problems"]:
+        print(f"❌ {problem}")
+    if not report["problems"]:
+        print("✅ All cached artifacts are consistent with their sources")
+    timings.report()
+    return 1 if report["problems"] else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='govoptima', description="GovOptima platform command line")
+    parser.add_argument('--data-dir', default=os.getcwd(), help="Directory with the source CSVs (default: cwd)")
+    parser.add_argument('--timings', action='store_true', help="Print per-phase import/run timings to stderr")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('serve', help="Run the dashboard and API server")
+    p.add_argument('--host', default='0.0.0.0')
+    p.add_argument('--port', type=int, default=int(os.environ.get("PORT", 8000)))
+    p.add_argument('--workers', type=int, default=int(os.environ.get("WEB_CONCURRENCY", 1)))
+    p.add_argument('--engine', choices=['pandas', 'cube'], help="Aggregation engine (GOVOPTIMA_ENGINE)")
+    p.add_argument('--sql-store', help="SQLite mirror path (GOVOPTIMA_SQL_STORE)")
+    p.add_argument('--shared-dir', help="Shared memory-mapped dataset dir (GOVOPTIMA_SHARED_DIR)")
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser('ingest', help="Load and process the source data; optionally persist it")
+    p.add_argument('--engine', choices=['pandas', 'cube'])
+    p.add_argument('--sql-store', help="Write the SQLite analytics store here")
+    p.add_argument('--shared-dir', help="Publish the processed dataset to this shared dir")
+    p.set_defaults(func=cmd_ingest)
+
+    p = sub.add_parser('report', help="Regenerate analysis_outputs/ with the report scripts")
+    p.add_argument('name', nargs='?', default='master_analysis',
+                   choices=['all', 'master_analysis', 'analysis_enrollment', 'analysis_biometric',
+                            'analysis_demographic'])
+    p.add_argument('--force', action='store_true', help="Regenerate even if up to date")
+    p.add_argument('--dry-run', action='store_true', help="Only list what would be rebuilt")
+    p.set_defaults(func=cmd_report)
+
+    # Everything after `bench` that govoptima does not know is handed to loadtest.py
+    p = sub.add_parser('bench', help="Load test a server (arguments are passed to loadtest.py)")
+    p.set_defaults(func=cmd_bench)
+
+    p = sub.add_parser('warm-cache', help="Build missing SQL store / shared dataset and prime a running server")
+    p.add_argument('--sql-store', help="Default: GOVOPTIMA_SQL_STORE")
+    p.add_argument('--shared-dir', help="Default: GOVOPTIMA_SHARED_DIR")
+    p.add_argument('--force', action='store_true', help="Rebuild even if present")
+    p.add_argument('--url', help="Base URL of a running server whose endpoint caches to prime")
+    p.add_argument('--timeout', type=float, default=60.0)
+    p.set_defaults(func=cmd_warm_cache)
+
+    p = sub.add_parser('status', help="Sources, cached artifacts and job queue at a glance")
+    p.add_argument('--json', action='store_true')
+    p.add_argument('--deep', action='store_true', help="Also hash outputs and integrity-check databases")
+    p.set_defaults(func=cmd_status)
+
+    p = sub.add_parser('validate-cache', help="Exit non-zero if any cached artifact is stale or broken")
+    p.add_argument('--deep', action='store_true', help="Also hash outputs and integrity-check databases")
+    p.set_defaults(func=cmd_validate_cache)
+
+    # Everything after `verify` is handed to equivalence.py
+    p = sub.add_parser('verify', help="Check optimized engines against the pandas reference on random data")
+    p.set_defaults(func=cmd_verify)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, args.extra = parser.parse_known_args(argv)
+    if args.extra and args.command not in ('bench', 'verify'):
+        parser.error(f"unrecognized arguments: {' '.join(args.extra)}")
+    args.data_dir = os.path.abspath(args.data_dir)
+    return args.func(args, Timings(args.timings))
+
+
+if __name__ == "__main__":
+    # Force UTF-8 for Windows consoles (the reports print emoji)
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+        sys.stderr.reconfigure(encoding='utf-8')
+    except AttributeError:
+        pass
+    sys.exit(main())
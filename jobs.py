@@ -0,0 +1,430 @@
+"""
+JOB QUEUE - GovOptima Platform
+Background execution of long-running reports and exports, so they no longer
+tie up request workers or run into proxy timeouts.
+  - persistent: jobs live in a WAL-mode SQLite table and survive restarts
+    (jobs whose worker process died are re-queued on startup; a worker is
+    identified by pid plus process start time, so a reused pid does not
+    keep a dead worker's job 'running')
+  - bounded: a fixed pool of worker threads claims queued jobs one at a time;
+    several server processes can share one queue file
+  - observable: status, progress (0..1) and a progress message per job
+  - retention: results are kept for a fixed time after completion, then deleted
+
+Job kinds are registered handlers. `run_script` runs the standalone analysis
+scripts (master_analysis.py, analysis_*.py) as subprocesses and zips their
+outputs together with the console log.
+"""
+
+import glob
+import json
+import os
+import re
+import shutil
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+import zipfile
+from datetime import datetime, timezone
+from typing import Optional
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_WORKERS = 2
+DEFAULT_RETENTION_HOURS = 24
+DEFAULT_QUEUE_LIMIT = 100
+DEFAULT_TIMEOUT = 3600
+POLL_SECONDS = 1.0
+PURGE_EVERY_SECONDS = 60
+
+# Standalone scripts runnable as jobs: (script, output files relative to the data dir,
+# progress marker printed at the start of each step, number of steps)
+SCRIPT_JOBS = {
+    'master_analysis': ('master_analysis.py', 'analysis_outputs/0[0-6]_*', r'^SECTION (\d+):', 6),
+    'analysis_enrollment': ('analysis_enrollment.py', 'analysis_outputs/enrollment_*', r'^(\d+)\. [A-Z]', 9),
+    'analysis_biometric': ('analysis_biometric.py', 'analysis_outputs/biometric_*', r'^(\d+)\. [A-Z]', 9),
+    'analysis_demographic': ('analysis_demographic.py', 'analysis_outputs/demographic_*', r'^(\d+)\. [A-Z]', 10),
+}
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobInterrupted(Exception):
+    """The server is shutting down; the job goes back to the queue."""
+
+
+def _iso(ts: Optional[float]):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts else None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True   # Exists but belongs to someone else
+    return True
+
+
+def _process_token(pid: int) -> Optional[str]:
+    """Identifies one run of process `pid`: boot id and start time (Linux), None where unavailable."""
+    try:
+        with open('/proc/sys/kernel/random/boot_id', 'r') as f:
+            boot_id = f.read().strip()
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            # Field 22 (starttime); the command name in field 2 may contain spaces
+            start_time = f.read().rsplit(')', 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+    return f"{boot_id}:{start_time}"
+
+
+def _owner_gone(pid: Optional[int], token: Optional[str]) -> bool:
+    """True when the process that claimed a job no longer runs (checked at startup)."""
+    if pid is None or pid == os.getpid():
+        # Ours is only starting up, so it holds no jobs: the pid belonged to an earlier run
+        return True
+    if not _pid_alive(pid):
+        return True
+    return token is not None and _process_token(pid) != token
+
+
+class JobContext:
+    """Handed to a job handler: its parameters, a private work directory and progress reporting."""
+
+    def __init__(self, queue: 'JobQueue', job_id: str, params: dict, work_dir: str):
+        self.queue = queue
+        self.job_id = job_id
+        self.params = params
+        self.work_dir = work_dir
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self.queue._cancel_requested(self.job_id)
+
+    def progress(self, fraction: float, message: str = None):
+        """Records progress; raises JobCancelled if the job was cancelled meanwhile."""
+        self.queue._update(self.job_id, progress=max(0.0, min(1.0, fraction)), message=message)
+        if self.cancel_requested:
+            raise JobCancelled()
+
+
+class JobQueue:
+    def __init__(self, db_path: str, result_dir: str, workers: int = DEFAULT_WORKERS,
+                 retention_seconds: float = DEFAULT_RETENTION_HOURS * 3600,
+                 queue_limit: int = DEFAULT_QUEUE_LIMIT, timeout: float = DEFAULT_TIMEOUT):
+        self.db_path = db_path
+        self.result_dir = os.path.abspath(result_dir)
+        self.retention_seconds = retention_seconds
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self.handlers = {}
+        self._local = threading.local()
+        self._wake = threading.Condition()
+        self._stop = threading.Event()
+        self._last_purge = 0.0
+        self._owner_token = _process_token(os.getpid())
+        os.makedirs(self.result_dir, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute('''CREATE TABLE IF NOT EXISTS jobs
+                        (id TEXT PRIMARY KEY,
+                         kind TEXT NOT NULL,
+                         params TEXT NOT NULL,
+                         status TEXT NOT NULL,
+                         progress REAL DEFAULT 0,
+                         message TEXT,
+                         error TEXT,
+                         result_path TEXT,
+                         media_type TEXT,
+                         filename TEXT,
+                         owner_pid INTEGER,
+                         owner_token TEXT,
+                         cancel_requested INTEGER DEFAULT 0,
+                         created_at REAL NOT NULL,
+                         started_at REAL,
+                         finished_at REAL,
+                         expires_at REAL)''')
+        if 'owner_token' not in [c[1] for c in conn.execute("PRAGMA table_info(jobs)")]:
+            conn.execute("ALTER TABLE jobs ADD COLUMN owner_token TEXT")   # Queue files from older versions
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at)")
+        self._recover()
+
+        self._workers = [threading.Thread(target=self._work_loop, name=f"job-worker-{i}", daemon=True)
+                         for i in range(max(1, workers))]
+        for worker in self._workers:
+            worker.start()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit; multi-statement claims use explicit BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _recover(self):
+        """Re-queues jobs left 'running' by a process that no longer exists."""
+        conn = self._conn()
+        rows = conn.execute("SELECT id, owner_pid, owner_token FROM jobs WHERE status = 'running'").fetchall()
+        for row in rows:
+            if _owner_gone(row['owner_pid'], row['owner_token']):
+                conn.execute("UPDATE jobs SET status = 'queued', owner_pid = NULL, owner_token = NULL, "
+                             "progress = 0, message = 'Re-queued after restart' "
+                             "WHERE id = ? AND status = 'running'",
+                             (row['id'],))
+
+    # === REGISTRATION / SUBMISSION ===
+
+    def register(self, kind: str, handler, description: str = ''):
+        """handler(ctx, params) -> {"path": file in ctx.work_dir, "media_type": ..., "filename": ...}"""
+        self.handlers[kind] = (handler, description)
+
+    def submit(self, kind: str, params: dict = None):
+        """Queues a job, or returns the identical job already queued/running. -> (job, created)"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}. Available: {sorted(self.handlers)}")
+        params_json = json.dumps(params or {}, sort_keys=True)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            existing = conn.execute("SELECT * FROM jobs WHERE kind = ? AND params = ? AND status IN "
+                                    "('queued', 'running') ORDER BY created_at LIMIT 1",
+                                    (kind, params_json)).fetchone()
+            if existing is not None:
+                conn.execute("COMMIT")
+                return self._to_dict(existing), False
+            queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if queued >= self.queue_limit:
+                raise QueueFull(f"{queued} jobs already queued")
+            job_id = uuid.uuid4().hex
+            conn.execute("INSERT INTO jobs (id, kind, params, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                         (job_id, kind, params_json, time.time()))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        with self._wake:
+            self._wake.notify()
+        return self.get(job_id), True
+
+    def cancel(self, job_id: str):
+        """Cancels a queued job outright; a running one is asked to stop at its next checkpoint."""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("UPDATE jobs SET status = 'cancelled', finished_at = ?, expires_at = ? "
+                     "WHERE id = ? AND status = 'queued'", (now, now + self.retention_seconds, job_id))
+        conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+        return self.get(job_id)
+
+    # === READS ===
+
+    def _to_dict(self, row):
+        job = {
+            "id": row['id'],
+            "kind": row['kind'],
+            "params": json.loads(row['params']),
+            "status": row['status'],
+            "progress": round(row['progress'] or 0, 3),
+            "message": row['message'],
+            "error": row['error'],
+            "created_at": _iso(row['created_at']),
+            "started_at": _iso(row['started_at']),
+            "finished_at": _iso(row['finished_at']),
+            "expires_at": _iso(row['expires_at']),
+        }
+        if row['status'] == 'succeeded':
+            job["result"] = {"filename": row['filename'], "media_type": row['media_type']}
+        if row['status'] == 'running' and row['cancel_requested']:
+            job["message"] = "Cancelling"
+        return job
+
+    def get(self, job_id: str):
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, status: str = None, limit: int = 50):
+        sql, params = "SELECT * FROM jobs", []
+        if status:
+            sql += " WHERE status = ?"
+            params.append(status)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        return [self._to_dict(r) for r in self._conn().execute(sql, params).fetchall()]
+
+    def result(self, job_id: str):
+        """(path, media_type, filename) of a finished job's result, or None."""
+        row = self._conn().execute("SELECT status, result_path, media_type, filename FROM jobs WHERE id = ?",
+                                   (job_id,)).fetchone()
+        if row is None or row['status'] != 'succeeded' or not os.path.exists(row['result_path'] or ''):
+            return None
+        return row['result_path'], row['media_type'], row['filename']
+
+    def status(self):
+        counts = {r['status']: r['n'] for r in
+                  self._conn().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()}
+        return {
+            "workers": len(self._workers),
+            "queue_limit": self.queue_limit,
+            "retention_hours": round(self.retention_seconds / 3600, 2),
+            "counts": counts,
+            "kinds": {kind: description for kind, (_, description) in sorted(self.handlers.items())},
+        }
+
+    # === EXECUTION ===
+
+    def _update(self, job_id: str, **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        self._conn().execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _cancel_requested(self, job_id: str) -> bool:
+        row = self._conn().execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def _claim(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE status = 'queued' "
+                               "ORDER BY created_at, rowid LIMIT 1").fetchone()
+            if row is not None:
+                conn.execute("UPDATE jobs SET status = 'running', owner_pid = ?, owner_token = ?, started_at = ?, "
+                             "message = 'Started' WHERE id = ?",
+                             (os.getpid(), self._owner_token, time.time(), row['id']))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return row
+
+    def _work_loop(self):
+        while not self._stop.is_set():
+            try:
+                row = self._claim()
+            except sqlite3.OperationalError:
+                row = None  # Locked by another process for longer than the busy timeout; retry
+            if row is None:
+                self._purge_expired()
+                with self._wake:
+                    self._wake.wait(timeout=POLL_SECONDS)
+                continue
+            self._run(row)
+
+    def _run(self, row):
+        job_id = row['id']
+        work_dir = os.path.join(self.result_dir, job_id)
+        os.makedirs(work_dir, exist_ok=True)
+        handler, _ = self.handlers.get(row['kind'], (None, None))
+        try:
+            if handler is None:
+                raise RuntimeError(f"No handler registered for job kind {row['kind']!r}")
+            result = handler(JobContext(self, job_id, json.loads(row['params']), work_dir),
+                             json.loads(row['params']))
+            now = time.time()
+            self._update(job_id, status='succeeded', progress=1.0, message='Done', finished_at=now,
+                         expires_at=now + self.retention_seconds, result_path=result['path'],
+                         media_type=result.get('media_type', 'application/octet-stream'),
+                         filename=result.get('filename', os.path.basename(result['path'])))
+        except JobInterrupted:
+            self._update(job_id, status='queued', owner_pid=None, owner_token=None, progress=0.0,
+                         message='Re-queued after shutdown')
+        except JobCancelled:
+            now = time.time()
+            self._update(job_id, status='cancelled', message='Cancelled', finished_at=now,
+                         expires_at=now + self.retention_seconds)
+        except Exception as e:
+            now = time.time()
+            self._update(job_id, status='failed', error=str(e), finished_at=now,
+                         expires_at=now + self.retention_seconds)
+
+    def _purge_expired(self):
+        """Deletes finished jobs (and their files) past their retention window."""
+        now = time.time()
+        if now - self._last_purge < PURGE_EVERY_SECONDS:
+            return
+        self._last_purge = now
+        conn = self._conn()
+        expired = conn.execute("SELECT id FROM jobs WHERE expires_at IS NOT NULL AND expires_at < ?",
+                               (now,)).fetchall()
+        for row in expired:
+            shutil.rmtree(os.path.join(self.result_dir, row['id']), ignore_errors=True)
+            conn.execute("DELETE FROM jobs WHERE id = ?", (row['id'],))
+
+    def close(self):
+        self._stop.set()
+        with self._wake:
+            self._wake.notify_all()
+        for worker in self._workers:
+            worker.join(timeout=5)
+
+
+def run_script(ctx: JobContext, kind: str, data_dir: str, timeout: float = DEFAULT_TIMEOUT):
+    """Runs one of SCRIPT_JOBS in `data_dir` and zips its outputs plus the console log."""
+    script, outputs, marker, steps = SCRIPT_JOBS[kind]
+    marker = re.compile(marker)
+    log_path = os.path.join(ctx.work_dir, 'console.log')
+    env = dict(os.environ, PYTHONIOENCODING='utf-8', PYTHONUNBUFFERED='1')
+    started = time.time()
+
+    with open(log_path, 'w', encoding='utf-8') as log:
+        proc = subprocess.Popen([sys.executable, os.path.join(CODE_DIR, script)], cwd=data_dir, env=env,
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                text=True, encoding='utf-8', errors='replace')
+        stopped = []
+
+        # Kills the script on timeout or cancellation even while it prints nothing
+        def watchdog():
+            while proc.poll() is None:
+                if time.time() - started > timeout:
+                    stopped.append('timeout')
+                elif ctx.queue._stop.is_set():
+                    stopped.append('shutdown')
+                elif ctx.cancel_requested:
+                    stopped.append('cancelled')
+                if stopped:
+                    proc.kill()
+                    return
+                time.sleep(POLL_SECONDS)
+
+        threading.Thread(target=watchdog, name=f"job-watchdog-{ctx.job_id[:8]}", daemon=True).start()
+        tail = []
+        for line in proc.stdout:
+            log.write(line)
+            text = line.strip()
+            if text:
+                tail = (tail + [text])[-20:]
+            match = marker.match(text)
+            if match:
+                ctx.queue._update(ctx.job_id, progress=min(0.95, int(match.group(1)) / (steps + 1)),
+                                  message=text)
+        code = proc.wait()
+
+    if stopped == ['shutdown']:
+        raise JobInterrupted()
+    if stopped == ['cancelled']:
+        raise JobCancelled()
+    if stopped == ['timeout']:
+        raise RuntimeError(f"{script} exceeded the {timeout:.0f}s job timeout")
+    if code != 0:
+        raise RuntimeError(f"{script} exited with status {code}: " + " | ".join(tail[-5:]))
+
+    ctx.progress(0.97, "Packaging outputs")
+    archive = os.path.join(ctx.work_dir, f"{kind}.zip")
+    with zipfile.ZipFile(archive, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for path in sorted(glob.glob(os.path.join(data_dir, outputs))):
+            zf.write(path, os.path.relpath(path, data_dir))
+        zf.write(log_path, 'console.log')
+    return {"path": archive, "media_type": "application/zip", "filename": f"{kind}.zip"}
@@ -0,0 +1,141 @@
+"""
+LOAD PROFILES - GovOptima Platform
+Per-district day-of-week and day-of-month load profiles. Enrollment,
+biometric and demographic volumes (and the api workload they add up to) are
+scatter-added into [district, bucket, metric] arrays in one pass, giving
+for every bucket:
+  - mean:  average load per calendar day in the bucket (days without activity count as 0)
+  - peak:  the busiest single day seen in the bucket
+  - share: the bucket's share of the district's total load
+Weekday staffing recommendations are read off these arrays, instead of
+sizing every day to the overall mean like the deep dive does.
+"""
+
+import numpy as np
+import pandas as pd
+
+from scenarios import DEFAULT_PARAMETERS
+
+PROFILE_METRICS = ['total_enrollment', 'total_biometric', 'total_demographic', 'api']
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+KINDS = {'weekday': 7, 'monthday': 31}
+TARGETS = ('peak', 'mean')
+
+
+class _Profile:
+    """Sum/peak/active-day arrays over one bucketing of the calendar."""
+
+    def __init__(self, n_districts: int, n_buckets: int, district_codes, row_buckets, values, date_buckets):
+        cells = district_codes * n_buckets + row_buckets
+        n_cells = n_districts * n_buckets
+        n_metrics = values.shape[1]
+        self.n_buckets = n_buckets
+        # Explicit shapes: with no districts (empty data) every array is simply empty
+        self.sums = np.zeros((n_cells, n_metrics))
+        for m in range(n_metrics):
+            self.sums[:, m] = np.bincount(cells, weights=values[:, m], minlength=n_cells)
+        self.sums = self.sums.reshape(n_districts, n_buckets, n_metrics)
+        peak = np.zeros((n_cells, n_metrics))
+        np.maximum.at(peak, cells, values)
+        self.peak = peak.reshape(n_districts, n_buckets, n_metrics)
+        self.active_days = np.bincount(cells, minlength=n_cells).reshape(n_districts, n_buckets)
+        # Calendar days per bucket in the dataset: the denominator for means
+        self.calendar_days = np.bincount(date_buckets, minlength=n_buckets)
+
+    def mean(self, i: int) -> np.ndarray:
+        days = self.calendar_days[:, None]
+        return np.divide(self.sums[i], days, out=np.zeros_like(self.sums[i]), where=days > 0)
+
+    def share(self, i: int) -> np.ndarray:
+        totals = self.sums[i].sum(axis=0, keepdims=True)
+        return np.divide(self.sums[i], totals, out=np.zeros_like(self.sums[i]), where=totals > 0)
+
+
+class LoadProfiles:
+    def __init__(self, districts, weekday: _Profile, monthday: _Profile, row_days: np.ndarray):
+        self.districts = pd.Index(districts)
+        self.profiles = {'weekday': weekday, 'monthday': monthday}
+        self.row_days = row_days      # Days with any activity per district (the deep dive's mean denominator)
+        self._lookup = {name.lower(): i for i, name in enumerate(self.districts)}
+
+    @classmethod
+    def from_combined(cls, df: pd.DataFrame):
+        if df is None or df.empty:
+            df = pd.DataFrame({'district': pd.Series(dtype=str), 'date': pd.Series(dtype='datetime64[ns]'),
+                               **{metric: pd.Series(dtype=np.float64) for metric in PROFILE_METRICS}})
+        district_codes, districts = pd.factorize(df['district'].astype(str), sort=True)
+        date_codes, dates = pd.factorize(pd.to_datetime(df['date']), sort=True)
+        dates = pd.DatetimeIndex(dates)
+        values = df[PROFILE_METRICS].to_numpy(dtype=np.float64)
+        n = len(districts)
+
+        # Bucket each unique date once, then map rows through their date code
+        weekday_of_date = dates.dayofweek.to_numpy()
+        monthday_of_date = dates.day.to_numpy() - 1
+        weekday = _Profile(n, 7, district_codes, weekday_of_date[date_codes], values, weekday_of_date)
+        monthday = _Profile(n, 31, district_codes, monthday_of_date[date_codes], values, monthday_of_date)
+        return cls(districts, weekday, monthday, np.bincount(district_codes, minlength=n))
+
+    def __contains__(self, district: str) -> bool:
+        return district.lower() in self._lookup
+
+    def _labels(self, kind: str):
+        return WEEKDAYS if kind == 'weekday' else [str(day) for day in range(1, 32)]
+
+    def profile(self, district: str, kind: str = 'weekday'):
+        """Mean/peak/share per bucket and metric for one district. Raises KeyError if unknown."""
+        if kind not in KINDS:
+            raise ValueError(f"kind must be one of {list(KINDS)}")
+        i = self._lookup[district.lower()]
+        prof = self.profiles[kind]
+        mean, share = prof.mean(i), prof.share(i)
+        buckets = []
+        for b, label in enumerate(self._labels(kind)):
+            buckets.append({
+                "bucket": label,
+                "calendar_days": int(prof.calendar_days[b]),
+                "active_days": int(prof.active_days[i, b]),
+                **{metric: {"mean": round(float(mean[b, m]), 2),
+                            "peak": round(float(prof.peak[i, b, m]), 2),
+                            "share": round(float(share[b, m]), 4)}
+                   for m, metric in enumerate(PROFILE_METRICS)}
+            })
+        return {"district": self.districts[i], "kind": kind, "buckets": buckets}
+
+    def weekday_staffing(self, district: str, target: str = 'peak', ops_per_kit: float = None):
+        """Kits per weekday sized to that weekday's peak (or mean) api load vs one flat mean-based level."""
+        if target not in TARGETS:
+            raise ValueError(f"target must be one of {list(TARGETS)}")
+        ops_per_kit = ops_per_kit or DEFAULT_PARAMETERS['ops_per_kit']
+        if ops_per_kit <= 0:
+            raise ValueError("ops_per_kit must be positive")
+        i = self._lookup[district.lower()]
+        prof = self.profiles['weekday']
+        api = PROFILE_METRICS.index('api')
+        mean, peak, share = prof.mean(i)[:, api], prof.peak[i, :, api], prof.share(i)[:, api]
+
+        # What the deep dive recommends: every day sized to the mean over active days
+        flat_load = prof.sums[i, :, api].sum() / max(1, self.row_days[i])
+        flat_kits = int(np.ceil(flat_load / ops_per_kit))
+        kits = np.ceil((peak if target == 'peak' else mean) / ops_per_kit).astype(np.int64)
+
+        days = []
+        for b, name in enumerate(WEEKDAYS):
+            days.append({
+                "weekday": name,
+                "mean_load": round(float(mean[b]), 2),
+                "peak_load": round(float(peak[b]), 2),
+                "share_of_weekly_load": round(float(share[b]), 4),
+                "kits_recommended": int(kits[b]),
+                "kits_vs_flat": int(kits[b]) - flat_kits,
+                "overloaded_at_flat": bool(peak[b] > flat_kits * ops_per_kit),
+            })
+        return {
+            "district": self.districts[i],
+            "target": target,
+            "ops_per_kit": ops_per_kit,
+            "flat_kits": flat_kits,
+            "weekly_kit_days": {"profile": int(kits.sum()), "flat": flat_kits * 7},
+            "peak_weekday": WEEKDAYS[int(np.argmax(peak))],
+            "weekdays": days,
+        }
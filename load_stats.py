@@ -0,0 +1,255 @@
+"""
+LOAD STATISTICS - GovOptima Platform
+Per-district distribution of daily load (stress_index, one value per district
+and day) so capacity can be sized to peaks instead of the mean:
+  - p50/p90/p95/p99 and max daily load
+  - peak days: days whose load exceeded the capacity the mean-based deep dive
+    recommends (ceil(mean / ops_per_kit) kits)
+Quantiles are exact when built (one lexsort of all rows, then interpolation
+at each district's offsets, same as np.percentile). Every district also gets
+a QuantileSketch of its daily loads; when a reload only appends new dates the
+sketch of the new rows is merged in and the quantiles of the districts that
+received rows are read off the merged sketch, instead of re-sorting the full
+history.
+"""
+
+import numpy as np
+import pandas as pd
+
+from scenarios import DEFAULT_PARAMETERS
+
+PERCENTILES = (50, 90, 95, 99)
+TARGETS = ('mean', 'p50', 'p90', 'p95', 'p99', 'max')
+RELATIVE_ACCURACY = 0.01
+LOAD_COLUMN = 'stress_index'
+
+
+class QuantileSketch:
+    """Log-bucketed counts of positive values per district (DDSketch-style).
+
+    A value v > 0 lands in bucket k = ceil(log_gamma(v)), gamma = (1+a)/(1-a),
+    and is read back as 2 * gamma**k / (gamma + 1): within relative error `a`
+    of the true quantile. Zero and negative values share one zero bucket.
+    Sketches over the same districts merge by adding their count arrays.
+    """
+
+    def __init__(self, counts: np.ndarray, zeros: np.ndarray, offset: int,
+                 relative_accuracy: float = RELATIVE_ACCURACY):
+        self.counts = counts            # [district, bucket] int64; bucket j holds key offset + j
+        self.zeros = zeros              # [district] values <= 0
+        self.offset = offset
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+
+    @classmethod
+    def from_values(cls, codes: np.ndarray, n_districts: int, values: np.ndarray,
+                    relative_accuracy: float = RELATIVE_ACCURACY):
+        sketch = cls(np.zeros((n_districts, 0), dtype=np.int64), np.zeros(n_districts, dtype=np.int64), 0,
+                     relative_accuracy)
+        positive = values > 0
+        sketch.zeros = np.bincount(codes[~positive], minlength=n_districts).astype(np.int64)
+        if positive.any():
+            keys = sketch.keys(values[positive])
+            sketch.offset = int(keys.min())
+            width = int(keys.max()) - sketch.offset + 1
+            cells = codes[positive] * width + (keys - sketch.offset)
+            sketch.counts = np.bincount(cells, minlength=n_districts * width).reshape(n_districts, width)
+        return sketch
+
+    def keys(self, values: np.ndarray) -> np.ndarray:
+        return np.ceil(np.log(values) / self._log_gamma).astype(np.int64)
+
+    def _widened(self, offset: int, width: int) -> np.ndarray:
+        counts = np.zeros((len(self.zeros), width), dtype=np.int64)
+        start = self.offset - offset
+        counts[:, start:start + self.counts.shape[1]] = self.counts
+        return counts
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        """Sum of two sketches over the same district rows (see DistrictLoadStats.append for alignment)."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        if not other.counts.shape[1]:
+            return QuantileSketch(self.counts.copy(), self.zeros + other.zeros, self.offset, self.relative_accuracy)
+        if not self.counts.shape[1]:
+            return QuantileSketch(other.counts.copy(), self.zeros + other.zeros, other.offset, self.relative_accuracy)
+        offset = min(self.offset, other.offset)
+        width = max(self.offset + self.counts.shape[1], other.offset + other.counts.shape[1]) - offset
+        return QuantileSketch(self._widened(offset, width) + other._widened(offset, width),
+                              self.zeros + other.zeros, offset, self.relative_accuracy)
+
+    def take(self, rows: np.ndarray, n_rows: int) -> 'QuantileSketch':
+        """The sketch re-indexed so district i lands on row rows[i] of an n_rows-district sketch."""
+        counts = np.zeros((n_rows, self.counts.shape[1]), dtype=np.int64)
+        zeros = np.zeros(n_rows, dtype=np.int64)
+        counts[rows] = self.counts
+        zeros[rows] = self.zeros
+        return QuantileSketch(counts, zeros, self.offset, self.relative_accuracy)
+
+    def quantiles(self, percentiles) -> np.ndarray:
+        """[district, percentile] estimates; NaN for districts without values."""
+        cumulative = np.cumsum(np.column_stack([self.zeros, self.counts]), axis=1)
+        totals = cumulative[:, -1]
+        out = np.full((len(totals), len(percentiles)), np.nan)
+        if not len(totals):
+            return out
+        bucket_values = np.concatenate([[0.0], 2 * self.gamma ** np.arange(
+            self.offset, self.offset + self.counts.shape[1], dtype=np.float64) / (self.gamma + 1)])
+
+        def at_rank(rank):
+            return bucket_values[(cumulative > rank[:, None]).argmax(axis=1)]
+
+        for j, p in enumerate(percentiles):
+            # Interpolated between neighbouring order statistics, like the exact quantiles
+            position = p / 100 * (totals - 1)
+            lower = np.floor(position)
+            fraction = position - lower
+            estimate = at_rank(lower) * (1 - fraction) + at_rank(np.ceil(position)) * fraction
+            out[:, j] = np.where(totals > 0, estimate, np.nan)
+        return out
+
+    def count_above(self, thresholds: np.ndarray) -> np.ndarray:
+        """Per-district number of values in buckets lying entirely above each district's threshold."""
+        if not self.counts.shape[1]:
+            return np.zeros(len(self.zeros), dtype=np.int64)
+        safe = np.where(thresholds > 0, thresholds, 1.0)
+        first = np.where(thresholds > 0, self.keys(safe) + 1, self.offset) - self.offset
+        above = np.arange(self.counts.shape[1])[None, :] >= first[:, None]
+        return (self.counts * above).sum(axis=1) + np.where(thresholds < 0, self.zeros, 0)
+
+
+def _exact_quantiles(codes: np.ndarray, n_districts: int, values: np.ndarray) -> np.ndarray:
+    """[district, percentile] with np.percentile's linear interpolation, for all districts in one sort."""
+    order = np.lexsort((values, codes))
+    ordered = values[order]
+    counts = np.bincount(codes, minlength=n_districts)
+    starts = np.cumsum(counts) - counts
+    out = np.full((n_districts, len(PERCENTILES)), np.nan)
+    present = counts > 0
+    for j, p in enumerate(PERCENTILES):
+        position = p / 100 * (counts[present] - 1)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        fraction = position - lower
+        base = starts[present]
+        out[present, j] = ordered[base + lower] * (1 - fraction) + ordered[base + upper] * fraction
+    return out
+
+
+class DistrictLoadStats:
+    def __init__(self, districts, days, totals, maxima, quantiles, exact, sketch: QuantileSketch,
+                 peak_days, ops_per_kit: float):
+        self.districts = pd.Index(districts)
+        self.days = days                # Days with a load value per district
+        self.totals = totals
+        self.maxima = maxima
+        self.quantiles = quantiles      # [district, PERCENTILES]
+        self.exact = exact              # False where quantiles/peak days come from the merged sketch
+        self.sketch = sketch
+        self.peak_days = peak_days
+        self.ops_per_kit = ops_per_kit
+        self._lookup = {name.lower(): i for i, name in enumerate(self.districts)}
+
+    @staticmethod
+    def _rows(df: pd.DataFrame):
+        values = df[LOAD_COLUMN].to_numpy(dtype=np.float64)
+        finite = np.isfinite(values)
+        codes, districts = pd.factorize(df['district'].astype(str)[finite], sort=True)
+        return codes, districts, values[finite]
+
+    @classmethod
+    def from_combined(cls, df: pd.DataFrame, ops_per_kit: float = None):
+        ops_per_kit = ops_per_kit or DEFAULT_PARAMETERS['ops_per_kit']
+        codes, districts, values = cls._rows(df)
+        n = len(districts)
+        days = np.bincount(codes, minlength=n)
+        totals = np.bincount(codes, weights=values, minlength=n).astype(np.float64)   # int64 when empty
+        maxima = np.full(n, -np.inf)
+        np.maximum.at(maxima, codes, values)
+
+        capacity = cls._capacity(totals, days, ops_per_kit)
+        peak_days = np.bincount(codes, weights=values > capacity[codes], minlength=n).astype(np.int64)
+        return cls(districts, days, totals, maxima, _exact_quantiles(codes, n, values), np.ones(n, dtype=bool),
+                   QuantileSketch.from_values(codes, n, values), peak_days, ops_per_kit)
+
+    @staticmethod
+    def _capacity(totals, days, ops_per_kit):
+        """Load the deep dive's mean-sized kits can absorb per day."""
+        mean = np.divide(totals, days, out=np.zeros_like(totals), where=days > 0)
+        return np.ceil(mean / ops_per_kit) * ops_per_kit
+
+    def append(self, df: pd.DataFrame) -> 'DistrictLoadStats':
+        """Stats after adding rows for new dates; districts without new rows keep their values untouched."""
+        codes, districts, values = self._rows(df)
+        if not len(values):
+            return self
+        merged = self.districts.union(districts).sort_values()
+        n = len(merged)
+        old_rows = merged.get_indexer(self.districts)
+        new_rows = merged.get_indexer(districts)
+
+        def widen(array, fill):
+            out = np.full((n,) + array.shape[1:], fill, dtype=array.dtype)
+            out[old_rows] = array
+            return out
+
+        days = widen(self.days, 0)
+        totals = widen(self.totals, 0.0)
+        maxima = widen(self.maxima, -np.inf)
+        quantiles = widen(self.quantiles, np.nan)
+        exact = widen(self.exact, True)
+        peak_days = widen(self.peak_days, 0)
+
+        np.add.at(days, new_rows[codes], 1)
+        np.add.at(totals, new_rows[codes], values)
+        np.maximum.at(maxima, new_rows[codes], values)
+        added = QuantileSketch.from_values(codes, len(districts), values, self.sketch.relative_accuracy)
+        sketch = self.sketch.take(old_rows, n).merge(added.take(new_rows, n))
+
+        touched = np.zeros(n, dtype=bool)
+        touched[new_rows] = True
+        quantiles[touched] = sketch.quantiles(PERCENTILES)[touched]
+        # Sketch buckets are relative, the max is exact: never report a percentile above it
+        quantiles[touched] = np.minimum(quantiles[touched], maxima[touched, None])
+        capacity = self._capacity(totals, days, self.ops_per_kit)
+        peak_days[touched] = sketch.count_above(capacity)[touched]
+        exact[touched] = False
+        return DistrictLoadStats(merged, days, totals, maxima, quantiles, exact, sketch, peak_days, self.ops_per_kit)
+
+    def __contains__(self, district: str) -> bool:
+        return district.lower() in self._lookup
+
+    def loads(self, target: str = 'mean') -> pd.Series:
+        """Daily load per district at `target` (mean, p50..p99 or max)."""
+        if target not in TARGETS:
+            raise ValueError(f"target must be one of {list(TARGETS)}")
+        if target == 'mean':
+            values = np.divide(self.totals, self.days, out=np.zeros_like(self.totals), where=self.days > 0)
+        elif target == 'max':
+            values = self.maxima
+        else:
+            values = self.quantiles[:, PERCENTILES.index(int(target[1:]))]
+        return pd.Series(values, index=self.districts)
+
+    def load(self, district: str, target: str = 'mean') -> float:
+        """Daily load of one district at `target`. Raises KeyError if unknown."""
+        return float(self.loads(target).iloc[self._lookup[district.lower()]])
+
+    def district(self, district: str):
+        """Distribution summary of one district's daily load. Raises KeyError if unknown."""
+        i = self._lookup[district.lower()]
+        days = int(self.days[i])
+        mean = self.totals[i] / days if days else 0.0
+        return {
+            "district": self.districts[i],
+            "days": days,
+            "mean": round(float(mean), 2),
+            **{f"p{p}": round(float(self.quantiles[i, j]), 2) for j, p in enumerate(PERCENTILES)},
+            "max": round(float(self.maxima[i]), 2),
+            "peak_days": int(self.peak_days[i]),
+            "peak_threshold": float(np.ceil(mean / self.ops_per_kit) * self.ops_per_kit),
+            "ops_per_kit": self.ops_per_kit,
+            "method": "exact" if self.exact[i] else "sketch",
+            "relative_accuracy": None if self.exact[i] else self.sketch.relative_accuracy,
+        }
@@ -0,0 +1,372 @@
+"""
+LOAD TEST - GovOptima Platform
+Replays the dashboard's request mix (the fetch sequence in templates/index.html)
+against a running server to measure how many concurrent users one instance
+can take. Stdlib only: a minimal asyncio HTTP/1.1 keep-alive client, one
+connection per virtual user, like a browser tab.
+
+Closed loop (fixed number of users, back-to-back sessions):
+    python loadtest.py --url http://127.0.0.1:8000 --concurrency 16 --duration 30
+Open loop (Poisson session arrivals per second):
+    python loadtest.py --rate 5 --duration 30
+Saturation sweep, reporting the knee (max throughput / p95 latency):
+    python loadtest.py --spawn --sweep 1,2,4,8,16,32,64 --duration 15 --json sweep.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+import numpy as np
+
+# Probabilities of each dashboard action after the initial page load (index.html handlers)
+ACTION_WEIGHTS = {
+    'apply_filter': 0.30,      # districtFilter onchange -> loadStats + loadCharts
+    'resources': 0.15,         # loadResourceData
+    'migration': 0.15,         # loadMigrationData
+    'cost': 0.10,              # loadCostData
+    'efficiency': 0.10,        # loadEfficiencyData
+    'compare': 0.15,           # compareDistricts
+    'export': 0.05,            # exportData
+}
+ACTIONS_PER_SESSION = 5
+# trendsUrl() asks for about one point per pixel of the trend chart (800px fallback width)
+TRENDS_MAX_POINTS = 800
+
+
+class HttpConnection:
+    """Just enough HTTP/1.1 for GET requests over one keep-alive connection."""
+
+    def __init__(self, host: str, port: int, timeout: float):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.reader = self.writer = None
+
+    async def get(self, path: str):
+        """Returns (status, body bytes); reconnects once if the server closed the connection."""
+        for attempt in (0, 1):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.timeout)
+            try:
+                return await asyncio.wait_for(self._roundtrip(path), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                await self.close()
+                if attempt:
+                    raise
+
+    async def _roundtrip(self, path: str):
+        self.writer.write(f"GET {path} HTTP/1.1\r\nHost: {self.host}\r\nAccept: */*\r\n\r\n".encode())
+        await self.writer.drain()
+        status_line = await self.reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = bytearray()
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).split(b';')[0], 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                body += chunk[:-2]
+        else:
+            body = await self.reader.readexactly(int(headers.get('content-length', 0)))
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, bytes(body)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        self.reader = self.writer = None
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}   # endpoint -> [seconds]
+        self.errors = {}      # endpoint -> count
+        self.sessions = 0
+
+    def record(self, endpoint: str, seconds: float, ok: bool):
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        if not ok:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def report(self, elapsed: float):
+        endpoints = {}
+        all_latencies = []
+        for endpoint, values in sorted(self.latencies.items()):
+            arr = np.array(values) * 1000
+            all_latencies.extend(values)
+            errors = self.errors.get(endpoint, 0)
+            endpoints[endpoint] = {
+                "requests": len(values),
+                "errors": errors,
+                "error_rate": round(errors / len(values), 4),
+                "p50_ms": round(float(np.percentile(arr, 50)), 2),
+                "p95_ms": round(float(np.percentile(arr, 95)), 2),
+                "p99_ms": round(float(np.percentile(arr, 99)), 2),
+                "mean_ms": round(float(arr.mean()), 2),
+                "max_ms": round(float(arr.max()), 2),
+            }
+        total = len(all_latencies)
+        errors = sum(self.errors.values())
+        overall = np.array(all_latencies) * 1000 if total else np.zeros(1)
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "sessions": self.sessions,
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "p50_ms": round(float(np.percentile(overall, 50)), 2),
+            "p95_ms": round(float(np.percentile(overall, 95)), 2),
+            "p99_ms": round(float(np.percentile(overall, 99)), 2),
+            "endpoints": endpoints,
+        }
+
+
+class DashboardSession:
+    """One page load followed by a few user actions, issuing the dashboard's requests in order."""
+
+    def __init__(self, conn: HttpConnection, recorder: Recorder, districts, think: float, rng: random.Random):
+        self.conn, self.recorder, self.districts, self.think, self.rng = conn, recorder, districts, think, rng
+
+    async def fetch(self, path: str):
+        endpoint = path.split('?')[0]
+        started = time.perf_counter()
+        try:
+            status, _ = await self.conn.get(path)
+            ok = status < 400
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            await self.conn.close()
+            ok = False
+        self.recorder.record(endpoint, time.perf_counter() - started, ok)
+
+    def district_query(self):
+        # Most viewers stay on "All districts"; the rest pick one
+        if not self.districts or self.rng.random() < 0.4:
+            return ''
+        return '?district=' + urllib.parse.quote(self.rng.choice(self.districts))
+
+    async def pause(self):
+        if self.think > 0:
+            await asyncio.sleep(self.rng.expovariate(1 / self.think))
+
+    async def run(self):
+        # init(): districts, then refreshAllData() = loadStats + loadCharts
+        await self.fetch('/')
+        await self.fetch('/api/districts')
+        await self.fetch('/api/stats')
+        await self.fetch('/api/stress_heatmap')
+        await self.fetch(f'/api/trends?max_points={TRENDS_MAX_POINTS}')
+
+        actions, weights = zip(*ACTION_WEIGHTS.items())
+        for action in self.rng.choices(actions, weights, k=ACTIONS_PER_SESSION):
+            await self.pause()
+            q = self.district_query()
+            if action == 'apply_filter':
+                await self.fetch(f'/api/stats{q}')
+                await self.fetch('/api/stress_heatmap')
+                await self.fetch(f"/api/trends{q}{'&' if q else '?'}max_points={TRENDS_MAX_POINTS}")
+            elif action == 'resources':
+                await self.fetch(f'/api/resource_recommendations{q}')
+            elif action == 'migration':
+                await self.fetch('/api/migration_alerts')
+            elif action == 'cost':
+                await self.fetch(f'/api/stats{q}')
+            elif action == 'efficiency':
+                await self.fetch('/api/efficiency_metrics')
+            elif action == 'compare':
+                await self.fetch('/api/districts')
+                a, b = (self.rng.sample(self.districts, 2) if len(self.districts) >= 2 else ['', ''])
+                await self.fetch(f'/api/stats?district={urllib.parse.quote(a)}')
+                await self.fetch(f'/api/stats?district={urllib.parse.quote(b)}')
+            elif action == 'export':
+                await self.fetch('/api/export_report')
+        self.recorder.sessions += 1
+
+
+def fetch_districts(base_url: str):
+    with urllib.request.urlopen(base_url.rstrip('/') + '/api/districts', timeout=30) as res:
+        return json.load(res).get('districts', [])
+
+
+async def run_closed_loop(host, port, districts, concurrency, duration, think, timeout, seed):
+    """`concurrency` users, each running sessions back to back until the deadline."""
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+
+    async def user(i):
+        rng = random.Random(seed + i)
+        conn = HttpConnection(host, port, timeout)
+        try:
+            while time.perf_counter() < deadline:
+                await DashboardSession(conn, recorder, districts, think, rng).run()
+        finally:
+            await conn.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(concurrency)))
+    return recorder.report(time.perf_counter() - started)
+
+
+async def run_open_loop(host, port, districts, rate, duration, think, timeout, seed, max_inflight):
+    """Sessions arrive as a Poisson process at `rate` per second, independent of response times."""
+    recorder = Recorder()
+    rng = random.Random(seed)
+    inflight = set()
+    dropped = 0
+
+    async def session(i):
+        conn = HttpConnection(host, port, timeout)
+        try:
+            await DashboardSession(conn, recorder, districts, think, random.Random(seed + i)).run()
+        finally:
+            await conn.close()
+
+    started = time.perf_counter()
+    i = 0
+    while time.perf_counter() - started < duration:
+        await asyncio.sleep(rng.expovariate(rate))
+        if len(inflight) >= max_inflight:
+            dropped += 1  # The client itself is saturated; count it rather than queue forever
+            continue
+        task = asyncio.create_task(session(i))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+        i += 1
+    if inflight:
+        await asyncio.gather(*inflight)
+    report = recorder.report(time.perf_counter() - started)
+    report["dropped_sessions"] = dropped
+    return report
+
+
+def find_knee(results):
+    """Load level with the highest power (throughput / p95 latency), the classic saturation knee."""
+    healthy = [r for r in results if r["error_rate"] <= 0.01 and r["p95_ms"] > 0]
+    if not healthy:
+        return None
+    best = max(healthy, key=lambda r: r["throughput_rps"] / r["p95_ms"])
+    return best["level"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(data_dir: str, port: int, workers: int):
+    """Starts `uvicorn main:app` from the data directory and waits until it answers."""
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    cmd = [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(port),
+           '--app-dir', app_dir, '--log-level', 'warning', '--workers', str(workers)]
+    proc = subprocess.Popen(cmd, cwd=data_dir)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 180
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited with code {proc.returncode}")
+        try:
+            fetch_districts(base_url)
+            return proc, base_url
+        except OSError:
+            time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError("Server did not become ready within 180s")
+
+
+def print_report(label, report):
+    print(f"\n== {label}: {report['requests']} requests, {report['sessions']} sessions in {report['elapsed_s']}s "
+          f"-> {report['throughput_rps']} req/s, errors {report['error_rate']:.2%}, "
+          f"p50/p95/p99 {report['p50_ms']}/{report['p95_ms']}/{report['p99_ms']} ms")
+    print(f"   {'endpoint':<34}{'reqs':>7}{'err%':>7}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for endpoint, s in report['endpoints'].items():
+        print(f"   {endpoint:<34}{s['requests']:>7}{s['error_rate'] * 100:>6.1f}%"
+              f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay the GovOptima dashboard request mix under load.")
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of a running server')
+    parser.add_argument('--spawn', action='store_true', help='Start a local uvicorn server for the run')
+    parser.add_argument('--data-dir', default=os.getcwd(), help='Working directory for --spawn (CSV location)')
+    parser.add_argument('--workers', type=int, default=1, help='uvicorn workers for --spawn')
+    parser.add_argument('--concurrency', type=int, default=8, help='Closed loop: concurrent users')
+    parser.add_argument('--rate', type=float, help='Open loop: session arrivals per second (overrides --concurrency)')
+    parser.add_argument('--max-inflight', type=int, default=1000, help='Open loop: cap on concurrent sessions')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds per run (per level when sweeping)')
+    parser.add_argument('--think', type=float, default=0.0, help='Mean think time between actions, seconds')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout, seconds')
+    parser.add_argument('--sweep', help='Comma-separated levels (concurrency, or rates with --rate)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='Write the full report to this file')
+    args = parser.parse_args(argv)
+
+    proc = None
+    base_url = args.url
+    if args.spawn:
+        proc, base_url = spawn_server(args.data_dir, free_port(), args.workers)
+    try:
+        parsed = urllib.parse.urlsplit(base_url)
+        host, port = parsed.hostname, parsed.port or 80
+        districts = fetch_districts(base_url)
+        open_loop = args.rate is not None
+
+        def run(level):
+            if open_loop:
+                return asyncio.run(run_open_loop(host, port, districts, level, args.duration, args.think,
+                                                 args.timeout, args.seed, args.max_inflight))
+            return asyncio.run(run_closed_loop(host, port, districts, int(level), args.duration, args.think,
+                                               args.timeout, args.seed))
+
+        unit = 'sessions/s' if open_loop else 'users'
+        if args.sweep:
+            results = []
+            for level in [float(x) for x in args.sweep.split(',')]:
+                report = run(level)
+                report["level"] = level
+                results.append(report)
+                print_report(f"{level:g} {unit}", report)
+            knee = find_knee(results)
+            print(f"\n{'level':>10}{'req/s':>10}{'p95 ms':>10}{'err%':>8}")
+            for r in results:
+                marker = '  <- knee' if r["level"] == knee else ''
+                print(f"{r['level']:>10g}{r['throughput_rps']:>10.1f}{r['p95_ms']:>10.1f}{r['error_rate'] * 100:>7.1f}%{marker}")
+            output = {"mode": "open" if open_loop else "closed", "unit": unit, "knee": knee, "levels": results}
+        else:
+            level = args.rate if open_loop else args.concurrency
+            output = run(level)
+            output["level"] = level
+            print_report(f"{level:g} {unit}", output)
+
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(output, f, indent=2)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,30 @@
-from fastapi import FastAPI, Query, Form, UploadFile, File
+from fastapi import FastAPI, Query, Form, UploadFile, File, Body, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from analysis import GovernanceAnalyst
+from annotation_store import AnnotationStore
+from sql_store import AnalyticsStore
+from shared_data import SharedDataPlane
+from asset_cache import AssetCache
+from wire_formats import negotiate, frame_response
+from events import EventBroker, district_deltas
+from scenarios import ScenarioEngine, DEFAULT_PARAMETERS
+from allocation import AllocationPlanner, district_loads, pincode_loads, default_capacity
+from dataset_registry import DatasetRegistry, discover_datasets
+from query_engine import QueryEngine, QueryError, json_records
+from downsampling import downsample_frame
+from admission import AdmissionController
+from similarity import SimilarityIndex, DEFAULT_TOP_K
+from load_profiles import LoadProfiles
+from load_stats import DistrictLoadStats
+from jobs import JobQueue, QueueFull, SCRIPT_JOBS, run_script
+from fingerprints import DistrictResponseCache
+from fastapi.concurrency import run_in_threadpool
+import threading
+from typing import List
+import pandas as pd
 import os
 import json
 import sys
@@ -34,10 +55,163 @@ app.add_middleware(
 # Serve static files and templates
 templates = Jinja2Templates(directory="templates")
 
+# Dashboard and static assets are read once, precompressed and served with ETags
+asset_cache = AssetCache()
+
 data_path = os.getcwd() # Use current working directory
 analyst = GovernanceAnalyst(data_path)
-analyst.load_data()
-analyst.process_data()
+
+# Optional SQLite mirror of combined_df for ad-hoc queries (GOVOPTIMA_SQL_STORE=path/to/store.db)
+sql_store_path = os.environ.get("GOVOPTIMA_SQL_STORE")
+
+# Multi-worker mode (GOVOPTIMA_SHARED_DIR=path): one loader publishes combined_df as
+# memory-mapped columns and every worker maps the same read-only arrays
+shared_dir = os.environ.get("GOVOPTIMA_SHARED_DIR")
+shared_plane = SharedDataPlane(shared_dir, data_dir=data_path) if shared_dir else None
+
+def build_dataset():
+    analyst.load_data()
+    return analyst.process_data(sql_store=sql_store_path)
+
+if shared_plane is not None:
+    shared_plane.ensure_published(build_dataset)
+    shared_plane.refresh(analyst, force=True)
+    analyst.track_changes()
+elif sql_store_path and os.environ.get("GOVOPTIMA_FAST_START") and os.path.exists(sql_store_path):
+    analyst.load_from_store(sql_store_path)
+else:
+    build_dataset()
+
+# Named datasets besides the default one (GOVOPTIMA_DATASETS=datasets.json and/or
+# GOVOPTIMA_DATASETS_DIR=dir of dataset folders), selected with ?dataset=name. They load on
+# first use and are evicted LRU once resident data exceeds GOVOPTIMA_DATASET_MEMORY_MB
+DEFAULT_DATASET = "default"
+datasets = DatasetRegistry(
+    discover_datasets(os.environ.get("GOVOPTIMA_DATASETS"), os.environ.get("GOVOPTIMA_DATASETS_DIR")),
+    memory_budget_mb=float(os.environ.get("GOVOPTIMA_DATASET_MEMORY_MB", 1024)),
+    on_evict=lambda name, evicted: forget_dataset(evicted.data_dir)
+)
+datasets.register(DEFAULT_DATASET, analyst, pin=True)
+
+def resolve_dataset(name: str = None) -> GovernanceAnalyst:
+    if not name or name == DEFAULT_DATASET:
+        return analyst
+    try:
+        return datasets.get(name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset: {name}")
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+# Derived engines below are keyed by content_version (the data fingerprint), so a reload that
+# changes nothing keeps them; per-district responses are cached in district_cache, which drops
+# only the entries of districts whose fingerprint changed
+district_cache = DistrictResponseCache(int(os.environ.get("GOVOPTIMA_DISTRICT_CACHE_ENTRIES", 4096)))
+
+def cached_district_response(analyst: GovernanceAnalyst, name: str, district, params: dict, compute,
+                             calendar: bool = False):
+    if analyst.fingerprint is None:
+        return compute()
+    return district_cache.get_or_compute(analyst.data_dir, analyst.fingerprint, name, district, params,
+                                         compute, calendar=calendar)
+
+# What-if cost model per dataset; per-district inputs are rebuilt only when its data changes
+_scenario_engines = {}
+
+def get_scenario_engine(analyst: GovernanceAnalyst):
+    key = analyst.data_dir
+    version, engine = _scenario_engines.get(key, (None, None))
+    if engine is None or version != analyst.content_version:
+        engine = ScenarioEngine.from_combined(analyst.combined_df)
+        _scenario_engines[key] = (analyst.content_version, engine)
+    return engine
+
+# District similarity index per dataset, rebuilt (top-k neighbours only) when its data changes
+GOVOPTIMA_SIMILARITY_METRIC = os.environ.get("GOVOPTIMA_SIMILARITY_METRIC", "correlation")
+_similarity_indexes = {}
+
+def get_similarity_index(analyst: GovernanceAnalyst):
+    key = analyst.data_dir
+    version, index = _similarity_indexes.get(key, (None, None))
+    if index is None or version != analyst.content_version:
+        index = SimilarityIndex.from_combined(analyst.combined_df, metric=GOVOPTIMA_SIMILARITY_METRIC)
+        _similarity_indexes[key] = (analyst.content_version, index)
+    return index
+
+# Day-of-week / day-of-month load profiles per dataset, one vectorized pass per data change
+_load_profiles = {}
+
+def get_load_profiles(analyst: GovernanceAnalyst):
+    key = analyst.data_dir
+    version, profiles = _load_profiles.get(key, (None, None))
+    if profiles is None or version != analyst.content_version:
+        profiles = LoadProfiles.from_combined(analyst.combined_df)
+        _load_profiles[key] = (analyst.content_version, profiles)
+    return profiles
+
+# Percentile/peak statistics of daily load per dataset. A version that only appends dates
+# merges the new rows' quantile sketches in; any other change rebuilds exact statistics.
+_load_stats = {}
+
+def get_load_stats(analyst: GovernanceAnalyst):
+    key = analyst.data_dir
+    version, fingerprint, stats = _load_stats.get(key, (None, None, None))
+    if stats is not None and version == analyst.content_version:
+        return stats
+    change = analyst.fingerprint.diff(fingerprint) if stats is not None and fingerprint is not None \
+        and analyst.fingerprint is not None else None
+    if change and not change["dates"]["changed"] and not change["dates"]["removed"]:
+        df = analyst.combined_df
+        added = pd.to_datetime(change["dates"]["added"])
+        stats = stats.append(df[pd.to_datetime(df['date']).isin(added)])
+    else:
+        stats = DistrictLoadStats.from_combined(analyst.combined_df)
+    _load_stats[key] = (analyst.content_version, analyst.fingerprint, stats)
+    return stats
+
+def forget_dataset(data_dir: str):
+    """Frees everything derived from an evicted dataset; it is rebuilt if the dataset loads again."""
+    for cache in (_scenario_engines, _similarity_indexes, _load_profiles, _load_stats):
+        cache.pop(data_dir, None)
+    for key in [k for k in _allocation_loads if k[0] == data_dir]:
+        _allocation_loads.pop(key, None)
+    query_engine.forget(data_dir)
+    district_cache.forget(data_dir)
+
+# Built at load time for the default dataset; named datasets build theirs on first use.
+# A failure here must not keep the server from starting: the endpoints retry on demand
+for build_index in (get_similarity_index, get_load_profiles, get_load_stats):
+    try:
+        build_index(analyst)
+    except Exception as e:
+        print(f"Warning: could not build {build_index.__name__[4:]} at startup: {e}")
+
+# Single-flight coalescing of identical requests plus per-endpoint concurrency/queue limits;
+# excess load is shed with 503 + Retry-After instead of piling up in the threadpool
+# (GOVOPTIMA_ADMISSION=off disables it)
+admission = AdmissionController()
+if os.environ.get("GOVOPTIMA_ADMISSION", "on").lower() != "off":
+    app.middleware("http")(admission)
+
+# Push channel: dashboards are told when the dataset changes and which districts moved
+event_broker = EventBroker()
+reload_lock = threading.Lock()
+
+def announce_dataset(old_df):
+    if event_broker.subscriber_count == 0:
+        return
+    deltas = district_deltas(old_df, analyst.combined_df)
+    event_broker.publish("dataset", {"version": analyst.version, **deltas})
+
+if shared_plane is not None:
+    @app.middleware("http")
+    async def refresh_shared_dataset(request, call_next):
+        # Cheap throttled stat() of the CURRENT pointer; remaps when a new version is published
+        old_df = analyst.combined_df
+        if shared_plane.refresh(analyst):
+            await run_in_threadpool(analyst.track_changes)
+            await run_in_threadpool(announce_dataset, old_df)
+        return await call_next(request)
 
 # Initialize vulnerable SQLite database for comments
 def init_db():
@@ -71,66 +245,204 @@ except Exception as e:
     print(f"Warning: Could not initialize database: {e}")
     print("Continuing without comment system...")
 
+# Long-lived WAL-mode store serving district annotations from the comments table
+try:
+    annotation_store = AnnotationStore('vulnerable_comments.db')
+except Exception as e:
+    annotation_store = None
+    print(f"Warning: Could not open annotation store: {e}")
+
+@app.on_event("shutdown")
+def close_annotation_store():
+    if annotation_store is not None:
+        annotation_store.close()
+
 
 @app.get("/", response_class=HTMLResponse)
-async def read_root():
+async def read_root(request: Request):
     try:
-        # Explicitly use utf-8 to handle emojis/special chars on Windows
-        with open(os.path.join(data_path, "templates", "index.html"), "r", encoding="utf-8") as f:
-            return f.read()
+        # no-cache = always revalidate; repeat visits get a 304 against the ETag
+        return asset_cache.response(request, os.path.join(data_path, "templates", "index.html"))
     except Exception as e:
-        return f"<h1>Error loading dashboard: {e}</h1>"
+        return HTMLResponse(f"<h1>Error loading dashboard: {e}</h1>")
+
+@app.get("/static/{asset_path:path}")
+async def get_static_asset(asset_path: str, request: Request):
+    static_root = os.path.realpath(os.path.join(data_path, "static"))
+    full_path = os.path.realpath(os.path.join(static_root, asset_path))
+    if not full_path.startswith(static_root + os.sep) or not os.path.isfile(full_path):
+        return JSONResponse({"error": "Not found"}, status_code=404)
+    return asset_cache.response(request, full_path, cache_control="public, max-age=3600")
+
+@app.get("/api/datasets")
+def list_datasets():
+    """Registered datasets, which are resident, memory use and load/eviction metrics"""
+    return datasets.status()
+
+@app.get("/api/admission")
+def get_admission_status():
+    """Per-endpoint limits, in-flight/queued requests and admitted/coalesced/shed counters"""
+    return admission.status()
 
 @app.get("/api/districts")
-def get_districts():
+def get_districts(dataset: str = Query(None)):
+    analyst = resolve_dataset(dataset)
     districts = analyst.combined_df['district'].unique().tolist()
     return {"districts": sorted(districts)}
 
+@app.get("/api/district_names")
+def get_district_name_report(dataset: str = Query(None)):
+    """Unmatched and fuzzy-matched raw district spellings from the last load, per dataset"""
+    analyst = resolve_dataset(dataset)
+    return analyst.district_name_report
+
+@app.get("/api/data_quality")
+def get_data_quality(dataset: str = Query(None)):
+    """Schema violations, quarantined rows and dropped columns from the last load, per dataset"""
+    analyst = resolve_dataset(dataset)
+    return {"schema": analyst.schema_report, "district_names": analyst.district_name_report,
+            "partitions": analyst.partition_stats}
+
 @app.get("/api/stats")
-def get_stats(district: str = Query(None)):
+def get_stats(district: str = Query(None), dataset: str = Query(None)):
+    analyst = resolve_dataset(dataset)
     try:
-        stats = analyst.get_district_stats(district)
+        stats = cached_district_response(analyst, "stats", district, {},
+                                         lambda: analyst.get_district_stats(district))
         return stats
     except Exception as e:
         print(f"Error in /api/stats: {e}")
         return {"error": str(e), "total_enrollment": 0, "avg_stress_index": 0}
 
 @app.get("/api/stress_heatmap")
-def get_heatmap():
+def get_heatmap(request: Request, fmt: str = Query(None, alias="format"), dataset: str = Query(None)):
+    analyst = resolve_dataset(dataset)
     try:
+        wire = negotiate(request, fmt)
+        if wire != 'json':
+            return frame_response(analyst.get_stress_heatmap_frame(), wire)
         return analyst.get_stress_heatmap()
     except Exception as e:
         print(f"Error in /api/stress_heatmap: {e}")
         return []
 
 @app.get("/api/deep_dive")
-def get_deep_dive(district: str):
+def get_deep_dive(district: str, dataset: str = Query(None),
+                  target: str = Query("mean", pattern="^(mean|p50|p90|p95|p99|max)$")):
+    analyst = resolve_dataset(dataset)
     try:
-        return analyst.get_district_deep_dive(district)
+        stats = get_load_stats(analyst) if target != "mean" else None
+        return cached_district_response(analyst, "deep_dive", district, {"target": target},
+                                        lambda: analyst.get_district_deep_dive(district, target, stats))
     except Exception as e:
         print(f"Error in /api/deep_dive: {e}")
         return {"status": "Error", "message": str(e)}
 
+@app.get("/api/load_percentiles")
+def get_load_percentiles(district: str, dataset: str = Query(None)):
+    """p50/p90/p95/p99/max daily load and days over the mean-sized capacity for one district"""
+    analyst = resolve_dataset(dataset)
+    try:
+        stats = get_load_stats(analyst)
+        if district not in stats:
+            return JSONResponse({"error": f"Unknown district: {district}"}, status_code=404)
+        return {"version": analyst.version, **stats.district(district)}
+    except Exception as e:
+        print(f"Error in /api/load_percentiles: {e}")
+        return {"error": str(e)}
+
+@app.get("/api/similar_districts")
+def get_similar_districts(district: str, dataset: str = Query(None), k: int = Query(10, ge=1, le=DEFAULT_TOP_K),
+                          basis: str = Query("combined", pattern="^(combined|series|profile)$")):
+    """Districts whose daily load series and age/biometric/migration profile resemble `district`"""
+    analyst = resolve_dataset(dataset)
+    try:
+        index = get_similarity_index(analyst)
+        if district not in index:
+            return JSONResponse({"error": f"Unknown district: {district}"}, status_code=404)
+        # Neighbours depend on every district's data: cached as a dataset-wide entry
+        similar = cached_district_response(analyst, "similar_districts", None,
+                                           {"district": district.lower(), "k": k, "basis": basis},
+                                           lambda: index.similar(district, k, basis))
+        return {"version": analyst.version, **similar}
+    except Exception as e:
+        print(f"Error in /api/similar_districts: {e}")
+        return {"error": str(e)}
+
+@app.get("/api/load_profile")
+def get_load_profile(district: str, dataset: str = Query(None),
+                     kind: str = Query("weekday", pattern="^(weekday|monthday)$")):
+    """Mean, peak and share of load per weekday (or day of month) for enrollment, biometric, demographic and api"""
+    analyst = resolve_dataset(dataset)
+    try:
+        profiles = get_load_profiles(analyst)
+        if district not in profiles:
+            return JSONResponse({"error": f"Unknown district: {district}"}, status_code=404)
+        profile = cached_district_response(analyst, "load_profile", district, {"kind": kind},
+                                           lambda: profiles.profile(district, kind), calendar=True)
+        return {"version": analyst.version, **profile}
+    except Exception as e:
+        print(f"Error in /api/load_profile: {e}")
+        return {"error": str(e)}
+
+@app.get("/api/weekday_staffing")
+def get_weekday_staffing(district: str, dataset: str = Query(None),
+                         target: str = Query("peak", pattern="^(peak|mean)$"),
+                         ops_per_kit: float = Query(None, gt=0)):
+    """Kits per weekday sized to that weekday's load, compared with the flat mean-based deep dive figure"""
+    analyst = resolve_dataset(dataset)
+    try:
+        profiles = get_load_profiles(analyst)
+        if district not in profiles:
+            return JSONResponse({"error": f"Unknown district: {district}"}, status_code=404)
+        staffing = cached_district_response(analyst, "weekday_staffing", district,
+                                            {"target": target, "ops_per_kit": ops_per_kit},
+                                            lambda: profiles.weekday_staffing(district, target, ops_per_kit),
+                                            calendar=True)
+        return {"version": analyst.version, **staffing}
+    except Exception as e:
+        print(f"Error in /api/weekday_staffing: {e}")
+        return {"error": str(e)}
+
 @app.get("/api/forecast")
-def get_forecast(district: str):
+def get_forecast(district: str, dataset: str = Query(None), months: int = Query(3, ge=1, le=600),
+                 max_points: int = Query(None, ge=3, le=100000),
+                 downsample: str = Query("lttb", pattern="^(lttb|minmax)$")):
+    analyst = resolve_dataset(dataset)
     try:
-        return analyst.get_forecast(district)
+        forecast = cached_district_response(analyst, "forecast", district, {"months": months},
+                                            lambda: analyst.get_forecast(district, months))
+        if max_points and len(forecast) > max_points:
+            forecast = downsample_frame(pd.DataFrame(forecast), ['predicted_stress'], max_points,
+                                        method=downsample).to_dict(orient='records')
+        return forecast
     except Exception as e:
         print(f"Error in /api/forecast: {e}")
         return []
 
 @app.get("/api/trends")
-def get_trends(district: str = Query(None)):
+def get_trends(request: Request, district: str = Query(None), fmt: str = Query(None, alias="format"),
+               dataset: str = Query(None), max_points: int = Query(None, ge=3, le=100000),
+               downsample: str = Query("lttb", pattern="^(lttb|minmax)$")):
+    """Daily means per date; `max_points` downsamples long histories server-side (LTTB or min/max)"""
+    analyst = resolve_dataset(dataset)
     try:
+        wire = negotiate(request, fmt)
         df = analyst.combined_df
+        columns = ['total_enrollment', 'stress_index', 'migration_intensity']
         if df is None or df.empty:
-            return []
+            empty = pd.DataFrame(columns=['date'] + columns)
+            return frame_response(empty, wire) if wire != 'json' else []
             
         if district:
             df = df[df['district'].str.lower() == district.lower()]
         
         # Aggregate by date
-        trend_df = df.groupby('date')[['total_enrollment', 'stress_index', 'migration_intensity']].mean().reset_index()
+        trend_df = df.groupby('date')[columns].mean().reset_index()
+        if max_points:
+            trend_df = downsample_frame(trend_df, columns, max_points, x_column='date', method=downsample)
+        if wire != 'json':
+            return frame_response(trend_df, wire)
         return trend_df.to_dict(orient='records')
     except Exception as e:
         print(f"Error in /api/trends: {e}")
@@ -139,8 +451,14 @@ def get_trends(district: str = Query(None)):
 # === GOVOPTIMA ANALYTICS ENDPOINTS ===
 
 @app.get("/api/resource_recommendations")
-def get_resource_recommendations():
-    """Get resource allocation recommendations for districts"""
+def get_resource_recommendations(dataset: str = Query(None),
+                                 target: str = Query("mean", pattern="^(mean|p50|p90|p95|p99|max)$")):
+    """Get resource allocation recommendations for districts.
+
+    Kits are sized to the mean daily load by default, or to a percentile /
+    the max of each district's daily load with `target`.
+    """
+    analyst = resolve_dataset(dataset)
     try:
         df = analyst.combined_df
         
@@ -152,10 +470,15 @@ def get_resource_recommendations():
             'total_demographic': 'sum'
         }).round(2)
         
-        district_metrics['recommended_kits'] = (district_metrics['stress_index'] / 50).apply(lambda x: int(max(1, x)))
+        kit_load = district_metrics['stress_index']
+        if target != 'mean':
+            kit_load = get_load_stats(analyst).loads(target).reindex(district_metrics.index.astype(str)).fillna(0)
+            kit_load.index = district_metrics.index
+            district_metrics['target_load'] = kit_load.round(2)
+        district_metrics['recommended_kits'] = (kit_load / DEFAULT_PARAMETERS['ops_per_kit']).apply(lambda x: int(max(1, x)))
         district_metrics['recommended_staff'] = ((district_metrics['total_enrollment'] + 
                                                    district_metrics['total_biometric'] +
-                                                   district_metrics['total_demographic']) / 10000).apply(lambda x: int(max(1, x)))
+                                                   district_metrics['total_demographic']) / DEFAULT_PARAMETERS['ops_per_staff']).apply(lambda x: int(max(1, x)))
         
         # Priority classification
         district_metrics['priority'] = district_metrics['stress_index'].apply(
@@ -165,6 +488,7 @@ def get_resource_recommendations():
         results = district_metrics.sort_values('stress_index', ascending=False).head(20).to_dict(orient='index')
         
         return {
+            "target": target,
             "recommendations": results,
             "total_kits_needed": int(district_metrics['recommended_kits'].sum()),
             "total_staff_needed": int(district_metrics['recommended_staff'].sum())
@@ -173,9 +497,14 @@ def get_resource_recommendations():
         return {"error": str(e)}
 
 @app.get("/api/migration_alerts")
-def get_migration_alerts():
-    """Get high-migration district alerts with detailed classification"""
+def get_migration_alerts(request: Request, fmt: str = Query(None, alias="format"), dataset: str = Query(None)):
+    """Get high-migration district alerts with detailed classification
+
+    Binary formats (Arrow / MessagePack) return the full alert list as columns.
+    """
+    analyst = resolve_dataset(dataset)
     try:
+        wire = negotiate(request, fmt)
         df = analyst.combined_df
         
         migration_scores = df.groupby('district').agg({
@@ -196,6 +525,13 @@ def get_migration_alerts():
         
         # Sort by migration intensity
         migration_scores = migration_scores.sort_values('migration_intensity', ascending=False)
+
+        if wire != 'json':
+            all_alerts = migration_scores.reset_index().rename(columns={
+                'migration_intensity': 'migration_score',
+                'total_demographic': 'total_updates'
+            })
+            return frame_response(all_alerts[['district', 'migration_score', 'total_updates', 'alert_level']], wire)
         
         # Categorize counts
         alert_counts = {
@@ -226,45 +562,28 @@ def get_migration_alerts():
         return {"error": str(e)}
 
 @app.get("/api/cost_analysis")
-def get_cost_analysis():
+def get_cost_analysis(dataset: str = Query(None)):
     """Get detailed cost analysis with accurate rupee calculations"""
+    analyst = resolve_dataset(dataset)
     try:
         df = analyst.combined_df
-        
-        # Accurate cost assumptions (in INR)
-        COST_PER_ENROLLMENT = 150  # Per enrollment processing
-        COST_PER_BIOMETRIC = 75    # Per biometric update
-        COST_PER_DEMOGRAPHIC = 50  # Per demographic update
-        COST_PER_KIT = 500000      # 5 lakhs per enrollment kit
-        COST_PER_STAFF_ANNUAL = 600000  # 6 lakhs per staff member annually
-        
+
+        # Default cost assumptions (scenarios.DEFAULT_PARAMETERS), evaluated by the scenario engine
+        result = get_scenario_engine(analyst).evaluate([{}])["scenarios"][0]
+
         # Calculate totals
         total_enrollments = int(df['total_enrollment'].sum())
         total_biometric = int(df['total_biometric'].sum())
         total_demographic = int(df['total_demographic'].sum())
-        
-        # Operational costs
-        operational_cost = (
-            total_enrollments * COST_PER_ENROLLMENT +
-            total_biometric * COST_PER_BIOMETRIC +
-            total_demographic * COST_PER_DEMOGRAPHIC
-        )
-        
-        # Resource requirements
-        district_metrics = df.groupby('district').agg({'stress_index': 'mean'})
-        total_kits = int((district_metrics['stress_index'] / 50).apply(lambda x: max(1, x)).sum())
-        total_staff = int(((total_enrollments + total_biometric + total_demographic) / 10000))
-        
-        # Infrastructure costs
-        kit_cost = total_kits * COST_PER_KIT
-        staff_cost = total_staff * COST_PER_STAFF_ANNUAL
-        total_infrastructure = kit_cost + staff_cost
-        
-        # Optimization savings (10% efficiency gain through better resource allocation)
-        potential_savings = operational_cost * 0.10
-        
-        # ROI calculation
-        roi_percentage = round((potential_savings / total_infrastructure) * 100, 1) if total_infrastructure > 0 else 0
+
+        operational_cost = result["operational_cost_inr"]
+        total_kits = result["total_kits_needed"]
+        total_staff = result["total_staff_needed"]
+        kit_cost = result["kit_investment_inr"]
+        staff_cost = result["staff_cost_annual_inr"]
+        total_infrastructure = result["total_infrastructure_inr"]
+        potential_savings = result["potential_savings_inr"]
+        roi_percentage = result["roi_percentage"]
         
         return {
             # Operational costs
@@ -305,9 +624,121 @@ def get_cost_analysis():
     except Exception as e:
         return {"error": str(e)}
 
+@app.post("/api/scenarios")
+def run_scenarios(payload: dict = Body(...)):
+    """What-if cost analysis: evaluates many parameter sets in one vectorized pass.
+
+    Body: {"scenarios": [{"name": "lean", "cost_per_kit": 450000, "savings_rate": 0.15}, ...],
+           "rounding": "dashboard" | "ceil", "include_districts": false, "dataset": optional}
+    Omitted parameters take the defaults used by /api/cost_analysis.
+    """
+    analyst = resolve_dataset(payload.get("dataset"))
+    try:
+        return get_scenario_engine(analyst).evaluate(
+            payload.get("scenarios") or [],
+            rounding=payload.get("rounding", "dashboard"),
+            include_districts=bool(payload.get("include_districts", False))
+        )
+    except (ValueError, TypeError) as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except Exception as e:
+        return {"error": str(e)}
+
+# Allocation loads per (dataset, data version, resource, level); building them is the slow part.
+# Pincode loads come from the raw feeds, which the combined_df fingerprint does not cover, so they
+# are keyed on the stamp of the source files instead (version numbers restart when a dataset reloads)
+_allocation_loads = {}
+
+def get_allocation_loads(analyst: GovernanceAnalyst, resource: str, level: str):
+    version = analyst.source_stamp if level == 'pincode' else analyst.content_version
+    key = (analyst.data_dir, version, resource, level)
+    if key not in _allocation_loads:
+        if level == 'pincode':
+            if analyst.enrollment_df is None or analyst.enrollment_df.empty:
+                raise ValueError("Pincode-level allocation needs the raw feeds, which this instance did not load")
+            loads = pincode_loads(analyst.enrollment_df, analyst.biometric_df, analyst.demographic_df, resource)
+        else:
+            loads = district_loads(analyst.combined_df, resource)
+        # Only the current version of each dataset is ever needed
+        for stale in [k for k in _allocation_loads if k[0] == analyst.data_dir]:
+            del _allocation_loads[stale]
+        _allocation_loads[key] = loads
+    return _allocation_loads[key]
+
+@app.post("/api/allocate")
+def allocate_resources(payload: dict = Body(...)):
+    """Distributes fixed kit/staff budgets across districts (or pincodes) to minimize overload.
+
+    Body: {"resource": "kits" | "staff", "budgets": [200, 400, 600], "level": "district" | "pincode",
+           "district": "Pune" (pincode level only), "capacity": 50, "minimum": 0,
+           "include_allocations": true, "top": 20, "dataset": optional}
+    Every budget level is answered from one greedy ordering, so sweeps are cheap.
+    """
+    analyst = resolve_dataset(payload.get("dataset"))
+    try:
+        resource = payload.get("resource", "kits")
+        level = payload.get("level", "district")
+        if level not in ("district", "pincode"):
+            raise ValueError("level must be 'district' or 'pincode'")
+        capacity = payload.get("capacity")
+        default = default_capacity(resource)    # Also validates `resource`
+        if capacity is None:
+            capacity = default
+        elif isinstance(capacity, bool) or not isinstance(capacity, (int, float)) or capacity <= 0:
+            raise ValueError("capacity must be a positive number")
+
+        loads = get_allocation_loads(analyst, resource, level)
+        district = payload.get("district")
+        if district:
+            names = loads.index.get_level_values('district') if level == 'pincode' else loads.index
+            loads = loads[names.str.lower() == district.lower()]
+            if loads.empty:
+                raise ValueError(f"Unknown district: {district}")
+
+        budgets = payload.get("budgets")
+        if budgets is None:
+            budgets = [payload.get("budget", 0)]
+        if not isinstance(budgets, list):
+            raise ValueError("budgets must be a list of non-negative integers")
+        planner = AllocationPlanner(loads, float(capacity), int(payload.get("minimum", 0)),
+                                    max_budget=max((int(b) for b in budgets), default=0))
+        result = planner.sweep(budgets, include_allocations=bool(payload.get("include_allocations", True)),
+                               top=payload.get("top"))
+        return {"resource": resource, "level": level, **result}
+    except (ValueError, TypeError) as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except Exception as e:
+        return {"error": str(e)}
+
+# Generic group-by/filter queries; compiled plans and results cached per dataset version
+query_engine = QueryEngine()
+
+@app.post("/api/query")
+def run_query(request: Request, payload: dict = Body(...), fmt: str = Query(None, alias="format")):
+    """Group-by / filter / sort over the dataset without a dedicated endpoint per breakdown.
+
+    Body: {"dimensions": ["district", "month"],      # district, state, pincode, day/week/month/quarter/year
+           "metrics": [{"field": "total_enrollment", "agg": "sum"}, "stress_index:mean"],
+           "filters": [{"field": "date", "op": "gte", "value": "2025-06-01"}],
+           "sort": ["-sum_total_enrollment"], "limit": 100, "dataset": optional}
+    Binary formats (Arrow / MessagePack) return the result columns.
+    """
+    analyst = resolve_dataset(payload.get("dataset"))
+    try:
+        wire = negotiate(request, fmt)
+        result, info = query_engine.execute(analyst, payload)
+        if wire != 'json':
+            return frame_response(result, wire)
+        return {"rows": json_records(result), "row_count": len(result), **info}
+    except QueryError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except Exception as e:
+        return {"error": str(e)}
+
 @app.get("/api/efficiency_metrics")
-def get_efficiency_metrics():
+def get_efficiency_metrics(dataset: str = Query(None)):
     """Get efficiency and performance metrics with district breakdown"""
+    analyst = resolve_dataset(dataset)
     try:
         df = analyst.combined_df
         
@@ -326,13 +757,14 @@ def get_efficiency_metrics():
                                              district_performance['total_biometric'] + 
                                              district_performance['total_demographic'])
         
-        # Overall metrics
+        # Overall metrics (zeros when there is no data, as in get_district_stats)
+        districts = int(df['district'].nunique())
         metrics = {
             "total_operations": int(total_operations), 
-            "total_districts": int(df['district'].nunique()),
-            "avg_operations_per_district": int(total_operations / df['district'].nunique()),
-            "avg_stress_index": round(df['stress_index'].mean(), 2),
-            "avg_migration_score": round(df['migration_intensity'].mean(), 2),
+            "total_districts": districts,
+            "avg_operations_per_district": int(total_operations / districts) if districts else 0,
+            "avg_stress_index": round(float(df['stress_index'].mean()), 2) if not df.empty else 0.0,
+            "avg_migration_score": round(float(df['migration_intensity'].mean()), 2) if not df.empty else 0.0,
             "high_stress_districts": int((district_performance['stress_index'] > 200).sum()),
             "high_migration_districts": int((district_performance['migration_intensity'] > 5).sum()),
             "district_breakdown": district_performance.sort_values('total_ops', ascending=False).head(10).to_dict(orient='index')
@@ -342,44 +774,49 @@ def get_efficiency_metrics():
     except Exception as e:
         return {"error": str(e)}
 
+def district_report_csv(df: pd.DataFrame) -> str:
+    """District summary with resource needs and priority/migration classes, as CSV text"""
+    # Create summary report
+    district_summary = df.groupby('district').agg({
+        'total_enrollment': 'sum',
+        'total_biometric': 'sum',
+        'total_demographic': 'sum',
+        'stress_index': 'mean',
+        'migration_intensity': 'mean'
+    }).round(2)
+    
+    district_summary['total_operations'] = (district_summary['total_enrollment'] + 
+                                             district_summary['total_biometric'] + 
+                                             district_summary['total_demographic'])
+    
+    # Calculate resource needs
+    district_summary['recommended_kits'] = (district_summary['stress_index'] / DEFAULT_PARAMETERS['ops_per_kit']).apply(lambda x: int(max(1, x)))
+    district_summary['recommended_staff'] = (district_summary['total_operations'] / DEFAULT_PARAMETERS['ops_per_staff']).apply(lambda x: int(max(1, x)))
+    
+    # Priority classification
+    district_summary['priority'] = district_summary['stress_index'].apply(
+        lambda x: 'High' if x > 200 else ('Medium' if x > 100 else 'Low')
+    )
+    
+    # Migration classification
+    district_summary['migration_level'] = district_summary['migration_intensity'].apply(
+        lambda x: 'Very High' if x > 7 else ('High' if x > 5 else ('Normal' if x > 3 else 'Low'))
+    )
+    
+    # Save to CSV
+    import io
+    output = io.StringIO()
+    district_summary.to_csv(output)
+    return output.getvalue()
+
 @app.get("/api/export_report")
-def export_report():
-    """Generate comprehensive analytics report as CSV"""
+def export_report(dataset: str = Query(None), background: bool = Query(False)):
+    """Generate comprehensive analytics report as CSV (background=true queues it as a job instead)"""
+    if background:
+        return submit_job("export_report", {"dataset": dataset or DEFAULT_DATASET})
+    analyst = resolve_dataset(dataset)
     try:
-        df = analyst.combined_df
-        
-        # Create summary report
-        district_summary = df.groupby('district').agg({
-            'total_enrollment': 'sum',
-            'total_biometric': 'sum',
-            'total_demographic': 'sum',
-            'stress_index': 'mean',
-            'migration_intensity': 'mean'
-        }).round(2)
-        
-        district_summary['total_operations'] = (district_summary['total_enrollment'] + 
-                                                 district_summary['total_biometric'] + 
-                                                 district_summary['total_demographic'])
-        
-        # Calculate resource needs
-        district_summary['recommended_kits'] = (district_summary['stress_index'] / 50).apply(lambda x: int(max(1, x)))
-        district_summary['recommended_staff'] = (district_summary['total_operations'] / 10000).apply(lambda x: int(max(1, x)))
-        
-        # Priority classification
-        district_summary['priority'] = district_summary['stress_index'].apply(
-            lambda x: 'High' if x > 200 else ('Medium' if x > 100 else 'Low')
-        )
-        
-        # Migration classification
-        district_summary['migration_level'] = district_summary['migration_intensity'].apply(
-            lambda x: 'Very High' if x > 7 else ('High' if x > 5 else ('Normal' if x > 3 else 'Low'))
-        )
-        
-        # Save to CSV
-        import io
-        output = io.StringIO()
-        district_summary.to_csv(output)
-        csv_data = output.getvalue()
+        csv_data = district_report_csv(analyst.combined_df)
         
         return JSONResponse(
             content=csv_data,
@@ -389,10 +826,193 @@ def export_report():
     except Exception as e:
         return {"error": str(e)}
 
+# === BACKGROUND JOBS ===
+# Reports and the standalone analysis scripts run on a bounded worker pool fed by a persistent
+# SQLite queue (GOVOPTIMA_JOB_DB, GOVOPTIMA_JOB_DIR, GOVOPTIMA_JOB_WORKERS,
+# GOVOPTIMA_JOB_RETENTION_HOURS); results are downloadable until they expire
+job_queue = JobQueue(
+    os.environ.get("GOVOPTIMA_JOB_DB", "govoptima_jobs.db"),
+    os.environ.get("GOVOPTIMA_JOB_DIR", "job_results"),
+    workers=int(os.environ.get("GOVOPTIMA_JOB_WORKERS", 2)),
+    retention_seconds=float(os.environ.get("GOVOPTIMA_JOB_RETENTION_HOURS", 24)) * 3600
+)
+
+def export_report_job(ctx, params):
+    analyst = datasets.get(params.get("dataset", DEFAULT_DATASET))
+    ctx.progress(0.1, "Aggregating districts")
+    path = os.path.join(ctx.work_dir, "govoptima_analytics_report.csv")
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(district_report_csv(analyst.combined_df))
+    return {"path": path, "media_type": "text/csv", "filename": "govoptima_analytics_report.csv"}
+
+job_queue.register("export_report", export_report_job, "District analytics report (CSV)")
+for _kind, (_script, _, _, _) in SCRIPT_JOBS.items():
+    job_queue.register(
+        _kind,
+        lambda ctx, params, kind=_kind: run_script(ctx, kind, datasets.paths[params.get("dataset", DEFAULT_DATASET)],
+                                                   timeout=job_queue.timeout),
+        f"Runs {_script} on the dataset's source files (zip of its outputs and console log)"
+    )
+
+@app.on_event("shutdown")
+def close_job_queue():
+    job_queue.close()
+
+def submit_job(kind: str, params: dict):
+    if params.get("dataset") not in datasets:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset: {params.get('dataset')}")
+    try:
+        job, created = job_queue.submit(kind, params)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except QueueFull as e:
+        return JSONResponse({"error": f"Job queue is full ({e}), retry later"}, status_code=503,
+                            headers={"Retry-After": "30"})
+    return JSONResponse({**job, "deduplicated": not created,
+                         "links": {"status": f"/api/jobs/{job['id']}", "result": f"/api/jobs/{job['id']}/result"}},
+                        status_code=202 if created else 200)
+
+@app.post("/api/jobs")
+def create_job(payload: dict = Body(...)):
+    """Queue a job: {"kind": "export_report" | "master_analysis" | "analysis_*", "params": {"dataset": optional}}"""
+    params = dict(payload.get("params") or {})
+    params["dataset"] = params.get("dataset") or DEFAULT_DATASET
+    return submit_job(payload.get("kind"), params)
+
+@app.get("/api/jobs")
+def list_jobs(status: str = Query(None, pattern="^(queued|running|succeeded|failed|cancelled)$"),
+              limit: int = Query(50, ge=1, le=500)):
+    """Recent jobs (newest first), queue counts and the available job kinds"""
+    return {**job_queue.status(), "jobs": job_queue.list(status, limit)}
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    """Status, progress and timings of one job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return JSONResponse({"error": f"Unknown or expired job: {job_id}"}, status_code=404)
+    return job
+
+@app.get("/api/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    """Download a finished job's result file"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return JSONResponse({"error": f"Unknown or expired job: {job_id}"}, status_code=404)
+    result = job_queue.result(job_id)
+    if result is None:
+        return JSONResponse({"error": f"Job is {job['status']}, no result available", "job": job}, status_code=409)
+    path, media_type, filename = result
+    return FileResponse(path, media_type=media_type, filename=filename)
+
+@app.delete("/api/jobs/{job_id}")
+def cancel_job(job_id: str):
+    """Cancel a queued job, or ask a running one to stop"""
+    job = job_queue.cancel(job_id)
+    if job is None:
+        return JSONResponse({"error": f"Unknown or expired job: {job_id}"}, status_code=404)
+    return job
+
+@app.post("/api/reload")
+def reload_dataset():
+    """Re-read the source data and push the changed districts to open dashboards"""
+    if not reload_lock.acquire(blocking=False):
+        return {"error": "Reload already in progress"}
+    try:
+        old_df = analyst.combined_df
+        if shared_plane is not None:
+            # Other workers pick the new version up through the CURRENT pointer
+            shared_plane.publish(build_dataset)
+            shared_plane.refresh(analyst, force=True)
+        else:
+            build_dataset()
+        # Rebuild the precomputed indexes now rather than on the next query
+        get_similarity_index(analyst)
+        get_load_profiles(analyst)
+        get_load_stats(analyst)
+        announce_dataset(old_df)
+        return {"version": analyst.version, "records": len(analyst.combined_df),
+                "changes": analyst.last_change}
+    except Exception as e:
+        return {"error": str(e)}
+    finally:
+        reload_lock.release()
+
+@app.get("/api/changes")
+def get_changes(dataset: str = Query(None)):
+    """Diff report of the latest data version: changed/added/removed districts and dates"""
+    analyst = resolve_dataset(dataset)
+    return {"version": analyst.version, "content_version": analyst.content_version,
+            "changes": analyst.last_change, "district_cache": district_cache.status()}
+
+@app.get("/api/events")
+async def dataset_events(request: Request):
+    """Server-Sent Events: a `dataset` event with the version and changed districts' stats"""
+    return StreamingResponse(
+        event_broker.stream(request, "dataset", {"version": analyst.version}),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/sql")
+def run_sql_query(q: str, params: str = Query(None), limit: int = Query(1000, ge=1, le=10000)):
+    """Read-only ad-hoc SQL over the analytics store (tables: combined, district_summary, pincode_summary)"""
+    if not sql_store_path or not os.path.exists(sql_store_path):
+        return {"error": "SQL analytics store not enabled (set GOVOPTIMA_SQL_STORE)"}
+    try:
+        bound = json.loads(params) if params else []
+        return AnalyticsStore(sql_store_path).query(q, bound, limit)
+    except Exception as e:
+        return {"error": str(e)}
+
+# === DISTRICT ANNOTATIONS ===
+
+@app.post("/api/annotations")
+async def post_annotation(username: str = Form(...), comment: str = Form(...), district: str = Form(...)):
+    """Add a field officer note for a district"""
+    if annotation_store is None:
+        return {"error": "Annotation store unavailable"}
+    try:
+        ids = await annotation_store.add([(username, comment, district)])
+        return {"id": ids[0]}
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.post("/api/annotations/batch")
+async def post_annotations_batch(notes: List[dict] = Body(...)):
+    """Add many notes in one request: [{"username", "comment", "district"}, ...]"""
+    if annotation_store is None:
+        return {"error": "Annotation store unavailable"}
+    try:
+        rows = [(n['username'], n['comment'], n['district']) for n in notes]
+        ids = await annotation_store.add(rows)
+        return {"ids": ids, "inserted": len(ids)}
+    except KeyError as e:
+        return {"error": f"Missing field: {e}"}
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.get("/api/annotations")
+def get_annotations(district: str = Query(None), limit: int = Query(50, ge=1, le=500), cursor: str = Query(None)):
+    """Paginated district notes, newest first"""
+    if annotation_store is None:
+        return {"error": "Annotation store unavailable"}
+    try:
+        return annotation_store.list(district, limit, cursor)
+    except Exception as e:
+        return {"error": str(e)}
+
 if __name__ == "__main__":
     import uvicorn
     # Use PORT environment variable for Cloud Deployment (Render/Heroku), default to 8000 for local
     port = int(os.environ.get("PORT", 8000))
     
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+
     # Disable colors to prevents Windows encoding errors
-    uvicorn.run(app, host="0.0.0.0", port=port, use_colors=False)
+    if workers > 1:
+        if not shared_dir:
+            print("Tip: set GOVOPTIMA_SHARED_DIR so workers share one copy of the dataset")
+        uvicorn.run("main:app", host="0.0.0.0", port=port, workers=workers, use_colors=False)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port, use_colors=False)
@@ -0,0 +1,119 @@
+"""
+OUTPUT MANIFEST - GovOptima Platform
+Content-hash manifest for incremental regeneration of analysis_outputs/
+Records the hashes of source data, code version and parameters behind every
+output artifact so reruns only rebuild what is actually stale.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+MANIFEST_PATH = os.path.join('analysis_outputs', '.manifest.json')
+
+
+class OutputManifest:
+    def __init__(self, path: str = MANIFEST_PATH):
+        self.path = path
+        self.outputs = {}
+        self.file_hashes = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.outputs = data.get('outputs', {})
+            self.file_hashes = data.get('file_hashes', {})
+        except (OSError, ValueError):
+            pass  # Missing or corrupt manifest: everything is stale
+
+    def file_hash(self, path: str):
+        """SHA-256 of a file, reusing the cached hash while size and mtime are unchanged."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        cached = self.file_hashes.get(path)
+        if cached and cached['size'] == st.st_size and cached['mtime_ns'] == st.st_mtime_ns:
+            return cached['sha256']
+
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+        self.file_hashes[path] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': digest}
+        return digest
+
+    def build_key(self, sources, code, params=None):
+        """Combined fingerprint of input files, code files and run parameters."""
+        key = {
+            'sources': {p: self.file_hash(p) for p in sources},
+            'code': {p: self.file_hash(p) for p in code},
+            'params': params or {},
+        }
+        blob = json.dumps(key, sort_keys=True, default=str).encode('utf-8')
+        key['digest'] = hashlib.sha256(blob).hexdigest()
+        return key
+
+    def is_fresh(self, output: str, key) -> bool:
+        entry = self.outputs.get(output)
+        if not entry or entry['key'] != key['digest']:
+            return False
+        # Output deleted or edited by hand since it was generated
+        return self.file_hash(output) == entry['output_hash']
+
+    def stale_outputs(self, outputs, key):
+        return [o for o in outputs if not self.is_fresh(o, key)]
+
+    def record(self, output: str, key):
+        self.outputs[output] = {'key': key['digest'], 'output_hash': self.file_hash(output)}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'outputs': self.outputs, 'file_hashes': self.file_hashes}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+class RebuildPlan:
+    def __init__(self, manifest: OutputManifest, key, stale):
+        self.manifest = manifest
+        self.key = key
+        self.stale = set(stale)
+
+    def should_write(self, path: str) -> bool:
+        """True if the output is stale and must be regenerated this run."""
+        if path in self.stale:
+            return True
+        print(f"⏭️  Up to date: {path}")
+        return False
+
+    def mark_saved(self, path: str):
+        self.manifest.record(path, self.key)
+        self.manifest.save()
+
+
+def plan_rebuild(manifest: OutputManifest, outputs, key, argv=None):
+    """Parses --force/--dry-run and returns the rebuild plan (exits if nothing is stale)."""
+    parser = argparse.ArgumentParser(description="Regenerate stale analysis outputs")
+    parser.add_argument('--force', action='store_true', help="Regenerate every output even if up to date")
+    parser.add_argument('--dry-run', action='store_true', help="List outputs that would be rebuilt and exit")
+    args = parser.parse_args(argv)
+
+    stale = list(outputs) if args.force else manifest.stale_outputs(outputs, key)
+
+    if args.dry_run:
+        print(f"{len(stale)} of {len(outputs)} outputs would be rebuilt:")
+        for output in stale:
+            print(f"  • {output}")
+        manifest.save()
+        sys.exit(0)
+
+    if not stale:
+        print(f"✅ All {len(outputs)} outputs up to date - nothing to rebuild (use --force to regenerate)")
+        manifest.save()
+        sys.exit(0)
+
+    return RebuildPlan(manifest, key, stale)
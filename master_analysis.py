@@ -5,6 +5,10 @@ Run this to generate all analysis files and insights
 """
 
 from analysis import GovernanceAnalyst
+from manifest import OutputManifest, plan_rebuild
+from partitioned_loader import loader_code_files, source_files
+from scenarios import DEFAULT_PARAMETERS, ScenarioEngine
+from schemas import SCHEMAS
 import pandas as pd
 import numpy as np
 import json
@@ -13,6 +17,39 @@ import os
 # Create output directory
 os.makedirs('analysis_outputs', exist_ok=True)
 
+# Cost assumptions (shared with the dashboard; see scenarios.DEFAULT_PARAMETERS)
+COST_PER_ENROLLMENT = DEFAULT_PARAMETERS['cost_per_enrollment']      # INR
+COST_PER_BIOMETRIC = DEFAULT_PARAMETERS['cost_per_biometric']        # INR
+COST_PER_DEMOGRAPHIC = DEFAULT_PARAMETERS['cost_per_demographic']    # INR
+COST_PER_KIT = DEFAULT_PARAMETERS['cost_per_kit']                    # INR (5 lakhs)
+COST_PER_STAFF_ANNUAL = DEFAULT_PARAMETERS['cost_per_staff_annual']  # INR (6 lakhs)
+OPS_PER_KIT = DEFAULT_PARAMETERS['ops_per_kit']
+OPS_PER_STAFF = DEFAULT_PARAMETERS['ops_per_staff']
+SAVINGS_RATE = DEFAULT_PARAMETERS['savings_rate']
+
+OUTPUTS = [
+    'analysis_outputs/00_combined_clean_data.csv',
+    'analysis_outputs/01_enrollment_analysis.txt',
+    'analysis_outputs/02_biometric_analysis.txt',
+    'analysis_outputs/03_demographic_migration_analysis.txt',
+    'analysis_outputs/04_district_resource_recommendations.csv',
+    'analysis_outputs/04_resource_allocation.txt',
+    'analysis_outputs/05_cost_analysis.json',
+    'analysis_outputs/06_master_insights.json',
+]
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Skip the whole run when sources, code and parameters are unchanged
+manifest = OutputManifest()
+build_key = manifest.build_key(
+    sources=source_files('.', SCHEMAS),
+    code=[os.path.join(CODE_DIR, f) for f in
+          ['analysis.py', 'master_analysis.py', 'scenarios.py', 'cube.py', 'fingerprints.py']] + loader_code_files(),
+    params=DEFAULT_PARAMETERS
+)
+plan = plan_rebuild(manifest, OUTPUTS, build_key)
+
 print("\n" + "="*90)
 print(" "*30 + "GOVOPTIMA PLATFORM")
 print(" "*25 + "Master Data Analysis System")
@@ -54,19 +91,20 @@ for idx, (district, val) in enumerate(enroll_districts.head(10).items(), 1):
     print(f"  {idx}. {district}: {val:,}")
 
 # Save enrollment analysis
-with open('analysis_outputs/01_enrollment_analysis.txt', 'w', encoding='utf-8') as f:
-    f.write("ENROLLMENT DATA ANALYSIS\n")
-    f.write("="*80 + "\n\n")
-    f.write(f"Total Enrollments: {enrollment_total:,}\n\n")
-    f.write("Age Distribution:\n")
-    for age, count in enrollment_by_age.items():
-        pct = (count / enrollment_total * 100) if enrollment_total > 0 else 0
-        f.write(f"  {age}: {count:,} ({pct:.1f}%)\n")
-    f.write("\nTop 15 Districts:\n")
-    for idx, (district, val) in enumerate(enroll_districts.head(15).items(), 1):
-        f.write(f"  {idx}. {district}: {val:,}\n")
-
-print(f"\n✅ Saved: analysis_outputs/01_enrollment_analysis.txt\n")
+if plan.should_write('analysis_outputs/01_enrollment_analysis.txt'):
+    with open('analysis_outputs/01_enrollment_analysis.txt', 'w', encoding='utf-8') as f:
+        f.write("ENROLLMENT DATA ANALYSIS\n")
+        f.write("="*80 + "\n\n")
+        f.write(f"Total Enrollments: {enrollment_total:,}\n\n")
+        f.write("Age Distribution:\n")
+        for age, count in enrollment_by_age.items():
+            pct = (count / enrollment_total * 100) if enrollment_total > 0 else 0
+            f.write(f"  {age}: {count:,} ({pct:.1f}%)\n")
+        f.write("\nTop 15 Districts:\n")
+        for idx, (district, val) in enumerate(enroll_districts.head(15).items(), 1):
+            f.write(f"  {idx}. {district}: {val:,}\n")
+    plan.mark_saved('analysis_outputs/01_enrollment_analysis.txt')
+    print(f"\n✅ Saved: analysis_outputs/01_enrollment_analysis.txt\n")
 
 # =====  BIOMETRIC ANALYSIS =====
 
@@ -90,18 +128,19 @@ for district in high_aging.head(5).index:
     print(f"  • {district}: Score {bio_districts_normalized[district]}/100")
 
 # Save biometric analysis
-with open('analysis_outputs/02_biometric_analysis.txt', 'w', encoding='utf-8') as f:
-    f.write("BIOMETRIC UPDATE ANALYSIS\n")
-    f.write("="*80 + "\n\n")
-    f.write(f"Total Biometric Updates: {biometric_total:,}\n\n")
-    f.write("Top 15 Districts:\n")
-    for idx, (district, val) in enumerate(bio_districts.head(15).items(), 1):
-        f.write(f"  {idx}. {district}: {val:,}\n")
-    f.write("\nAging Population Indicators:\n")
-    for district in high_aging.head(10).index:
-        f.write(f"  • {district}: Score {bio_districts_normalized[district]}/100\n")
-
-print(f"\n✅ Saved: analysis_outputs/02_biometric_analysis.txt\n")
+if plan.should_write('analysis_outputs/02_biometric_analysis.txt'):
+    with open('analysis_outputs/02_biometric_analysis.txt', 'w', encoding='utf-8') as f:
+        f.write("BIOMETRIC UPDATE ANALYSIS\n")
+        f.write("="*80 + "\n\n")
+        f.write(f"Total Biometric Updates: {biometric_total:,}\n\n")
+        f.write("Top 15 Districts:\n")
+        for idx, (district, val) in enumerate(bio_districts.head(15).items(), 1):
+            f.write(f"  {idx}. {district}: {val:,}\n")
+        f.write("\nAging Population Indicators:\n")
+        for district in high_aging.head(10).index:
+            f.write(f"  • {district}: Score {bio_districts_normalized[district]}/100\n")
+    plan.mark_saved('analysis_outputs/02_biometric_analysis.txt')
+    print(f"\n✅ Saved: analysis_outputs/02_biometric_analysis.txt\n")
 
 # ===== DEMOGRAPHIC & MIGRATION ANALYSIS =====
 
@@ -122,16 +161,17 @@ for idx, (district, score) in enumerate(high_migration.head(10).items(), 1):
     print(f"  {idx}. {district}: Score {score:.2f}/10 ({updates:,} updates)")
 
 # Save demographic analysis
-with open('analysis_outputs/03_demographic_migration_analysis.txt', 'w', encoding='utf-8') as f:
-    f.write("DEMOGRAPHIC UPDATE & MIGRATION ANALYSIS\n")
-    f.write("="*80 + "\n\n")
-    f.write(f"Total Demographic Updates: {demographic_total:,}\n\n")
-    f.write(f"High Migration Districts (Score >5): {len(high_migration)}\n\n")
-    for idx, (district, score) in enumerate(high_migration.head(15).items(), 1):
-        updates = df[df['district'] == district]['total_demographic'].sum()
-        f.write(f"  {idx}. {district}: Score {score:.2f}/10 ({updates:,} updates)\n")
-
-print(f"\n✅ Saved: analysis_outputs/03_demographic_migration_analysis.txt\n")
+if plan.should_write('analysis_outputs/03_demographic_migration_analysis.txt'):
+    with open('analysis_outputs/03_demographic_migration_analysis.txt', 'w', encoding='utf-8') as f:
+        f.write("DEMOGRAPHIC UPDATE & MIGRATION ANALYSIS\n")
+        f.write("="*80 + "\n\n")
+        f.write(f"Total Demographic Updates: {demographic_total:,}\n\n")
+        f.write(f"High Migration Districts (Score >5): {len(high_migration)}\n\n")
+        for idx, (district, score) in enumerate(high_migration.head(15).items(), 1):
+            updates = df[df['district'] == district]['total_demographic'].sum()
+            f.write(f"  {idx}. {district}: Score {score:.2f}/10 ({updates:,} updates)\n")
+    plan.mark_saved('analysis_outputs/03_demographic_migration_analysis.txt')
+    print(f"\n✅ Saved: analysis_outputs/03_demographic_migration_analysis.txt\n")
 
 # ===== RESOURCE ALLOCATION ANALYSIS =====
 
@@ -155,8 +195,8 @@ district_metrics['total_operations'] = (
 )
 
 # Resource recommendations (1 kit per 50 daily operations)
-district_metrics['recommended_kits'] = np.ceil(district_metrics['stress_index'] / 50).astype(int)
-district_metrics['recommended_staff'] = np.ceil(district_metrics['total_operations'] / 10000).astype(int)
+district_metrics['recommended_kits'] = np.ceil(district_metrics['stress_index'] / OPS_PER_KIT).astype(int)
+district_metrics['recommended_staff'] = np.ceil(district_metrics['total_operations'] / OPS_PER_STAFF).astype(int)
 
 # Priority classification
 district_metrics['priority'] = pd.cut(
@@ -175,23 +215,26 @@ for idx, (district, row) in enumerate(high_priority.head(10).iterrows(), 1):
     print(f"      Recommended Staff: {row['recommended_staff']}")
 
 # Save resource analysis
-district_metrics.to_csv('analysis_outputs/04_district_resource_recommendations.csv')
-print(f"\n✅ Saved: analysis_outputs/04_district_resource_recommendations.csv")
-
-with open('analysis_outputs/04_resource_allocation.txt', 'w', encoding='utf-8') as f:
-    f.write("RESOURCE ALLOCATION & OPTIMIZATION ANALYSIS\n")
-    f.write("="*80 + "\n\n")
-    f.write(f"Total Districts Analyzed: {len(district_metrics)}\n")
-    f.write(f"High Priority Districts: {len(high_priority)}\n\n")
-    f.write("Top 15 High-Priority Districts:\n\n")
-    for idx, (district, row) in enumerate(high_priority.head(15).iterrows(), 1):
-        f.write(f"{idx}. {district}\n")
-        f.write(f"   Stress Index: {row['stress_index']:.1f}\n")
-        f.write(f"   Recommended Kits: {row['recommended_kits']}\n")
-        f.write(f"   Recommended Staff: {row['recommended_staff']}\n")
-        f.write(f"   Migration Score: {row['migration_intensity']:.2f}\n\n")
-
-print(f"✅ Saved: analysis_outputs/04_resource_allocation.txt\n")
+if plan.should_write('analysis_outputs/04_district_resource_recommendations.csv'):
+    district_metrics.to_csv('analysis_outputs/04_district_resource_recommendations.csv')
+    plan.mark_saved('analysis_outputs/04_district_resource_recommendations.csv')
+    print(f"\n✅ Saved: analysis_outputs/04_district_resource_recommendations.csv")
+
+if plan.should_write('analysis_outputs/04_resource_allocation.txt'):
+    with open('analysis_outputs/04_resource_allocation.txt', 'w', encoding='utf-8') as f:
+        f.write("RESOURCE ALLOCATION & OPTIMIZATION ANALYSIS\n")
+        f.write("="*80 + "\n\n")
+        f.write(f"Total Districts Analyzed: {len(district_metrics)}\n")
+        f.write(f"High Priority Districts: {len(high_priority)}\n\n")
+        f.write("Top 15 High-Priority Districts:\n\n")
+        for idx, (district, row) in enumerate(high_priority.head(15).iterrows(), 1):
+            f.write(f"{idx}. {district}\n")
+            f.write(f"   Stress Index: {row['stress_index']:.1f}\n")
+            f.write(f"   Recommended Kits: {row['recommended_kits']}\n")
+            f.write(f"   Recommended Staff: {row['recommended_staff']}\n")
+            f.write(f"   Migration Score: {row['migration_intensity']:.2f}\n\n")
+    plan.mark_saved('analysis_outputs/04_resource_allocation.txt')
+    print(f"✅ Saved: analysis_outputs/04_resource_allocation.txt\n")
 
 # ===== COST ANALYSIS =====
 
@@ -199,30 +242,21 @@ print("="*90)
 print("SECTION 5: COST ANALYSIS & SAVINGS ESTIMATION")
 print("="*90)
 
-# Cost assumptions
-COST_PER_ENROLLMENT = 150  # INR
-COST_PER_BIOMETRIC = 75    # INR
-COST_PER_DEMOGRAPHIC = 50  # INR
-COST_PER_KIT = 500000      # INR (5 lakhs)
-COST_PER_STAFF_ANNUAL = 600000  # INR (6 lakhs)
-
-total_cost = (
-    enrollment_total * COST_PER_ENROLLMENT +
-    biometric_total * COST_PER_BIOMETRIC +
-    demographic_total * COST_PER_DEMOGRAPHIC
-)
-
-kit_cost = district_metrics['recommended_kits'].sum() * COST_PER_KIT
-staff_cost = district_metrics['recommended_staff'].sum() * COST_PER_STAFF_ANNUAL
+# Default scenario, rounded up per district like the recommendations above
+cost_result = ScenarioEngine(district_metrics).evaluate([{}], rounding='ceil')["scenarios"][0]
+# The engine works in floats; these were integer rupee amounts in the report, so they stay ints
+total_cost = int(round(cost_result["operational_cost_inr"]))
+kit_cost = int(round(cost_result["kit_investment_inr"]))
+staff_cost = int(round(cost_result["staff_cost_annual_inr"]))
 
-# Optimization savings (10% efficiency gain)
-potential_savings = total_cost * 0.10
+# Optimization savings (SAVINGS_RATE efficiency gain, 10% by default)
+potential_savings = cost_result["potential_savings_inr"]
 
 print(f"\n💰 COST ANALYSIS:")
 print(f"  • Total Operational Cost: ₹{total_cost:,.0f} ({total_cost/10_000_000:.1f} Crore)")
 print(f"  • Infrastructure Cost (Kits): ₹{kit_cost:,.0f} ({kit_cost/10_000_000:.1f} Crore)")
 print(f"  • Annual Staff Cost: ₹{staff_cost:,.0f} ({staff_cost/10_000_000:.1f} Crore)")
-print(f"  • Potential Savings (10% efficiency): ₹{potential_savings:,.0f} ({potential_savings/10_000_000:.1f} Crore)")
+print(f"  • Potential Savings ({SAVINGS_RATE:.0%} efficiency): ₹{potential_savings:,.0f} ({potential_savings/10_000_000:.1f} Crore)")
 
 cost_analysis = {
     "total_operational_cost_inr": total_cost,
@@ -231,14 +265,15 @@ cost_analysis = {
     "staff_annual_cost_inr": staff_cost,
     "potential_savings_inr": potential_savings,
     "potential_savings_crore": round(potential_savings / 10_000_000, 2),
-    "total_kits_recommended": int(district_metrics['recommended_kits'].sum()),
-    "total_staff_recommended": int(district_metrics['recommended_staff'].sum())
+    "total_kits_recommended": cost_result["total_kits_needed"],
+    "total_staff_recommended": cost_result["total_staff_needed"]
 }
 
-with open('analysis_outputs/05_cost_analysis.json', 'w') as f:
-    json.dump(cost_analysis, f, indent=2)
-
-print(f"\n✅ Saved: analysis_outputs/05_cost_analysis.json\n")
+if plan.should_write('analysis_outputs/05_cost_analysis.json'):
+    with open('analysis_outputs/05_cost_analysis.json', 'w') as f:
+        json.dump(cost_analysis, f, indent=2, default=int)
+    plan.mark_saved('analysis_outputs/05_cost_analysis.json')
+    print(f"\n✅ Saved: analysis_outputs/05_cost_analysis.json\n")
 
 # ===== MASTER INSIGHTS =====
 
@@ -276,8 +311,10 @@ insights = {
     ]
 }
 
-with open('analysis_outputs/06_master_insights.json', 'w') as f:
-    json.dump(insights, f, indent=2)
+if plan.should_write('analysis_outputs/06_master_insights.json'):
+    with open('analysis_outputs/06_master_insights.json', 'w') as f:
+        json.dump(insights, f, indent=2, default=int)
+    plan.mark_saved('analysis_outputs/06_master_insights.json')
 
 print("\n🎯 KEY INSIGHTS:")
 print(f"  • Total Government Operations: {insights['summary']['total_government_operations']:,}")
@@ -286,11 +323,14 @@ print(f"  • High-Migration Districts: {insights['alerts']['high_migration_dist
 print(f"  • Recommended Kits: {cost_analysis['total_kits_recommended']}")
 print(f"  • Potential Savings: ₹{cost_analysis['potential_savings_crore']} Crore")
 
-print(f"\n✅ Saved: analysis_outputs/06_master_insights.json\n")
+if 'analysis_outputs/06_master_insights.json' in plan.stale:
+    print(f"\n✅ Saved: analysis_outputs/06_master_insights.json\n")
 
 # ===== FINAL SUMMARY =====
 
-df.to_csv('analysis_outputs/00_combined_clean_data.csv', index=False)
+if plan.should_write('analysis_outputs/00_combined_clean_data.csv'):
+    df.to_csv('analysis_outputs/00_combined_clean_data.csv', index=False)
+    plan.mark_saved('analysis_outputs/00_combined_clean_data.csv')
 
 print("="*90)
 print("✅ ANALYSIS COMPLETE!")
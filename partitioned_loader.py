@@ -0,0 +1,182 @@
+"""
+PARTITIONED LOADER - GovOptima Platform
+Discovers the source files of each dataset (one legacy CSV, many partitioned
+CSVs per state/month, or an explicit sources.json manifest; one layout per
+dataset, never a mix that would count rows twice), reads and cleans
+them concurrently in a thread pool and concatenates them per dataset.
+Per-partition stats (rows, bytes, timings, date range) are collected as we go.
+
+sources.json (optional, in the data directory):
+    {"enrollment": ["enrollment/*/2025-*.csv"], "biometric": [...], ...}
+"""
+
+import glob
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from district_names import canonicalize_districts
+from schemas import read_dataset
+
+SOURCES_MANIFEST = 'sources.json'
+
+
+def discover_sources(data_dir: str, schema):
+    """Source files for one dataset, from sources.json or else the first default layout present.
+
+    Default layouts by precedence: a <name>/ directory tree, <stem>_*.csv splits, the legacy
+    single file. They usually hold the same rows cut differently, so a lower layout found next
+    to the chosen one is ignored (with a warning) rather than counted twice.
+    """
+    manifest_path = os.path.join(data_dir, SOURCES_MANIFEST)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return _glob_files(data_dir, json.load(f).get(schema.name, []))
+
+    stem = os.path.splitext(schema.filename)[0]
+    layouts = [
+        os.path.join(schema.name, '**', '*.csv'),    # enrollment/<state>/<month>.csv
+        f"{stem}_*.csv",                             # Enrollment_Data_2025-09.csv
+        schema.filename,                             # Enrollment_Data.csv
+    ]
+    present = [(layout, paths) for layout in layouts for paths in [_glob_files(data_dir, [layout])] if paths]
+    if not present:
+        return []
+    if len(present) > 1:
+        print(f"Warning: {schema.name} sources found in several layouts; reading {present[0][0]!r} only, "
+              f"ignoring {[layout for layout, _ in present[1:]]}")
+    return present[0][1]
+
+
+def _glob_files(data_dir: str, patterns) -> list:
+    paths = set()
+    for pattern in patterns:
+        for path in glob.glob(os.path.join(data_dir, pattern), recursive=True):
+            if os.path.isfile(path):
+                paths.add(os.path.normpath(path))
+    return sorted(paths)
+
+
+def source_files(data_dir: str, schemas) -> list:
+    """Every file that decides what load_partitions reads: the discovered partitions and sources.json.
+
+    Scripts key their incremental rebuilds on these, so a new partition makes outputs stale.
+    """
+    paths = [path for schema in schemas.values() for path in discover_sources(data_dir, schema)]
+    manifest_path = os.path.join(data_dir, SOURCES_MANIFEST)
+    return paths + [manifest_path] if os.path.exists(manifest_path) else paths
+
+
+def sources_stamp(data_dir: str, schemas) -> list:
+    """[file, bytes, mtime_ns] of every source file; changes whenever a reload would read different data."""
+    stamp = []
+    for path in source_files(data_dir, schemas):
+        try:
+            st = os.stat(path)
+            stamp.append([os.path.relpath(path, data_dir), st.st_size, st.st_mtime_ns])
+        except OSError:
+            stamp.append([os.path.relpath(path, data_dir), None, None])
+    return stamp
+
+
+def loader_code_files() -> list:
+    """Code and tables that shape loaded frames, for the build keys of scripts reading sources."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    return [os.path.join(here, f) for f in
+            ('partitioned_loader.py', 'schemas.py', 'district_names.py', 'district_aliases.csv')]
+
+
+def _load_partition(path: str, schema):
+    """Reads + cleans one partition. Runs on a pool thread."""
+    started = time.perf_counter()
+    st = os.stat(path)    # Taken before the read, so a file rewritten mid-read stamps as changed
+    df, schema_report = read_dataset(path, schema)
+    df['district'], name_report = canonicalize_districts(df)
+    stats = {
+        "dataset": schema.name,
+        "file": path,
+        "bytes": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "rows": len(df),
+        "seconds": round(time.perf_counter() - started, 4),
+        "date_min": str(df['date'].min().date()) if df['date'].notna().any() else None,
+        "date_max": str(df['date'].max().date()) if df['date'].notna().any() else None,
+        "districts": int(df['district'].nunique()),
+        "quarantined_rows": schema_report['quarantined_rows'],
+    }
+    return df, schema_report, name_report, stats
+
+
+def _merge_schema_reports(reports):
+    merged = {"partitions": len(reports), "violations": {}, "quarantined_rows": 0,
+              "invalid_dates": 0, "dropped_columns": set(), "missing_optional_columns": set(), "rows": 0}
+    for r in reports:
+        merged["missing_optional_columns"].update(r.get("missing_optional_columns", []))
+        merged["quarantined_rows"] += r["quarantined_rows"]
+        merged["invalid_dates"] += r["invalid_dates"]
+        merged["rows"] += r["rows"]
+        merged["dropped_columns"].update(r["dropped_columns"])
+        for col, counts in r["violations"].items():
+            totals = merged["violations"].setdefault(col, dict.fromkeys(counts, 0))
+            for k, v in counts.items():
+                totals[k] += v
+    merged["dropped_columns"] = sorted(merged["dropped_columns"])
+    merged["missing_optional_columns"] = sorted(merged["missing_optional_columns"])
+    return merged
+
+
+def _merge_name_reports(reports):
+    unmatched, fuzzy = {}, {}
+    for r in reports:
+        for u in r["unmatched"]:
+            key = (u["state"], u["name"])
+            unmatched[key] = dict(u, rows=unmatched.get(key, {"rows": 0})["rows"] + u["rows"])
+        for f in r["fuzzy"]:
+            fuzzy[(f["state"], f["name"])] = f
+    return {"partitions": len(reports), "unmatched": list(unmatched.values()), "fuzzy": list(fuzzy.values())}
+
+
+def load_partitions(data_dir: str, schemas, max_workers: int = None):
+    """Loads every dataset's partitions concurrently.
+
+    Returns (frames, schema_reports, name_reports, partition_stats).
+    Raises if a dataset has no readable partitions at all.
+    """
+    max_workers = max_workers or int(os.environ.get("GOVOPTIMA_INGEST_WORKERS", 0)) or os.cpu_count() or 4
+    sources = {name: discover_sources(data_dir, schema) for name, schema in schemas.items()}
+    for name, paths in sources.items():
+        if not paths:
+            raise FileNotFoundError(f"No source files found for {name} dataset in {data_dir}")
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest") as pool:
+        futures = {
+            name: [(path, pool.submit(_load_partition, path, schemas[name])) for path in paths]
+            for name, paths in sources.items()
+        }
+
+        frames, schema_reports, name_reports, partition_stats = {}, {}, {}, []
+        for name, jobs in futures.items():
+            parts, s_reports, n_reports = [], [], []
+            for path, future in jobs:
+                try:
+                    df, s_report, n_report, stats = future.result()
+                except Exception as e:
+                    # One corrupt partition should not take the whole dataset down
+                    print(f"Warning: skipping partition {path}: {e}")
+                    partition_stats.append({"dataset": name, "file": path, "error": str(e)})
+                    continue
+                parts.append(df)
+                s_reports.append(s_report)
+                n_reports.append(n_report)
+                partition_stats.append(stats)
+            if not parts:
+                raise ValueError(f"All {len(jobs)} partitions of the {name} dataset failed to load")
+
+            frames[name] = parts[0] if len(parts) == 1 else pd.concat(parts, ignore_index=True)
+            schema_reports[name] = s_reports[0] if len(s_reports) == 1 else _merge_schema_reports(s_reports)
+            name_reports[name] = n_reports[0] if len(n_reports) == 1 else _merge_name_reports(n_reports)
+
+    return frames, schema_reports, name_reports, partition_stats
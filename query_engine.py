@@ -0,0 +1,418 @@
+"""
+QUERY ENGINE - GovOptima Platform
+One generic group-by / filter / sort endpoint instead of a hand-written
+endpoint per breakdown. A query names dimensions, metric aggregations,
+filters, a sort and a limit; it is validated and compiled into a plan over
+date-sorted fact tables whose district/state/pincode columns are integer
+coded. Date filters become a binary-searched row range, district filters a
+code mask, and grouping runs on integer keys. Results are cached by the
+normalized query and the dataset version.
+
+Every table has one row per place and day, so per-row metrics (stress_index,
+ivi, ...) mean the same thing in all of them: district_day is combined_df,
+state_day the raw feeds summed to (date, state, district) and pincode_day
+the raw feeds per pincode, used only when a query names pincode.
+
+Example:
+    {"dimensions": ["district", "month"],
+     "metrics": [{"field": "total_enrollment", "agg": "sum"}, "stress_index:mean"],
+     "filters": [{"field": "date", "op": "between", "value": ["2025-03-01", "2025-06-30"]},
+                 {"field": "district", "op": "in", "value": ["Pune", "Thane"]}],
+     "sort": ["-sum_total_enrollment"], "limit": 50}
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+DATE_BUCKETS = ('day', 'week', 'month', 'quarter', 'year')
+CODED_DIMENSIONS = ('district', 'state', 'pincode')
+DIMENSIONS = CODED_DIMENSIONS + DATE_BUCKETS
+AGGREGATIONS = ('sum', 'mean', 'min', 'max', 'count', 'median', 'std')
+FILTER_OPS = ('eq', 'ne', 'in', 'not_in', 'gt', 'gte', 'lt', 'lte', 'between')
+METRICS = ['age_0_5', 'age_5_17', 'age_18_greater', 'bio_age_5_17', 'bio_age_17_',
+           'demo_age_5_17', 'demo_age_17_', 'total_enrollment', 'total_biometric',
+           'total_demographic', 'total_activity', 'ivi', 'bsr', 'api', 'migration_intensity', 'stress_index']
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 10000
+CACHE_SIZE = 256
+
+
+class QueryError(ValueError):
+    pass
+
+
+class FactTable:
+    """Date-sorted columns with integer-coded text dimensions."""
+
+    def __init__(self, df: pd.DataFrame, dimensions):
+        df = df.sort_values('date', kind='stable').reset_index(drop=True)
+        self.rows = len(df)
+        self.date_ns = df['date'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        self.codes, self.categories, self.lookup = {}, {}, {}
+        for dim in dimensions:
+            codes, uniques = pd.factorize(df[dim], sort=True)
+            self.codes[dim] = codes
+            self.categories[dim] = np.asarray(uniques)
+            # Case-insensitive value -> code, matching how the other endpoints compare districts
+            self.lookup[dim] = {str(v).lower(): i for i, v in enumerate(self.categories[dim])}
+        self.metrics = {m: df[m].to_numpy(dtype=np.float64) for m in METRICS if m in df.columns}
+
+
+def add_derived_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    """Totals and indices with the same formulas as GovernanceAnalyst.process_data."""
+    df['total_enrollment'] = df['age_0_5'] + df['age_5_17'] + df['age_18_greater']
+    df['total_biometric'] = df['bio_age_5_17'] + df['bio_age_17_']
+    df['total_demographic'] = df['demo_age_5_17'] + df['demo_age_17_']
+    activity = (df['total_enrollment'] + df['total_biometric'] + df['total_demographic']).replace(0, 1)
+    df['total_activity'] = activity
+    df['ivi'] = (df['total_demographic'] + df['total_biometric']) / activity * 100
+    df['bsr'] = df['total_biometric'] / activity * 100
+    df['api'] = df['total_enrollment'] * 1.0 + df['total_biometric'] * 0.5 + df['total_demographic'] * 0.2
+    df['migration_intensity'] = df['total_demographic'] / activity * 10
+    df['stress_index'] = df['api']
+    return df
+
+
+RAW_TABLES = {
+    # table: grain keys (besides date) summed from the raw feeds
+    'state_day': ['state', 'district'],
+    'pincode_day': ['state', 'district', 'pincode'],
+}
+
+
+def raw_day_frame(enrollment, biometric, demographic, dimensions) -> pd.DataFrame:
+    """(date, *dimensions) facts from the raw feeds, metrics derived on the summed counts."""
+    keys = ['date'] + list(dimensions)
+    parts = [f for f in (enrollment, biometric, demographic) if f is not None and not f.empty]
+    if not parts:
+        raise QueryError("state/pincode queries need the raw feeds, which this instance did not load")
+    if any(key not in f.columns for f in parts for key in keys):
+        needed = [d for d in dimensions if d != 'district']
+        raise QueryError(f"{'/'.join(needed)} queries need {' and '.join(needed)} columns in every source feed")
+    frame = pd.concat(parts, ignore_index=True)
+    for key in ('state', 'district'):
+        frame[key] = frame[key].astype(str)
+    counts = [c for c in METRICS[:7] if c in frame.columns]
+    frame[counts] = frame[counts].fillna(0)
+    grouped = frame.groupby(keys, observed=True, sort=False)[counts].sum().reset_index()
+    for col in METRICS[:7]:
+        if col not in grouped.columns:
+            grouped[col] = 0.0
+    return add_derived_metrics(grouped)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _list_field(query: dict, name: str, default=()):
+    value = query.get(name) or list(default)
+    if not isinstance(value, list):
+        raise QueryError(f"{name} must be a list")
+    return value
+
+
+def normalize_query(query: dict) -> dict:
+    """Validates a query and returns its canonical form (also the cache key)."""
+    if not isinstance(query, dict):
+        raise QueryError("Query must be a JSON object")
+    unknown = set(query) - {'dimensions', 'metrics', 'filters', 'sort', 'limit', 'dataset'}
+    if unknown:
+        raise QueryError(f"Unknown query fields: {sorted(unknown)}")
+
+    dimensions = _list_field(query, 'dimensions')
+    for dim in dimensions:
+        if not isinstance(dim, str) or dim not in DIMENSIONS:
+            raise QueryError(f"Unknown dimension {dim!r}; expected one of {list(DIMENSIONS)}")
+    if len(set(dimensions)) != len(dimensions):
+        raise QueryError("Dimensions must be unique")
+
+    metrics = []
+    for spec in _list_field(query, 'metrics', [{'field': '*', 'agg': 'count'}]):
+        if isinstance(spec, str):
+            field, _, agg = spec.partition(':')
+            spec = {'field': field, 'agg': agg or 'sum'}
+        if not isinstance(spec, dict):
+            raise QueryError(f"Metric must be 'field:agg' or an object, got {spec!r}")
+        field, agg = spec.get('field'), spec.get('agg', 'sum')
+        if not isinstance(agg, str) or agg not in AGGREGATIONS:
+            raise QueryError(f"Unknown aggregation {agg!r}; expected one of {list(AGGREGATIONS)}")
+        if not isinstance(field, str) or (field not in METRICS and not (field == '*' and agg == 'count')):
+            raise QueryError(f"Unknown metric {field!r}")
+        if not isinstance(spec.get('as', ''), str):
+            raise QueryError(f"Metric alias must be a string, got {spec['as']!r}")
+        name = spec.get('as') or ('count' if field == '*' else f"{agg}_{field}")
+        metrics.append({'field': field, 'agg': agg, 'as': str(name)})
+    output_columns = dimensions + [m['as'] for m in metrics]
+    if len(set(output_columns)) != len(output_columns):
+        raise QueryError("Output column names must be unique (use 'as' to rename)")
+
+    filters = []
+    for spec in _list_field(query, 'filters'):
+        if not isinstance(spec, dict):
+            raise QueryError(f"Filter must be an object with field, op and value, got {spec!r}")
+        field, op, value = spec.get('field'), spec.get('op', 'eq'), spec.get('value')
+        if not isinstance(op, str) or op not in FILTER_OPS:
+            raise QueryError(f"Unknown filter op {op!r}; expected one of {list(FILTER_OPS)}")
+        if not isinstance(field, str) or (field not in CODED_DIMENSIONS + ('date',) and field not in METRICS):
+            raise QueryError(f"Cannot filter on {field!r}")
+        if field in CODED_DIMENSIONS and op not in ('eq', 'ne', 'in', 'not_in'):
+            raise QueryError(f"Filter on {field} supports eq, ne, in and not_in only")
+        if op in ('in', 'not_in') and not isinstance(value, list):
+            raise QueryError(f"Filter {field} {op} needs a list value")
+        if op == 'between' and not (isinstance(value, list) and len(value) == 2):
+            raise QueryError(f"Filter {field} between needs [low, high]")
+        values = value if isinstance(value, list) else [value]
+        if field == 'date':
+            try:
+                value = [str(pd.Timestamp(v).date()) for v in values] if isinstance(value, list) \
+                    else str(pd.Timestamp(value).date())
+            except (ValueError, TypeError):
+                raise QueryError(f"Invalid date in filter: {value!r}")
+        elif field in METRICS and not all(_is_number(v) for v in values):
+            raise QueryError(f"Filter {field} {op} needs numeric values")
+        elif field in CODED_DIMENSIONS and not all(isinstance(v, (str, int)) and not isinstance(v, bool)
+                                                   for v in values):
+            raise QueryError(f"Filter {field} {op} needs string or integer values")
+        filters.append({'field': field, 'op': op, 'value': value})
+
+    sort = []
+    for spec in _list_field(query, 'sort'):
+        if not isinstance(spec, str):
+            raise QueryError(f"Sort entries must be column names, got {spec!r}")
+        desc = spec.startswith('-')
+        column = spec.lstrip('-+')
+        if column not in output_columns:
+            raise QueryError(f"Cannot sort by {column!r}; not an output column")
+        sort.append(('-' if desc else '') + column)
+
+    limit = query.get('limit', DEFAULT_LIMIT)
+    if not isinstance(limit, int) or isinstance(limit, bool) or not 1 <= limit <= MAX_LIMIT:
+        raise QueryError(f"limit must be an integer between 1 and {MAX_LIMIT}")
+
+    return {'dimensions': dimensions, 'metrics': metrics,
+            'filters': sorted(filters, key=lambda f: json.dumps(f, sort_keys=True)),
+            'sort': sort, 'limit': limit}
+
+
+def json_records(result: pd.DataFrame):
+    """Result rows for a JSON body; NaN/inf (e.g. std over a single row) become null."""
+    clean = result.replace([np.inf, -np.inf], np.nan)
+    return clean.astype(object).where(clean.notna(), None).to_dict(orient='records')
+
+
+def _date_bucket(date_ns: np.ndarray, bucket: str) -> np.ndarray:
+    """Start of each row's bucket as int64 nanoseconds."""
+    days = date_ns.astype('datetime64[ns]').astype('datetime64[D]')
+    if bucket == 'day':
+        start = days
+    elif bucket == 'week':
+        # Monday-based weeks (1970-01-01 was a Thursday)
+        start = days - ((days.astype(np.int64) + 3) % 7).astype('timedelta64[D]')
+    elif bucket == 'month':
+        start = days.astype('datetime64[M]')
+    elif bucket == 'quarter':
+        months = days.astype('datetime64[M]').astype(np.int64)
+        start = (months - months % 3).astype('datetime64[M]')
+    else:
+        start = days.astype('datetime64[Y]')
+    return start.astype('datetime64[ns]').astype(np.int64)
+
+
+class QueryEngine:
+    def __init__(self):
+        self._tables = {}                 # (dataset key, data version, table) -> FactTable
+        self._cache = OrderedDict()       # (dataset key, data version, normalized query) -> DataFrame
+        self._lock = threading.Lock()
+        self.metrics = {"queries": 0, "cache_hits": 0}
+
+    @staticmethod
+    def _data_version(analyst, name: str):
+        # district_day is built from combined_df, whose fingerprint survives identical reloads;
+        # the raw-feed tables are tracked by the stamp of the files they were read from
+        return analyst.source_stamp if name in RAW_TABLES else analyst.content_version
+
+    def _table(self, analyst, name: str) -> FactTable:
+        key = (analyst.data_dir, self._data_version(analyst, name), name)
+        with self._lock:
+            table = self._tables.get(key)
+        if table is None:
+            if name in RAW_TABLES:
+                table = FactTable(raw_day_frame(analyst.enrollment_df, analyst.biometric_df,
+                                                analyst.demographic_df, RAW_TABLES[name]), RAW_TABLES[name])
+            else:
+                table = FactTable(analyst.combined_df, ['district'])
+            with self._lock:
+                # Keep only the current version of each dataset's tables
+                for stale in [k for k in self._tables if k[0] == key[0] and k[2] == name and k[1] != key[1]]:
+                    del self._tables[stale]
+                self._tables[key] = table
+        return table
+
+    def execute(self, analyst, query: dict):
+        """Returns (result DataFrame, info dict)."""
+        normalized = normalize_query(query)
+        cache_key = (analyst.data_dir, self._data_version(analyst, self._table_name(normalized)),
+                     json.dumps(normalized, sort_keys=True))
+        with self._lock:
+            self.metrics["queries"] += 1
+            if cache_key in self._cache:
+                self._cache.move_to_end(cache_key)
+                self.metrics["cache_hits"] += 1
+                return self._cache[cache_key], {"cached": True, "plan": self.explain(normalized)}
+
+        result = self._run(analyst, normalized)
+        with self._lock:
+            self._cache[cache_key] = result
+            while len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return result, {"cached": False, "plan": self.explain(normalized)}
+
+    def forget(self, data_dir: str):
+        """Drops the tables and cached results of one dataset (e.g. once it is evicted)."""
+        with self._lock:
+            for key in [k for k in self._tables if k[0] == data_dir]:
+                del self._tables[key]
+            for key in [k for k in self._cache if k[0] == data_dir]:
+                del self._cache[key]
+
+    @staticmethod
+    def _table_name(normalized: dict) -> str:
+        fields = set(normalized['dimensions']) | {f['field'] for f in normalized['filters']}
+        if 'pincode' in fields:
+            return 'pincode_day'
+        return 'state_day' if 'state' in fields else 'district_day'
+
+    def explain(self, normalized: dict) -> dict:
+        filters = normalized['filters']
+        return {
+            "table": self._table_name(normalized),
+            "date_range_scan": any(f['field'] == 'date' and f['op'] in ('eq', 'gt', 'gte', 'lt', 'lte', 'between')
+                                   for f in filters),
+            "code_filters": [f['field'] for f in filters if f['field'] in CODED_DIMENSIONS],
+            "group_keys": normalized['dimensions'],
+        }
+
+    def _run(self, analyst, normalized: dict) -> pd.DataFrame:
+        table = self._table(analyst, self._table_name(normalized))
+
+        # 1. Date predicates -> contiguous row range on the date-sorted table
+        lo, hi = 0, table.rows
+        mask = None
+        residual = []
+        for f in normalized['filters']:
+            if f['field'] == 'date' and f['op'] in ('eq', 'gt', 'gte', 'lt', 'lte', 'between'):
+                value = f['value']
+                low = high = None
+                if f['op'] == 'between':
+                    low, high = value
+                elif f['op'] == 'eq':
+                    low = high = value
+                elif f['op'] in ('gt', 'gte'):
+                    low = value
+                else:
+                    high = value
+                if low is not None:
+                    ns = pd.Timestamp(low).value
+                    lo = max(lo, int(np.searchsorted(table.date_ns, ns, side='right' if f['op'] == 'gt' else 'left')))
+                if high is not None:
+                    ns = pd.Timestamp(high).value
+                    hi = min(hi, int(np.searchsorted(table.date_ns, ns, side='left' if f['op'] == 'lt' else 'right')))
+            else:
+                residual.append(f)
+        hi = max(lo, hi)
+
+        # 2. Remaining predicates as vectorized masks over the range
+        for f in residual:
+            column = self._filter_column(table, f['field'], lo, hi)
+            value = f['value']
+            if f['field'] in CODED_DIMENSIONS:
+                values = value if isinstance(value, list) else [value]
+                value = [table.lookup[f['field']].get(str(v).lower(), -2) for v in values]
+                if f['op'] not in ('in', 'not_in'):
+                    value = value[0]
+            elif f['field'] == 'date':
+                values = value if isinstance(value, list) else [value]
+                value = [pd.Timestamp(v).value for v in values]
+                if f['op'] not in ('in', 'not_in'):
+                    value = value[0]
+            part = _apply_op(column, f['op'], value)
+            mask = part if mask is None else (mask & part)
+
+        rows = np.arange(lo, hi) if mask is None else np.flatnonzero(mask) + lo
+
+        # 3. Group on integer keys and aggregate
+        frame = {}
+        for dim in normalized['dimensions']:
+            if dim in DATE_BUCKETS:
+                frame[dim] = _date_bucket(table.date_ns[rows], dim)
+            else:
+                frame[dim] = table.codes[dim][rows]
+        needed = {m['field'] for m in normalized['metrics'] if m['field'] != '*'}
+        for field in needed:
+            if field not in table.metrics:
+                raise QueryError(f"Metric {field!r} is not available for this query")
+            frame[f"__{field}"] = table.metrics[field][rows]
+        data = pd.DataFrame(frame, index=pd.RangeIndex(len(rows)))
+        data['__rows'] = 1
+        keys = normalized['dimensions'] or ['__all']
+        if not normalized['dimensions']:
+            data['__all'] = 0
+
+        named = {m['as']: ('__rows', 'sum') if m['field'] == '*' else (f"__{m['field']}", m['agg'])
+                 for m in normalized['metrics']}
+        result = data.groupby(keys, sort=True).agg(**named).reset_index()
+        if not normalized['dimensions']:
+            result = result.drop(columns='__all')
+
+        # 4. Decode keys back to labels / timestamps
+        for dim in normalized['dimensions']:
+            if dim in DATE_BUCKETS:
+                result[dim] = pd.to_datetime(result[dim].to_numpy(dtype=np.int64))
+            else:
+                labels = table.categories[dim]
+                result[dim] = labels[result[dim].to_numpy()]
+                if dim == 'pincode':
+                    result[dim] = result[dim].astype(np.int64)
+
+        # 5. Sort and limit
+        if normalized['sort']:
+            result = result.sort_values([s.lstrip('-') for s in normalized['sort']],
+                                        ascending=[not s.startswith('-') for s in normalized['sort']],
+                                        kind='stable')
+        return result.head(normalized['limit']).reset_index(drop=True)
+
+    @staticmethod
+    def _filter_column(table: FactTable, field: str, lo: int, hi: int) -> np.ndarray:
+        if field == 'date':
+            return table.date_ns[lo:hi]
+        if field in table.codes:
+            return table.codes[field][lo:hi]
+        if field in CODED_DIMENSIONS:
+            raise QueryError(f"Cannot filter on {field!r} for this query")
+        return table.metrics[field][lo:hi]
+
+
+def _apply_op(column: np.ndarray, op: str, value) -> np.ndarray:
+    if op == 'eq':
+        return column == value
+    if op == 'ne':
+        return column != value
+    if op == 'in':
+        return np.isin(column, value)
+    if op == 'not_in':
+        return ~np.isin(column, value)
+    if op == 'gt':
+        return column > value
+    if op == 'gte':
+        return column >= value
+    if op == 'lt':
+        return column < value
+    if op == 'lte':
+        return column <= value
+    low, high = value
+    return (column >= low) & (column <= high)
@@ -0,0 +1,137 @@
+"""
+SCENARIO ENGINE - GovOptima Platform
+What-if evaluation of the cost and resource assumptions. Any number of
+parameter sets are evaluated together as a scenarios x districts matrix,
+so a sensitivity sweep is one vectorized pass instead of one edit + rerun
+per case. The defaults are the assumptions the dashboard and
+master_analysis.py have always used.
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PARAMETERS = {
+    'cost_per_enrollment': 150,      # INR per enrollment processed
+    'cost_per_biometric': 75,        # INR per biometric update
+    'cost_per_demographic': 50,      # INR per demographic update
+    'cost_per_kit': 500000,          # INR (5 lakhs) per enrollment kit
+    'cost_per_staff_annual': 600000, # INR (6 lakhs) per staff member per year
+    'savings_rate': 0.10,            # Efficiency gain from better allocation
+    'ops_per_kit': 50,               # Daily operations one kit can handle
+    'ops_per_staff': 10000,          # Operations one staff member covers
+}
+DIVISORS = ('ops_per_kit', 'ops_per_staff')
+
+# 'dashboard': kits = max(1, load/ops_per_kit) per district, totals floored (/api/cost_analysis)
+# 'ceil':      kits and staff rounded up per district (master_analysis.py)
+ROUNDING_MODES = ('dashboard', 'ceil')
+MAX_SCENARIOS = 10000
+
+
+def district_inputs(df: pd.DataFrame) -> pd.DataFrame:
+    """Per-district inputs of the cost model from combined_df."""
+    return df.groupby('district', observed=True).agg({
+        'stress_index': 'mean',
+        'total_enrollment': 'sum',
+        'total_biometric': 'sum',
+        'total_demographic': 'sum'
+    })
+
+
+def parameter_matrix(scenarios):
+    """Validates scenario dicts and returns (names, {parameter: array over scenarios})."""
+    if not scenarios:
+        raise ValueError("At least one scenario is required")
+    if len(scenarios) > MAX_SCENARIOS:
+        raise ValueError(f"At most {MAX_SCENARIOS} scenarios per request")
+
+    names, rows = [], []
+    for i, scenario in enumerate(scenarios):
+        scenario = dict(scenario)
+        names.append(str(scenario.pop('name', f"scenario_{i + 1}")))
+        unknown = sorted(set(scenario) - set(DEFAULT_PARAMETERS))
+        if unknown:
+            raise ValueError(f"Scenario {names[-1]!r}: unknown parameters {unknown}")
+        row = dict(DEFAULT_PARAMETERS)
+        for key, value in scenario.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not np.isfinite(value):
+                raise ValueError(f"Scenario {names[-1]!r}: {key} must be a number")
+            if value < 0 or (key in DIVISORS and value == 0):
+                raise ValueError(f"Scenario {names[-1]!r}: {key} must be {'positive' if key in DIVISORS else 'non-negative'}")
+            row[key] = value
+        rows.append(row)
+
+    return names, {key: np.array([row[key] for row in rows], dtype=np.float64) for key in DEFAULT_PARAMETERS}
+
+
+class ScenarioEngine:
+    def __init__(self, districts: pd.DataFrame):
+        self.districts = districts.index.astype(str).tolist()
+        self.stress = districts['stress_index'].to_numpy(dtype=np.float64)
+        self.enrollment = districts['total_enrollment'].to_numpy(dtype=np.float64)
+        self.biometric = districts['total_biometric'].to_numpy(dtype=np.float64)
+        self.demographic = districts['total_demographic'].to_numpy(dtype=np.float64)
+        self.operations = self.enrollment + self.biometric + self.demographic
+
+    @classmethod
+    def from_combined(cls, df: pd.DataFrame):
+        return cls(district_inputs(df))
+
+    def evaluate(self, scenarios, rounding: str = 'dashboard', include_districts: bool = False):
+        """Evaluates every scenario at once. Omitted parameters take DEFAULT_PARAMETERS."""
+        if rounding not in ROUNDING_MODES:
+            raise ValueError(f"rounding must be one of {list(ROUNDING_MODES)}")
+        names, p = parameter_matrix(scenarios)
+        col = {key: values[:, None] for key, values in p.items()}  # (S, 1) against (D,) -> (S, D)
+
+        operational = (self.enrollment * col['cost_per_enrollment'] +
+                       self.biometric * col['cost_per_biometric'] +
+                       self.demographic * col['cost_per_demographic'])
+        kits_raw = self.stress / col['ops_per_kit']
+        staff_raw = self.operations / col['ops_per_staff']
+
+        if rounding == 'ceil':
+            kits, staff = np.ceil(kits_raw), np.ceil(staff_raw)
+            total_kits, total_staff = kits.sum(axis=1), staff.sum(axis=1)
+        else:
+            kits, staff = np.maximum(1, kits_raw), staff_raw
+            total_kits = np.floor(kits.sum(axis=1))
+            total_staff = np.floor(self.operations.sum() / p['ops_per_staff'])
+
+        operational_total = operational.sum(axis=1)
+        kit_cost = total_kits * p['cost_per_kit']
+        staff_cost = total_staff * p['cost_per_staff_annual']
+        infrastructure = kit_cost + staff_cost
+        savings = operational_total * p['savings_rate']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            roi = np.where(infrastructure > 0, np.round(savings / infrastructure * 100, 1), 0.0)
+
+        results = []
+        for i, name in enumerate(names):
+            result = {
+                "name": name,
+                "parameters": {key: float(values[i]) for key, values in p.items()},
+                "operational_cost_inr": float(operational_total[i]),
+                "kit_investment_inr": float(kit_cost[i]),
+                "staff_cost_annual_inr": float(staff_cost[i]),
+                "total_infrastructure_inr": float(infrastructure[i]),
+                "potential_savings_inr": float(savings[i]),
+                "roi_percentage": float(roi[i]),
+                "total_kits_needed": int(total_kits[i]),
+                "total_staff_needed": int(total_staff[i]),
+            }
+            if include_districts:
+                # Columnar, aligned with the top-level "districts" list
+                result["district_results"] = {
+                    "operational_cost_inr": operational[i].tolist(),
+                    "kits": np.round(kits[i], 2).tolist(),
+                    "staff": np.round(staff[i], 2).tolist(),
+                    "kit_cost_inr": np.round(kits[i] * p['cost_per_kit'][i], 2).tolist(),
+                    "staff_cost_annual_inr": np.round(staff[i] * p['cost_per_staff_annual'][i], 2).tolist(),
+                }
+            results.append(result)
+
+        response = {"rounding": rounding, "defaults": DEFAULT_PARAMETERS, "scenarios": results}
+        if include_districts:
+            response["districts"] = self.districts
+        return response
@@ -0,0 +1,136 @@
+"""
+DATASET SCHEMAS - GovOptima Platform
+Declared column layout for each source feed, and a fast typed reader:
+only declared columns are read, with fixed integer widths and categorical
+text columns, using the pyarrow CSV engine when it is installed. Dates are
+parsed once per distinct string. Schema violations are reported instead of
+being silently filled with 0. `state` and `pincode` are optional: a feed
+without them loads, and only the pincode/state breakdowns are unavailable.
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (only needed to enable the pyarrow CSV engine)
+    CSV_ENGINE = 'pyarrow'
+except ImportError:
+    CSV_ENGINE = 'c'
+
+DATE_FORMAT = '%d-%m-%Y'
+
+
+class DatasetSchema:
+    def __init__(self, name, filename, count_columns, categorical=('state', 'district'),
+                 integer_columns=('pincode',), count_dtype='int32', drop=(), optional=('state', 'pincode')):
+        self.name = name
+        self.filename = filename
+        self.count_columns = list(count_columns)
+        self.categorical = list(categorical)
+        self.integer_columns = list(integer_columns)
+        self.count_dtype = count_dtype
+        self.drop = list(drop)
+        self.optional = list(optional)   # Read when present; a feed without them still loads
+
+    @property
+    def columns(self):
+        return ['date'] + self.categorical + self.integer_columns + self.count_columns
+
+    def dtypes(self, count_dtype=None, columns=None):
+        dtypes = {'date': 'category'}
+        dtypes.update({c: 'category' for c in self.categorical})
+        dtypes.update({c: 'int32' for c in self.integer_columns})
+        dtypes.update({c: count_dtype or self.count_dtype for c in self.count_columns})
+        return {c: t for c, t in dtypes.items() if columns is None or c in columns}
+
+
+SCHEMAS = {
+    'biometric': DatasetSchema('biometric', 'Biometric_Data.csv', ['bio_age_5_17', 'bio_age_17_']),
+    'demographic': DatasetSchema('demographic', 'Demographic_Data.csv', ['demo_age_5_17', 'demo_age_17_']),
+    'enrollment': DatasetSchema('enrollment', 'Enrollment_Data.csv', ['age_0_5', 'age_5_17', 'age_18_greater']),
+}
+
+
+def parse_dates(values, fmt: str = DATE_FORMAT):
+    """Parses each distinct date string once and maps the result back by category code."""
+    cat = pd.Categorical(values)
+    parsed = pd.to_datetime(cat.categories, format=fmt, errors='coerce')
+    codes = cat.codes
+    out = parsed.values.take(np.where(codes >= 0, codes, 0))
+    out[codes < 0] = np.datetime64('NaT')
+    return pd.Series(out, index=getattr(values, 'index', None))
+
+
+def read_dataset(path: str, schema: DatasetSchema):
+    """Reads one feed according to its schema. Returns (df, report)."""
+    header = pd.read_csv(path, nrows=0)
+    actual = {c.strip().lower(): c for c in header.columns}
+
+    missing = [c for c in schema.columns if c not in actual]
+    required_missing = [c for c in missing if c not in schema.optional]
+    if required_missing:
+        raise ValueError(f"{path}: missing required columns {required_missing}")
+    unexpected = [c for c in actual if c not in schema.columns]
+    columns = [c for c in schema.columns if c in actual]
+
+    rename = {actual[c]: c for c in columns}
+    usecols = [actual[c] for c in columns]
+    report = {
+        "file": path,
+        "engine": CSV_ENGINE,
+        "dropped_columns": [c for c in unexpected if c not in schema.drop] + [c for c in schema.drop if c in actual],
+        "missing_optional_columns": missing,
+        "violations": {},
+        "quarantined_rows": 0,
+        "invalid_dates": 0,
+    }
+
+    try:
+        dtypes = {actual[c]: t for c, t in schema.dtypes(columns=columns).items()}
+        df = pd.read_csv(path, usecols=usecols, dtype=dtypes, engine=CSV_ENGINE).rename(columns=rename)
+        # The typed read only proves the values are integers: negatives still need quarantining
+        if any((df[c] < 0).any() for c in schema.integer_columns + schema.count_columns if c in df.columns):
+            df = _validate_counts(df, schema, report)
+    except (ValueError, TypeError):
+        # Typed fast path rejected something: re-read counts as text and validate them
+        dtypes = {actual[c]: t for c, t in schema.dtypes(count_dtype='str', columns=columns).items()}
+        for c in schema.integer_columns:
+            if c in actual:
+                dtypes[actual[c]] = 'str'
+        df = pd.read_csv(path, usecols=usecols, dtype=dtypes, engine='c').rename(columns=rename)
+        df = _validate_counts(df, schema, report)
+
+    df['date'] = parse_dates(df['date'])
+    report["invalid_dates"] = int(df['date'].isna().sum())
+    report["rows"] = len(df)
+    return df, report
+
+
+def _validate_counts(df, schema, report):
+    bad_rows = np.zeros(len(df), dtype=bool)
+    checked = [c for c in schema.integer_columns + schema.count_columns if c in df.columns]
+    for col in checked:
+        raw = df[col]
+        values = pd.to_numeric(raw, errors='coerce')
+        missing = raw.isna().to_numpy()
+        non_numeric = (values.isna().to_numpy() & ~missing)
+        negative = (values < 0).to_numpy()
+        fractional = (values.notna() & (values % 1 != 0)).to_numpy()
+        if missing.any() or non_numeric.any() or negative.any() or fractional.any():
+            report["violations"][col] = {
+                "missing": int(missing.sum()),
+                "non_numeric": int(non_numeric.sum()),
+                "negative": int(negative.sum()),
+                "fractional": int(fractional.sum()),
+            }
+        # A blank count is "no activity"; anything unparseable or impossible is quarantined
+        bad_rows |= non_numeric | negative | fractional
+        df[col] = values
+
+    if bad_rows.any():
+        report["quarantined_rows"] = int(bad_rows.sum())
+        df = df[~bad_rows].copy()
+    for col in checked:
+        dtype = 'int32' if col in schema.integer_columns else schema.count_dtype
+        df[col] = df[col].fillna(0).astype(dtype)
+    return df
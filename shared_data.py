@@ -0,0 +1,248 @@
+"""
+SHARED DATA PLANE - GovOptima Platform
+One loader process publishes combined_df as memory-mapped column files;
+every uvicorn worker maps the same read-only arrays instead of holding its
+own copy. Versions are swapped by atomically rewriting a CURRENT pointer.
+
+Usage: python shared_data.py <shared_dir>   (build & publish from the CSVs in cwd)
+"""
+
+import json
+import os
+import socket
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+CURRENT_FILE = 'CURRENT'
+LOCK_FILE = 'publish.lock'
+
+
+def publish(combined_df, root: str, keep: int = 2, source_stamp=None) -> str:
+    """Writes combined_df as a new version under `root` and makes it current.
+
+    `source_stamp` (see partitioned_loader.sources_stamp) records which source files the
+    version was built from, so a restart can tell whether CURRENT is still up to date.
+    """
+    version = f"v{time.time_ns()}"
+    version_dir = os.path.join(root, version)
+    os.makedirs(version_dir)
+
+    meta = {'version': version, 'rows': len(combined_df), 'source_stamp': source_stamp, 'columns': []}
+    for col in combined_df.columns:
+        series = combined_df[col]
+        entry = {'name': col, 'file': f"{len(meta['columns'])}.npy"}
+        if series.dtype == object or pd.api.types.is_string_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+            # Strings are stored once as categories; rows only carry integer codes
+            codes, categories = pd.factorize(series.astype(str), sort=True)
+            values = codes.astype(np.int32)
+            entry['categories'] = categories.tolist()
+        else:
+            values = series.to_numpy()
+        np.save(os.path.join(version_dir, entry['file']), values)
+        meta['columns'].append(entry)
+
+    with open(os.path.join(version_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+    # Atomic pointer swap: workers see either the old or the new version, never a partial one
+    tmp_path = os.path.join(root, CURRENT_FILE + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+
+    _prune(root, keep)
+    return version
+
+
+def _prune(root: str, keep: int):
+    versions = sorted(d for d in os.listdir(root) if d.startswith('v') and os.path.isdir(os.path.join(root, d)))
+    for old in versions[:-keep]:
+        old_dir = os.path.join(root, old)
+        try:
+            for name in os.listdir(old_dir):
+                os.remove(os.path.join(old_dir, name))
+            os.rmdir(old_dir)
+        except OSError:
+            pass  # Still mapped by a worker on Windows; retried on the next publish
+
+
+def read_current(root: str):
+    try:
+        with open(os.path.join(root, CURRENT_FILE), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def published_stamp(root: str, version: str):
+    """The source stamp a version was published with (None if unknown)."""
+    try:
+        with open(os.path.join(root, version, 'meta.json'), 'r', encoding='utf-8') as f:
+            return json.load(f).get('source_stamp')
+    except (OSError, ValueError):
+        return None
+
+
+def attach(root: str, version: str):
+    """Maps a published version as a read-only DataFrame backed by the shared files."""
+    version_dir = os.path.join(root, version)
+    with open(os.path.join(version_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+
+    columns = {}
+    for entry in meta['columns']:
+        values = np.load(os.path.join(version_dir, entry['file']), mmap_mode='r')
+        if 'categories' in entry:
+            values = pd.Categorical.from_codes(values, categories=entry['categories'])
+        columns[entry['name']] = values
+    return pd.DataFrame(columns, copy=False)
+
+
+def _loader_alive(owner: str) -> bool:
+    """False only when the lock's owner is known to be gone (same host, no such pid)."""
+    try:
+        pid, host = owner.split(' ', 1)
+        pid = int(pid)
+    except ValueError:
+        return True                        # Not written yet (or foreign): judged by age alone
+    if host != socket.gethostname() or os.name == 'nt':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass                               # Exists, owned by another user
+    return True
+
+
+def _break_stale_lock(lock_path: str, timeout: float) -> bool:
+    """Removes the publish lock if its loader died or it is older than `timeout`."""
+    try:
+        st = os.stat(lock_path)
+        with open(lock_path, 'r', encoding='utf-8') as f:
+            owner = f.read().strip()
+    except FileNotFoundError:
+        return True                        # Released meanwhile: just retry
+    if _loader_alive(owner) and time.time() - st.st_mtime < timeout:
+        return False
+    # Move it aside first, and put it back if another waiter replaced it in between
+    stale_path = f"{lock_path}.{os.getpid()}.stale"
+    try:
+        os.rename(lock_path, stale_path)
+    except FileNotFoundError:
+        return True
+    if os.stat(stale_path).st_ino != st.st_ino:
+        try:
+            os.link(stale_path, lock_path)     # Unlike rename, never replaces a newer lock
+        except OSError:
+            pass
+        os.remove(stale_path)
+        return False
+    os.remove(stale_path)
+    print(f"Warning: broke stale shared-data lock {lock_path} (owner: {owner or 'unknown'})")
+    return True
+
+
+class SharedDataPlane:
+    def __init__(self, root: str, data_dir: str = None, check_interval: float = 2.0):
+        self.root = root
+        self.data_dir = data_dir          # Source CSVs; CURRENT is rebuilt when they changed
+        self.check_interval = check_interval
+        self.version = None               # Published version id ("v<ns>") currently mapped
+        self._last_check = 0.0
+        os.makedirs(root, exist_ok=True)
+
+    def source_stamp(self):
+        if self.data_dir is None:
+            return None
+        from partitioned_loader import sources_stamp
+        from schemas import SCHEMAS
+        return sources_stamp(self.data_dir, SCHEMAS)
+
+    def _current_is_fresh(self, stamp) -> bool:
+        """CURRENT exists and was built from the same source files (when those are known)."""
+        version = read_current(self.root)
+        return bool(version) and (stamp is None or published_stamp(self.root, version) == stamp)
+
+    def publish(self, build) -> str:
+        """Runs `build()` and publishes its result with the stamp of the sources it read."""
+        stamp = self.source_stamp()    # Taken before reading: a change mid-build makes it stale
+        return publish(build(), self.root, source_stamp=stamp)
+
+    def ensure_published(self, build, timeout: float = 300):
+        """Makes sure an up-to-date version exists; exactly one process runs `build()` to create it.
+
+        A CURRENT published from other source files than those now in data_dir is rebuilt.
+        The loader holds publish.lock (its pid and host inside). A lock left behind by a
+        loader that died, or one older than `timeout`, is broken and another process loads.
+        """
+        lock_path = os.path.join(self.root, LOCK_FILE)
+        deadline = time.monotonic() + timeout
+        stamp = self.source_stamp()
+        while not self._current_is_fresh(stamp):
+            fd = self._acquire_lock(lock_path, timeout)
+            if fd is None:
+                # Another worker is the loader: wait for it to publish
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"No shared dataset published in {self.root} after {timeout}s")
+                time.sleep(0.2)
+                continue
+            try:
+                if not self._current_is_fresh(stamp):   # May have appeared while a stale lock was broken
+                    self.publish(build)
+            finally:
+                os.close(fd)
+                os.remove(lock_path)
+            return
+
+    @staticmethod
+    def _acquire_lock(lock_path: str, timeout: float):
+        """Returns the open lock file, or None while a live loader holds it."""
+        for _ in range(2):
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if not _break_stale_lock(lock_path, timeout):
+                    return None
+                continue
+            os.write(fd, f"{os.getpid()} {socket.gethostname()}".encode())
+            return fd
+        return None
+
+    def refresh(self, analyst, force: bool = False) -> bool:
+        """Remaps the analyst onto the current version if it changed. Returns True on swap.
+
+        analyst.version stays this process's numeric counter; the published id is self.version.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+
+        version = read_current(self.root)
+        if version is None or version == self.version:
+            return False
+        analyst.combined_df = attach(self.root, version)
+        analyst.version += 1
+        self.version = version
+        return True
+
+
+if __name__ == "__main__":
+    from analysis import GovernanceAnalyst
+
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(1)
+    analyst = GovernanceAnalyst(os.getcwd())
+
+    def build():
+        analyst.load_data()
+        return analyst.process_data()
+
+    published = SharedDataPlane(sys.argv[1], data_dir=os.getcwd()).publish(build)
+    print(f"✅ Published shared dataset {published} to {sys.argv[1]}")
@@ -0,0 +1,137 @@
+"""
+DISTRICT SIMILARITY - GovOptima Platform
+"Which districts behave like Pune?" answered from a precomputed index.
+Every district gets two normalized feature blocks:
+  - series:  its daily `api` (operational load) series over the full date axis
+  - profile: enrollment age mix, mean `bsr` and mean `migration_intensity`,
+             standardized across districts
+Pairwise similarities come from one matrix product per block (row-chunked, so
+the full N x N matrix is never held) and only the top-k neighbours of each
+district are kept, for the series, profile and weighted combined bases.
+"""
+
+import numpy as np
+import pandas as pd
+
+METRICS = ('correlation', 'cosine')
+BASES = ('combined', 'series', 'profile')
+PROFILE_FEATURES = ['share_age_0_5', 'share_age_5_17', 'share_age_18_greater', 'bsr', 'migration_intensity']
+DEFAULT_TOP_K = 50
+DEFAULT_WEIGHTS = {'series': 0.5, 'profile': 0.5}
+CHUNK_ROWS = 1024
+
+
+def _normalize_rows(matrix: np.ndarray, metric: str) -> np.ndarray:
+    """Unit-length rows (centered first for correlation); all-constant rows become zero vectors."""
+    if metric == 'correlation':
+        matrix = matrix - matrix.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def district_features(df: pd.DataFrame):
+    """(districts, api series [district, date], profile frame) aggregated with bincount on integer codes."""
+    district_codes, districts = pd.factorize(df['district'].astype(str), sort=True)
+    date_codes, dates = pd.factorize(df['date'], sort=True)
+    n_districts, n_dates = len(districts), len(dates)
+
+    cells = district_codes * n_dates + date_codes
+    series = np.bincount(cells, weights=df['api'].to_numpy(dtype=np.float64),
+                         minlength=n_districts * n_dates).reshape(n_districts, n_dates)
+
+    def total(column):
+        return np.bincount(district_codes, weights=df[column].to_numpy(dtype=np.float64), minlength=n_districts)
+
+    rows = np.bincount(district_codes, minlength=n_districts)
+    enrolled = total('total_enrollment')
+    safe_enrolled = np.where(enrolled > 0, enrolled, 1)
+    profile = pd.DataFrame({
+        'share_age_0_5': total('age_0_5') / safe_enrolled,
+        'share_age_5_17': total('age_5_17') / safe_enrolled,
+        'share_age_18_greater': total('age_18_greater') / safe_enrolled,
+        'bsr': total('bsr') / rows,
+        'migration_intensity': total('migration_intensity') / rows,
+    }, index=pd.Index(districts, name='district'))
+    return pd.Index(districts), series, profile
+
+
+class SimilarityIndex:
+    def __init__(self, districts, series: np.ndarray, profile: pd.DataFrame, metric: str = 'correlation',
+                 weights: dict = None, top_k: int = DEFAULT_TOP_K):
+        if metric not in METRICS:
+            raise ValueError(f"metric must be one of {list(METRICS)}")
+        self.districts = pd.Index(districts)
+        self.metric = metric
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.top_k = max(0, min(top_k, len(self.districts) - 1))
+        self.profile = profile
+        self._lookup = {name.lower(): i for i, name in enumerate(self.districts)}
+
+        # Standardize each profile feature across districts so no single unit dominates
+        values = profile[PROFILE_FEATURES].to_numpy(dtype=np.float64)
+        std = values.std(axis=0)
+        values = (values - values.mean(axis=0)) / np.where(std > 0, std, 1)
+        self.embeddings = {
+            'series': _normalize_rows(np.asarray(series, dtype=np.float64), metric),
+            'profile': _normalize_rows(values, metric),
+        }
+        self.neighbors, self.scores, self.components = self._build()
+
+    @classmethod
+    def from_combined(cls, df: pd.DataFrame, **kwargs):
+        districts, series, profile = district_features(df)
+        return cls(districts, series, profile, **kwargs)
+
+    def _build(self):
+        n, k = len(self.districts), self.top_k
+        series_emb, profile_emb = self.embeddings['series'], self.embeddings['profile']
+        neighbors = {b: np.empty((n, k), dtype=np.int64) for b in BASES}
+        scores = {b: np.empty((n, k), dtype=np.float32) for b in BASES}
+        # Series/profile similarity of every kept neighbour, so combined results can be explained
+        components = {b: {c: np.empty((n, k), dtype=np.float32) for c in ('series', 'profile')} for b in BASES}
+        if k == 0:
+            return neighbors, scores, components
+
+        for start in range(0, n, CHUNK_ROWS):
+            rows = np.arange(start, min(start + CHUNK_ROWS, n))
+            block = {'series': series_emb[rows] @ series_emb.T, 'profile': profile_emb[rows] @ profile_emb.T}
+            block['combined'] = (self.weights['series'] * block['series'] +
+                                 self.weights['profile'] * block['profile'])
+            for basis in BASES:
+                sim = block[basis].copy()
+                sim[np.arange(len(rows)), rows] = -np.inf   # A district is not its own neighbour
+                top = np.argpartition(-sim, k - 1, axis=1)[:, :k]
+                order = np.argsort(-np.take_along_axis(sim, top, axis=1), axis=1, kind='stable')
+                top = np.take_along_axis(top, order, axis=1)
+                neighbors[basis][rows] = top
+                scores[basis][rows] = np.take_along_axis(sim, top, axis=1)
+                for component in ('series', 'profile'):
+                    components[basis][component][rows] = np.take_along_axis(block[component], top, axis=1)
+        return neighbors, scores, components
+
+    def __contains__(self, district: str) -> bool:
+        return district.lower() in self._lookup
+
+    def similar(self, district: str, k: int = 10, basis: str = 'combined'):
+        """Top-k most similar districts to `district`, best first. Raises KeyError if unknown."""
+        if basis not in BASES:
+            raise ValueError(f"basis must be one of {list(BASES)}")
+        i = self._lookup[district.lower()]
+        k = min(k, self.top_k)
+        profile = self.profile.iloc[i]
+        return {
+            "district": self.districts[i],
+            "basis": basis,
+            "metric": self.metric,
+            "weights": self.weights,
+            "profile": {f: round(float(profile[f]), 4) for f in PROFILE_FEATURES},
+            "neighbors": [
+                {
+                    "district": self.districts[j],
+                    "similarity": round(float(self.scores[basis][i, r]), 4),
+                    "series_similarity": round(float(self.components[basis]['series'][i, r]), 4),
+                    "profile_similarity": round(float(self.components[basis]['profile'][i, r]), 4),
+                }
+                for r, j in enumerate(self.neighbors[basis][i, :k])
+            ],
+        }
@@ -0,0 +1,208 @@
+"""
+SQL ANALYTICS STORE - GovOptima Platform
+Embedded SQLite mirror of combined_df plus district/pincode aggregates,
+indexed for ad-hoc slicing and usable as a fast-start source.
+The store keeps the data fingerprint it was built from, so a re-ingest only
+rewrites the districts whose content changed.
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+from fingerprints import DataFingerprint, affected_districts
+
+# Only plain reads are allowed through the ad-hoc query path
+_ALLOWED_ACTIONS = {
+    sqlite3.SQLITE_SELECT,
+    sqlite3.SQLITE_READ,
+    sqlite3.SQLITE_FUNCTION,
+    sqlite3.SQLITE_RECURSIVE,
+}
+
+MAX_QUERY_ROWS = 10000
+# Above this share of changed districts a full rebuild is cheaper than row-level rewrites
+INCREMENTAL_MAX_SHARE = 0.5
+QUERY_TIMEOUT_SECONDS = 5
+
+
+def _authorize(action, arg1, arg2, db_name, trigger):
+    return sqlite3.SQLITE_OK if action in _ALLOWED_ACTIONS else sqlite3.SQLITE_DENY
+
+
+class AnalyticsStore:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    def exists(self) -> bool:
+        return os.path.exists(self.db_path)
+
+    def write(self, combined_df, raw_frames=(), fingerprint: DataFingerprint = None, source_stamp=None):
+        """Brings the store up to date with combined_df; returns 'unchanged', 'incremental' or 'rebuilt'.
+
+        With a fingerprint, an existing store is diffed against the one it was
+        built from and only changed/added/removed districts are rewritten.
+        combined_df does not see pincodes, so pincode_summary is only kept when
+        the raw feeds' `source_stamp` matches the stored one; otherwise it is
+        recomputed in full.
+        """
+        if fingerprint is not None and self.exists():
+            previous = self.stored_fingerprint()
+            if previous is not None:
+                change = fingerprint.diff(previous)
+                pincodes_current = source_stamp is not None and self._stored_meta('source_stamp') == json.dumps(source_stamp)
+                if change["identical"] and pincodes_current:
+                    return 'unchanged'
+                districts = affected_districts(change)
+                if len(districts) <= INCREMENTAL_MAX_SHARE * max(1, len(fingerprint.districts)):
+                    self.update_districts(combined_df, districts, raw_frames, fingerprint,
+                                          source_stamp, all_pincodes=not pincodes_current)
+                    return 'incremental'
+        self.rebuild(combined_df, raw_frames, fingerprint, source_stamp)
+        return 'rebuilt'
+
+    @staticmethod
+    def _tables(combined_df, raw_frames):
+        combined = combined_df.copy()
+        combined['date'] = pd.to_datetime(combined['date']).dt.strftime('%Y-%m-%d')
+
+        district_summary = combined_df.groupby('district').agg({
+            'total_enrollment': 'sum',
+            'total_biometric': 'sum',
+            'total_demographic': 'sum',
+            'stress_index': 'mean',
+            'migration_intensity': 'mean'
+        }).reset_index()
+        return combined, district_summary, AnalyticsStore._pincode_summary(raw_frames)
+
+    def rebuild(self, combined_df, raw_frames=(), fingerprint: DataFingerprint = None, source_stamp=None):
+        """Rebuilds the store from combined_df (and the raw frames for pincode aggregates)."""
+        combined, district_summary, pincode_summary = self._tables(combined_df, raw_frames)
+
+        # Build into a temp file and swap in atomically so readers never see a half-written store
+        tmp_path = self.db_path + '.tmp'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        conn = sqlite3.connect(tmp_path)
+        try:
+            combined.to_sql('combined', conn, index=False, chunksize=10000)
+            district_summary.to_sql('district_summary', conn, index=False)
+            pincode_summary.to_sql('pincode_summary', conn, index=False)
+            conn.execute("CREATE INDEX idx_combined_district_date ON combined (district, date)")
+            conn.execute("CREATE INDEX idx_combined_date ON combined (date)")
+            conn.execute("CREATE UNIQUE INDEX idx_district_summary ON district_summary (district)")
+            conn.execute("CREATE INDEX idx_pincode_summary ON pincode_summary (district, pincode)")
+            self._save_meta(conn, fingerprint, source_stamp)
+            conn.execute("ANALYZE")
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp_path, self.db_path)
+
+    def update_districts(self, combined_df, districts, raw_frames=(), fingerprint: DataFingerprint = None,
+                         source_stamp=None, all_pincodes: bool = False):
+        """Rewrites only the rows of `districts` (changed, added or removed) in one transaction.
+
+        With `all_pincodes`, pincode_summary is replaced for every district instead.
+        """
+        names = sorted(districts)
+
+        def subset(df):
+            return df[df['district'].astype(str).isin(names)] if df is not None and not df.empty else df
+
+        combined, district_summary, pincode_summary = self._tables(
+            subset(combined_df), [(name, subset(df)) for name, df in raw_frames])
+        if all_pincodes:
+            pincode_summary = self._pincode_summary(raw_frames)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                for table, frame in (('combined', combined), ('district_summary', district_summary),
+                                     ('pincode_summary', pincode_summary)):
+                    if table == 'pincode_summary' and all_pincodes:
+                        conn.execute("DELETE FROM pincode_summary")
+                    else:
+                        conn.executemany(f"DELETE FROM {table} WHERE district = ?", [(n,) for n in names])
+                    # Align to the stored schema (a subset may lack a dataset's pincode column)
+                    columns = [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+                    if not frame.empty:
+                        # executemany rather than to_sql: to_sql commits, and readers must never see
+                        # a district deleted but not yet re-inserted
+                        rows = frame.reindex(columns=columns, fill_value=0).itertuples(index=False, name=None)
+                        conn.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * len(columns))})", rows)
+                self._save_meta(conn, fingerprint, source_stamp)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _save_meta(conn, fingerprint: DataFingerprint, source_stamp=None):
+        conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)")
+        for key, value in (('fingerprint', fingerprint and fingerprint.to_dict()),
+                           ('source_stamp', source_stamp)):
+            if value is None:
+                conn.execute("DELETE FROM store_meta WHERE key = ?", (key,))
+            else:
+                conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES (?, ?)",
+                             (key, json.dumps(value)))
+
+    def _stored_meta(self, key: str):
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        try:
+            row = conn.execute("SELECT value FROM store_meta WHERE key = ?", (key,)).fetchone()
+        except sqlite3.OperationalError:
+            return None   # Store written before fingerprints were recorded
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def stored_fingerprint(self):
+        """The fingerprint of the data the store was last written from, if recorded."""
+        value = self._stored_meta('fingerprint')
+        return DataFingerprint.from_dict(json.loads(value)) if value else None
+
+    @staticmethod
+    def _pincode_summary(raw_frames):
+        """Per (district, pincode) totals of each raw dataset."""
+        totals = []
+        for name, df in raw_frames:
+            if df is None or df.empty or 'pincode' not in df.columns:
+                continue
+            value_cols = [c for c in df.select_dtypes('number').columns if c != 'pincode']
+            grouped = df.groupby(['district', 'pincode'])[value_cols].sum().sum(axis=1)
+            totals.append(grouped.rename(f'total_{name}'))
+        if not totals:
+            return pd.DataFrame(columns=['district', 'pincode'])
+        return pd.concat(totals, axis=1).fillna(0).reset_index()
+
+    def load_combined(self):
+        """Reads combined_df back (fast start without re-parsing the CSVs)."""
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        try:
+            return pd.read_sql("SELECT * FROM combined", conn, parse_dates=['date'])
+        finally:
+            conn.close()
+
+    def query(self, sql: str, params=None, limit: int = 1000):
+        """Runs one read-only, parameterized SELECT and returns at most `limit` rows."""
+        limit = max(1, min(int(limit), MAX_QUERY_ROWS))
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        try:
+            conn.set_authorizer(_authorize)
+            deadline = time.monotonic() + QUERY_TIMEOUT_SECONDS
+            # Non-zero return aborts the statement once the deadline has passed
+            conn.set_progress_handler(lambda: time.monotonic() > deadline, 10000)
+
+            cur = conn.execute(sql, params or [])
+            columns = [d[0] for d in cur.description] if cur.description else []
+            rows = cur.fetchmany(limit + 1)
+        finally:
+            conn.close()
+
+        return {
+            "columns": columns,
+            "rows": [list(r) for r in rows[:limit]],
+            "truncated": len(rows) > limit
+        }
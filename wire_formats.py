@@ -0,0 +1,74 @@
+"""
+WIRE FORMATS - GovOptima Platform
+Content negotiation for heavy series endpoints. JSON stays the default;
+clients can ask for a columnar Arrow IPC stream or MessagePack instead,
+either with an Accept header or with ?format=arrow|msgpack.
+Both encoders are optional dependencies (pyarrow, msgpack).
+"""
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+
+_FORMAT_ALIASES = {
+    'json': 'json',
+    'arrow': 'arrow',
+    ARROW_MEDIA_TYPE: 'arrow',
+    'msgpack': 'msgpack',
+    MSGPACK_MEDIA_TYPE: 'msgpack',
+    'application/x-msgpack': 'msgpack',
+}
+
+
+def negotiate(request, fmt: str = None) -> str:
+    """Picks 'json', 'arrow' or 'msgpack' from ?format= or the Accept header."""
+    if fmt:
+        return _FORMAT_ALIASES.get(fmt.lower(), 'json')
+    for part in request.headers.get('accept', '').split(','):
+        media_type = part.split(';')[0].strip().lower()
+        if media_type in _FORMAT_ALIASES:
+            return _FORMAT_ALIASES[media_type]
+    return 'json'
+
+
+def frame_response(df: pd.DataFrame, fmt: str) -> Response:
+    """Encodes a frame column-by-column in the negotiated binary format."""
+    if fmt == 'arrow':
+        if pa is None:
+            return JSONResponse({"error": "Arrow output requires pyarrow"}, status_code=406)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(content=sink.getvalue().to_pybytes(), media_type=ARROW_MEDIA_TYPE)
+
+    if fmt == 'msgpack':
+        if msgpack is None:
+            return JSONResponse({"error": "MessagePack output requires msgpack"}, status_code=406)
+        columns = {}
+        for col in df.columns:
+            values = df[col]
+            if pd.api.types.is_datetime64_any_dtype(values):
+                # Epoch milliseconds: compact and trivially decoded by any client
+                values = values.to_numpy(dtype='datetime64[ms]').astype(np.int64)
+            elif isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype(str)
+            columns[str(col)] = np.asarray(values).tolist()
+        payload = {"columns": [str(c) for c in df.columns], "data": columns, "rows": len(df)}
+        return Response(content=msgpack.packb(payload, use_bin_type=True), media_type=MSGPACK_MEDIA_TYPE)
+
+    raise ValueError(f"Unsupported wire format: {fmt}")